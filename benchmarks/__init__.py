@@ -0,0 +1 @@
+"""Benchmarks for the Filament Tracker integration."""
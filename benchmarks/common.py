@@ -0,0 +1,80 @@
+"""Shared helpers for the Filament Tracker benchmarks."""
+
+from __future__ import annotations
+
+import statistics
+from typing import Any
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.filament_tracker.const import DOMAIN
+from homeassistant.core import HomeAssistant
+import homeassistant.helpers.entity_registry as er
+from homeassistant.setup import async_setup_component
+
+SPOOL_COUNTS = (10, 100, 1000)
+UNRELATED_ENTITIES = 50_000
+
+
+def latency_summary(samples: list[float]) -> dict[str, float]:
+    """Return latency percentiles in milliseconds."""
+    ms = sorted(sample * 1000 for sample in samples)
+    centiles = statistics.quantiles(ms, n=100, method="inclusive")
+    return {
+        "samples": len(ms),
+        "min_ms": round(ms[0], 4),
+        "p50_ms": round(centiles[49], 4),
+        "p90_ms": round(centiles[89], 4),
+        "p99_ms": round(centiles[98], 4),
+        "max_ms": round(ms[-1], 4),
+        "mean_ms": round(statistics.fmean(ms), 4),
+    }
+
+
+def spool_color(index: int) -> str:
+    """Return a unique color for a synthetic spool."""
+    return f"#{index:06X}"
+
+
+def populate_registry(hass: HomeAssistant, count: int) -> None:
+    """Register entities of other integrations, like a big installation has."""
+    registry = er.async_get(hass)
+    for i in range(count):
+        registry.async_get_or_create("sensor", "synthetic", f"unrelated_{i}")
+
+
+def add_spools(
+    hass: HomeAssistant,
+    count: int,
+    options: dict[str, Any] | None = None,
+    colors: list[str] | None = None,
+    first: int = 0,
+) -> list[MockConfigEntry]:
+    """Add synthetic spool config entries, numbered from first."""
+    entries = []
+    for i in range(first, first + count):
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            title=f"Spool {i}",
+            data={
+                "name": f"Spool {i}",
+                "color": colors[i - first] if colors else spool_color(i),
+                "initial_length": 330.0,
+                "initial_weight": 1000.0,
+                "price": 100.0,
+                "type": "PLA",
+                "brand": "Synthetic",
+                "model": "Bench",
+            },
+            options=options or {},
+        )
+        entry.add_to_hass(hass)
+        entries.append(entry)
+    return entries
+
+
+async def async_setup_integration(hass: HomeAssistant) -> None:
+    """Set up the integration and every spool entry."""
+    assert await async_setup_component(hass, "persistent_notification", {})
+    assert await async_setup_component(hass, DOMAIN, {})
+    await hass.async_block_till_done()
@@ -0,0 +1,93 @@
+"""Fixtures for the Filament Tracker benchmarks."""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime
+import json
+from pathlib import Path
+import platform
+from typing import Any
+
+import pytest
+
+from homeassistant.const import __version__ as HA_VERSION
+
+from .common import UNRELATED_ENTITIES
+from .replay import TRACES_DIR
+
+pytest_plugins = "pytest_homeassistant_custom_component"
+
+DEFAULT_OUTPUT = Path(__file__).parent / "results.json"
+
+
+def pytest_addoption(parser: pytest.Parser) -> None:
+    """Add the benchmark options."""
+    parser.addoption(
+        "--bench-output",
+        default=str(DEFAULT_OUTPUT),
+        help="JSON file the benchmark results are written to",
+    )
+    parser.addoption(
+        "--bench-unrelated",
+        type=int,
+        default=UNRELATED_ENTITIES,
+        help="Unrelated entities added to the entity registry",
+    )
+    parser.addoption(
+        "--bench-trace",
+        action="append",
+        default=[],
+        help="AMS trace file to replay, can be repeated (default: traces/*.jsonl)",
+    )
+    parser.addoption(
+        "--bench-trace-speed",
+        type=float,
+        default=0.0,
+        help="Replay traces at this multiple of the recorded pace, 0 for full speed",
+    )
+
+
+def pytest_generate_tests(metafunc: pytest.Metafunc) -> None:
+    """Run the replay benchmarks once per trace file."""
+    if "trace_path" in metafunc.fixturenames:
+        paths = [
+            Path(path) for path in metafunc.config.getoption("--bench-trace")
+        ] or sorted(TRACES_DIR.glob("*.jsonl"))
+        metafunc.parametrize("trace_path", paths, ids=[path.stem for path in paths])
+
+
+@pytest.fixture(autouse=True)
+def auto_enable_custom_integrations(enable_custom_integrations: None) -> None:
+    """Load the integration from custom_components."""
+
+
+@pytest.fixture(scope="session")
+def bench_results(request: pytest.FixtureRequest) -> dict[str, Any]:
+    """Collect results and write them as JSON at the end of the session."""
+    results: dict[str, Any] = {}
+    yield results
+    output = Path(request.config.getoption("--bench-output"))
+    output.write_text(
+        json.dumps(
+            {
+                "created": datetime.now(UTC).isoformat(),
+                "python": platform.python_version(),
+                "homeassistant": HA_VERSION,
+                "results": results,
+            },
+            indent=2,
+            sort_keys=True,
+        )
+    )
+
+
+@pytest.fixture
+def unrelated_entities(request: pytest.FixtureRequest) -> int:
+    """Return how many unrelated entities to register."""
+    return request.config.getoption("--bench-unrelated")
+
+
+@pytest.fixture
+def trace_speed(request: pytest.FixtureRequest) -> float:
+    """Return the pace traces are replayed at."""
+    return request.config.getoption("--bench-trace-speed")
@@ -0,0 +1,173 @@
+"""Replay of recorded AMS event traces."""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+import heapq
+import json
+from pathlib import Path
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+TRACES_DIR = Path(__file__).parent / "traces"
+
+# entity id, state (None when removed), traced attributes
+State = tuple[str, str | None, dict[str, Any]]
+# seconds since the trace started, followed by a state
+Event = tuple[float, str, str | None, dict[str, Any]]
+
+
+@dataclass(slots=True)
+class Trace:
+    """A trace written by the start_trace and stop_trace services."""
+
+    header: dict[str, Any]
+    states: list[State]
+    events: list[Event]
+
+    @classmethod
+    def load(cls, path: Path) -> Trace:
+        """Read a trace file."""
+        with path.open(encoding="utf-8") as file:
+            header = json.loads(next(file))
+            events = [json.loads(line) for line in file if line.strip()]
+        return cls(
+            header,
+            [
+                (row[0], row[1], row[2] if len(row) > 2 else {})
+                for row in header["states"]
+            ],
+            [(*row[:3], row[3] if len(row) > 3 else {}) for row in events],
+        )
+
+    @property
+    def expected(self) -> dict[str, float]:
+        """Return the grams the spool of every tray color should lose, if known."""
+        return self.header.get("expected", {})
+
+    @property
+    def colors(self) -> list[str]:
+        """Return every tray color of the trace."""
+        trays = set(self.header["ams_trays"])
+        colors = {
+            attributes["color"]
+            for entity_id, _, attributes in self.states
+            if entity_id in trays and "color" in attributes
+        }
+        colors.update(
+            attributes["color"]
+            for _, entity_id, _, attributes in self.events
+            if entity_id in trays and "color" in attributes
+        )
+        return sorted(colors)
+
+
+@dataclass(slots=True)
+class Printer:
+    """A copy of the traced printer with its own entities and tray colors.
+
+    Copies are told apart by an entity id suffix and a small offset on the
+    tray colors, so every copy routes to its own spools.
+    """
+
+    trace: Trace
+    index: int
+
+    def entity_id(self, entity_id: str) -> str:
+        """Return the entity id of this copy."""
+        return f"{entity_id}_{self.index}" if self.index else entity_id
+
+    def color(self, color: str) -> str:
+        """Return the tray color of this copy."""
+        if not self.index:
+            return color
+        digits = color.lstrip("#")
+        value = (int(digits[:6], 16) + self.index) % 0x1000000
+        return f"{value:06X}{digits[6:]}"
+
+    @property
+    def options(self) -> dict[str, Any]:
+        """Return the spool options pointing at this copy."""
+        header = self.trace.header
+        options: dict[str, Any] = {
+            key: self.entity_id(header[key])
+            for key in ("ams_active", "usage_grams", "usage_meters")
+        }
+        options["ams_trays"] = [self.entity_id(tray) for tray in header["ams_trays"]]
+        if header.get("live_interval") is not None:
+            options["live_tracking"] = True
+            options["live_update_interval"] = header["live_interval"]
+        return options
+
+    def state(self, entity_id: str, state: str | None, attributes: dict) -> State:
+        """Return a state moved to this copy."""
+        if "color" in attributes:
+            attributes = {**attributes, "color": self.color(attributes["color"])}
+        return self.entity_id(entity_id), state, attributes
+
+    @property
+    def states(self) -> list[State]:
+        """Return the states of this copy when recording began."""
+        return [self.state(*state) for state in self.trace.states]
+
+    @property
+    def events(self) -> list[Event]:
+        """Return the state changes of this copy."""
+        return [(offset, *self.state(*state)) for offset, *state in self.trace.events]
+
+
+@dataclass(slots=True)
+class ReplayResult:
+    """What a replay measured."""
+
+    events: int = 0
+    elapsed: float = 0.0
+    latencies: list[float] = field(default_factory=list)
+
+    @property
+    def throughput(self) -> float:
+        """Return the replayed events per second."""
+        return self.events / self.elapsed if self.elapsed else 0.0
+
+
+def set_states(hass: HomeAssistant, states: list[State]) -> None:
+    """Set the states a trace started with."""
+    for entity_id, state, attributes in states:
+        if state is not None:
+            hass.states.async_set(entity_id, state, attributes)
+
+
+async def async_replay(
+    hass: HomeAssistant, printers: list[Printer], speed: float = 0.0
+) -> ReplayResult:
+    """Replay the state changes of several printers interleaved by time.
+
+    With a speed of 0 events are replayed as fast as the listeners handle
+    them, otherwise at that multiple of the recorded pace. The latency of
+    every AMS status change is the time until all work it caused is done.
+    """
+    ams_entities = {
+        printer.entity_id(printer.trace.header["ams_active"]) for printer in printers
+    }
+    events = heapq.merge(
+        *(printer.events for printer in printers), key=lambda event: event[0]
+    )
+    result = ReplayResult()
+    start = time.perf_counter()
+    for offset, entity_id, state, attributes in events:
+        if speed and (delay := start + offset / speed - time.perf_counter()) > 0:
+            await asyncio.sleep(delay)
+        event_start = time.perf_counter()
+        if state is None:
+            hass.states.async_remove(entity_id)
+        else:
+            hass.states.async_set(entity_id, state, attributes)
+        await hass.async_block_till_done()
+        if entity_id in ams_entities:
+            result.latencies.append(time.perf_counter() - event_start)
+        result.events += 1
+    result.elapsed = time.perf_counter() - start
+    return result
@@ -0,0 +1,72 @@
+"""Benchmarks of the AMS event path."""
+
+from __future__ import annotations
+
+import time
+from typing import Any
+
+import pytest
+
+from custom_components.filament_tracker.const import NUMBER_ENTITIES_KEY
+from homeassistant.core import HomeAssistant
+
+from .common import (
+    SPOOL_COUNTS,
+    add_spools,
+    async_setup_integration,
+    latency_summary,
+    spool_color,
+)
+
+JOBS = 100
+AMS_ACTIVE = "binary_sensor.bench_printer_ams_active"
+USAGE_GRAMS = "sensor.bench_printer_print_weight"
+USAGE_METERS = "sensor.bench_printer_print_length"
+TRAYS = [f"sensor.bench_printer_ams_tray_{i}" for i in range(1, 5)]
+PRINTER_OPTIONS = {
+    "ams_active": AMS_ACTIVE,
+    "usage_grams": USAGE_GRAMS,
+    "usage_meters": USAGE_METERS,
+    "ams_trays": TRAYS,
+}
+
+
+@pytest.mark.parametrize("spools", SPOOL_COUNTS)
+async def test_ams_event_to_deduction_latency(
+    hass: HomeAssistant, bench_results: dict[str, Any], spools: int
+) -> None:
+    """Measure the time from AMS shutdown to the spool being updated."""
+    hass.states.async_set(AMS_ACTIVE, "off")
+    hass.states.async_set(USAGE_GRAMS, "10")
+    hass.states.async_set(USAGE_METERS, "3")
+    for i, tray in enumerate(TRAYS):
+        hass.states.async_set(tray, "PLA", {"color": spool_color(i), "active": False})
+    entries = add_spools(hass, spools, options=PRINTER_OPTIONS)
+    await async_setup_integration(hass)
+
+    samples = []
+    for job in range(JOBS):
+        tray = job % len(TRAYS)
+        weight = hass.data[NUMBER_ENTITIES_KEY][entries[tray].entry_id]["weight"]
+        before = weight.native_value
+        hass.states.async_set(AMS_ACTIVE, "on")
+        hass.states.async_set(
+            TRAYS[tray], "PLA", {"color": spool_color(tray), "active": True}
+        )
+        await hass.async_block_till_done()
+
+        start = time.perf_counter()
+        hass.states.async_set(AMS_ACTIVE, "off")
+        await hass.async_block_till_done()
+        samples.append(time.perf_counter() - start)
+
+        assert weight.native_value < before
+        hass.states.async_set(
+            TRAYS[tray], "PLA", {"color": spool_color(tray), "active": False}
+        )
+        await hass.async_block_till_done()
+
+    bench_results[f"ams_event_latency[{spools}]"] = {
+        "spools": spools,
+        **latency_summary(samples),
+    }
@@ -0,0 +1,65 @@
+"""Benchmarks replaying recorded AMS event traces."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from custom_components.filament_tracker.const import NUMBER_ENTITIES_KEY
+from homeassistant.core import HomeAssistant
+
+from .common import add_spools, async_setup_integration, latency_summary
+from .replay import Printer, Trace, async_replay, set_states
+
+PRINTER_COUNTS = (1, 10, 50)
+INITIAL_WEIGHT = 1000.0
+
+
+@pytest.mark.parametrize("printers", PRINTER_COUNTS)
+async def test_trace_replay(
+    hass: HomeAssistant,
+    bench_results: dict[str, Any],
+    trace_path: Path,
+    trace_speed: float,
+    printers: int,
+) -> None:
+    """Replay a trace on copies of its printer and check what was deducted."""
+    trace = Trace.load(trace_path)
+    colors = trace.colors
+    copies = [Printer(trace, index) for index in range(printers)]
+    spools = {}
+    for printer in copies:
+        set_states(hass, printer.states)
+        entries = add_spools(
+            hass,
+            len(colors),
+            options=printer.options,
+            colors=[f"#{printer.color(color).lstrip('#')}" for color in colors],
+            first=printer.index * len(colors),
+        )
+        for color, entry in zip(colors, entries, strict=True):
+            spools[(printer.index, color)] = entry.entry_id
+    await async_setup_integration(hass)
+
+    result = await async_replay(hass, copies, trace_speed)
+
+    deductions: dict[str, float] = {}
+    for (index, color), entry_id in spools.items():
+        weight = hass.data[NUMBER_ENTITIES_KEY][entry_id]["weight"].native_value
+        used = round(INITIAL_WEIGHT - weight, 3)
+        if index == 0:
+            deductions[color] = used
+        assert used == pytest.approx(trace.expected.get(color, used)), (
+            f"printer {index}, tray color {color}"
+        )
+
+    bench_results[f"trace_replay[{trace_path.stem}-{printers}]"] = {
+        "printers": printers,
+        "speed": trace_speed,
+        "events": result.events,
+        "events_per_s": round(result.throughput, 1),
+        "deductions": deductions,
+        "ams_event_latency": latency_summary(result.latencies),
+    }
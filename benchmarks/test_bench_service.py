@@ -0,0 +1,87 @@
+"""Benchmarks of the use_filament service path."""
+
+from __future__ import annotations
+
+import time
+from typing import Any
+
+import pytest
+
+from custom_components.filament_tracker.const import DOMAIN
+from homeassistant.core import HomeAssistant
+
+from .common import (
+    SPOOL_COUNTS,
+    add_spools,
+    async_setup_integration,
+    latency_summary,
+    populate_registry,
+    spool_color,
+)
+
+CALLS = 200
+
+
+@pytest.mark.parametrize("spools", SPOOL_COUNTS)
+async def test_use_filament_latency(
+    hass: HomeAssistant,
+    bench_results: dict[str, Any],
+    unrelated_entities: int,
+    spools: int,
+) -> None:
+    """Measure use_filament latency with a large entity registry."""
+    populate_registry(hass, unrelated_entities)
+    add_spools(hass, spools)
+    await async_setup_integration(hass)
+
+    samples = []
+    for i in range(CALLS):
+        color = spool_color(i % spools)
+        start = time.perf_counter()
+        await hass.services.async_call(
+            DOMAIN,
+            "use_filament",
+            {"weight": 1.0, "meters": 0.3, "color": color},
+            blocking=True,
+        )
+        samples.append(time.perf_counter() - start)
+
+    bench_results[f"use_filament_latency[{spools}]"] = {
+        "spools": spools,
+        "unrelated_entities": unrelated_entities,
+        **latency_summary(samples),
+    }
+
+
+@pytest.mark.parametrize("spools", SPOOL_COUNTS)
+async def test_use_filament_batch_latency(
+    hass: HomeAssistant,
+    bench_results: dict[str, Any],
+    unrelated_entities: int,
+    spools: int,
+) -> None:
+    """Measure use_filament_batch latency for four-tray deductions."""
+    populate_registry(hass, unrelated_entities)
+    add_spools(hass, spools)
+    await async_setup_integration(hass)
+
+    samples = []
+    for i in range(CALLS):
+        deductions = [
+            {"weight": 1.0, "meters": 0.3, "color": spool_color((i + tray) % spools)}
+            for tray in range(min(4, spools))
+        ]
+        start = time.perf_counter()
+        await hass.services.async_call(
+            DOMAIN,
+            "use_filament_batch",
+            {"deductions": deductions},
+            blocking=True,
+        )
+        samples.append(time.perf_counter() - start)
+
+    bench_results[f"use_filament_batch_latency[{spools}]"] = {
+        "spools": spools,
+        "unrelated_entities": unrelated_entities,
+        **latency_summary(samples),
+    }
@@ -0,0 +1,58 @@
+"""Benchmarks of integration setup and memory use."""
+
+from __future__ import annotations
+
+import gc
+import time
+import tracemalloc
+from typing import Any
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+
+from .common import SPOOL_COUNTS, add_spools, async_setup_integration
+
+
+@pytest.mark.parametrize("spools", SPOOL_COUNTS)
+async def test_setup_time(
+    hass: HomeAssistant, bench_results: dict[str, Any], spools: int
+) -> None:
+    """Measure how long setting up every spool entry takes."""
+    add_spools(hass, spools)
+
+    start = time.perf_counter()
+    await async_setup_integration(hass)
+    elapsed = time.perf_counter() - start
+
+    bench_results[f"setup_time[{spools}]"] = {
+        "spools": spools,
+        "total_ms": round(elapsed * 1000, 3),
+        "per_spool_ms": round(elapsed * 1000 / spools, 4),
+    }
+
+
+@pytest.mark.parametrize("spools", SPOOL_COUNTS)
+async def test_memory_per_spool(
+    hass: HomeAssistant, bench_results: dict[str, Any], spools: int
+) -> None:
+    """Measure memory allocated per spool by setup."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.take_snapshot()
+        add_spools(hass, spools)
+        await async_setup_integration(hass)
+        gc.collect()
+        snapshot = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    allocated = sum(
+        stat.size_diff for stat in snapshot.compare_to(baseline, "filename")
+    )
+    bench_results[f"memory_per_spool[{spools}]"] = {
+        "spools": spools,
+        "total_kib": round(allocated / 1024, 2),
+        "per_spool_kib": round(allocated / 1024 / spools, 3),
+    }
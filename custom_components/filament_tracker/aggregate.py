@@ -0,0 +1,189 @@
+"""Inventory totals for Filament Tracker."""
+
+from __future__ import annotations
+
+from asyncio import Handle
+from collections.abc import Callable
+from dataclasses import dataclass
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+
+from .const import CONF_BRAND, CONF_PRICE, CONF_TYPE
+
+GROUP_TOTAL = "total"
+GROUP_TYPE = "type"
+GROUP_BRAND = "brand"
+
+# Indexes in the totals of a group
+WEIGHT, METERS, VALUE, SPOOLS = range(4)
+
+Group = tuple[str, str]
+
+
+@dataclass(slots=True)
+class _Spool:
+    """What a spool adds to the totals of its groups."""
+
+    groups: tuple[Group, ...]
+    price: float
+    weight: float = 0.0
+    meters: float = 0.0
+
+
+class InventoryAggregates:
+    """Remaining weight, length, value and spool count of the inventory.
+
+    Totals are kept for the whole inventory and per filament type and
+    brand. A spool change only subtracts its old contribution from its
+    groups and adds the new one, so nothing is summed up from scratch.
+    Listeners of the changed groups, and spool listeners with the changed
+    spools, are notified once per event loop iteration. A type or brand
+    group left without spools is dropped before its listeners are told.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize empty totals."""
+        self._hass = hass
+        self._spools: dict[str, _Spool] = {}
+        self._totals: dict[Group, list[float]] = {}
+        self._listeners: dict[Group, list[CALLBACK_TYPE]] = {}
+        self._group_listeners: list[Callable[[Group], None]] = []
+        self._spool_listeners: list[Callable[[set[str]], None]] = []
+        self._dirty: set[Group] = set()
+        self._dirty_spools: set[str] = set()
+        self._notify_handle: Handle | None = None
+
+    @property
+    def groups(self) -> list[Group]:
+        """Return the groups with totals."""
+        return list(self._totals)
+
+    @callback
+    def async_has_group(self, group: Group) -> bool:
+        """Return whether a group has totals."""
+        return group in self._totals
+
+    @callback
+    def async_totals(self, group: Group) -> list[float]:
+        """Return the [weight, meters, value, spools] totals of a group."""
+        return self._totals.get(group, [0.0, 0.0, 0.0, 0])
+
+    @callback
+    def async_add_listener(
+        self, group: Group, update_callback: CALLBACK_TYPE
+    ) -> CALLBACK_TYPE:
+        """Listen for changes to the totals of a group."""
+        listeners = self._listeners.setdefault(group, [])
+        listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def async_add_group_listener(
+        self, group_callback: Callable[[Group], None]
+    ) -> CALLBACK_TYPE:
+        """Listen for groups getting their first spool."""
+        self._group_listeners.append(group_callback)
+
+        @callback
+        def remove_listener() -> None:
+            self._group_listeners.remove(group_callback)
+
+        return remove_listener
+
+    @callback
+    def async_add_spool_listener(
+        self, spool_callback: Callable[[set[str]], None]
+    ) -> CALLBACK_TYPE:
+        """Listen for spools being added, changed or removed."""
+        self._spool_listeners.append(spool_callback)
+
+        @callback
+        def remove_listener() -> None:
+            self._spool_listeners.remove(spool_callback)
+
+        return remove_listener
+
+    @callback
+    def async_has_spool(self, entry_id: str) -> bool:
+        """Return whether a spool is counted."""
+        return entry_id in self._spools
+
+    @callback
+    def async_add_spool(self, entry: ConfigEntry) -> None:
+        """Count a spool, or update its type, brand and price."""
+        groups: tuple[Group, ...] = (
+            (GROUP_TOTAL, ""),
+            (GROUP_TYPE, entry.data.get(CONF_TYPE) or "PLA"),
+        )
+        if brand := entry.data.get(CONF_BRAND):
+            groups += ((GROUP_BRAND, brand),)
+        price = float(entry.data.get(CONF_PRICE) or 0.0)
+
+        if (spool := self._spools.get(entry.entry_id)) is None:
+            spool = self._spools[entry.entry_id] = _Spool(groups, price)
+        else:
+            self._async_apply(spool, -1)
+            spool.groups = groups
+            spool.price = price
+        self._async_apply(spool, 1)
+        self._dirty_spools.add(entry.entry_id)
+
+    @callback
+    def async_remove_spool(self, entry_id: str) -> None:
+        """Stop counting a spool."""
+        if (spool := self._spools.pop(entry_id, None)) is not None:
+            self._async_apply(spool, -1)
+            self._dirty_spools.add(entry_id)
+
+    @callback
+    def async_set_remaining(
+        self, entry_id: str, number_type: str, value: float
+    ) -> None:
+        """Update the remaining weight or length of a spool."""
+        if (spool := self._spools.get(entry_id)) is None:
+            return
+        self._async_apply(spool, -1)
+        if number_type == "weight":
+            spool.weight = value
+        else:
+            spool.meters = value
+        self._async_apply(spool, 1)
+        self._dirty_spools.add(entry_id)
+
+    @callback
+    def _async_apply(self, spool: _Spool, sign: int) -> None:
+        """Add or subtract the contribution of a spool to its groups."""
+        for group in spool.groups:
+            if (totals := self._totals.get(group)) is None:
+                totals = self._totals[group] = [0.0, 0.0, 0.0, 0]
+                for group_callback in list(self._group_listeners):
+                    group_callback(group)
+            totals[WEIGHT] += sign * spool.weight
+            totals[METERS] += sign * spool.meters
+            totals[VALUE] += sign * spool.price / 1000 * spool.weight
+            totals[SPOOLS] += sign
+            self._dirty.add(group)
+        if self._notify_handle is None:
+            self._notify_handle = self._hass.loop.call_soon(self._async_notify)
+
+    @callback
+    def _async_notify(self) -> None:
+        """Tell the listeners of every changed group and spool."""
+        self._notify_handle = None
+        dirty, self._dirty = self._dirty, set()
+        for group in dirty:
+            if group[0] != GROUP_TOTAL and not self._totals[group][SPOOLS]:
+                del self._totals[group]
+        for group in dirty:
+            for update_callback in list(self._listeners.get(group, ())):
+                update_callback()
+        if dirty_spools := self._dirty_spools:
+            self._dirty_spools = set()
+            for spool_callback in list(self._spool_listeners):
+                spool_callback(dirty_spools)
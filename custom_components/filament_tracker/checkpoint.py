@@ -0,0 +1,56 @@
+"""Checkpoints of prints tracked live by Filament Tracker."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, STATS_KEY
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.live_jobs"
+SAVE_DELAY = 5
+
+
+class JobCheckpoints:
+    """In-progress usage of live tracked prints, keyed by printer.
+
+    A checkpoint holds what was already deducted for the running print, so
+    a restart in the middle of a print resumes without counting it twice.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the checkpoints."""
+        self._hass = hass
+        self._store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._checkpoints: dict[str, dict[str, Any]] = {}
+
+    async def async_load(self) -> None:
+        """Load the checkpoints from storage."""
+        if (data := await self._store.async_load()) is not None:
+            self._checkpoints = data
+
+    @callback
+    def async_get(self, printer: str) -> dict[str, Any] | None:
+        """Return the checkpoint of a printer."""
+        return self._checkpoints.get(printer)
+
+    @callback
+    def async_set(self, printer: str, checkpoint: dict[str, Any]) -> None:
+        """Store the checkpoint of a printer."""
+        self._checkpoints[printer] = checkpoint
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def async_remove(self, printer: str) -> None:
+        """Drop the checkpoint of a printer once its print is finished."""
+        if self._checkpoints.pop(printer, None) is not None:
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the checkpoints to store."""
+        self._hass.data[STATS_KEY].async_increment("storage_flush.checkpoints")
+        return dict(self._checkpoints)
@@ -0,0 +1,50 @@
+"""Perceptual color helpers for Filament Tracker."""
+
+from __future__ import annotations
+
+from math import sqrt
+
+Lab = tuple[float, float, float]
+
+# D65 reference white
+_XN, _YN, _ZN = 0.95047, 1.0, 1.08883
+
+
+def _linear(channel: int) -> float:
+    """Return a linear sRGB channel from an 8 bit one."""
+    c = channel / 255
+    return c / 12.92 if c <= 0.04045 else ((c + 0.055) / 1.055) ** 2.4
+
+
+def _f(t: float) -> float:
+    """Return the CIELAB companding of a relative XYZ value."""
+    return t ** (1 / 3) if t > 216 / 24389 else (24389 / 27 * t + 16) / 116
+
+
+def hex_to_lab(color: str) -> Lab | None:
+    """Return the CIELAB value of a normalized RGB, RRGGBB or RRGGBBAA color.
+
+    The alpha channel reported by AMS trays is ignored.
+    """
+    if len(color) == 3:
+        color = "".join(c * 2 for c in color)
+    elif len(color) == 8:
+        color = color[:6]
+    if len(color) != 6:
+        return None
+    try:
+        r, g, b = (_linear(int(color[i : i + 2], 16)) for i in (0, 2, 4))
+    except ValueError:
+        return None
+
+    x = _f((0.4124564 * r + 0.3575761 * g + 0.1804375 * b) / _XN)
+    y = _f((0.2126729 * r + 0.7151522 * g + 0.0721750 * b) / _YN)
+    z = _f((0.0193339 * r + 0.1191920 * g + 0.9503041 * b) / _ZN)
+    return (116 * y - 16, 500 * (x - y), 200 * (y - z))
+
+
+def delta_e(lab1: Lab, lab2: Lab) -> float:
+    """Return the CIE76 color difference of two CIELAB values."""
+    return sqrt(
+        (lab1[0] - lab2[0]) ** 2 + (lab1[1] - lab2[1]) ** 2 + (lab1[2] - lab2[2]) ** 2
+    )
@@ -8,16 +8,11 @@ from homeassistant import config_entries
 from homeassistant.const import CONF_NAME
 from homeassistant.core import callback
 
-from .const import DOMAIN
+from .const import CONF_BRAND, CONF_COLOR, CONF_MODEL, CONF_PRICE, CONF_TYPE, DOMAIN
 from .options_flow import FilamentTrackerOptionsFlowHandler
 
-CONF_COLOR = "color"
 CONF_INITIAL_LENGTH = "initial_length"
 CONF_INITIAL_WEIGHT = "initial_weight"
-CONF_PRICE = "price"
-CONF_BRAND = "brand"
-CONF_TYPE = "type"
-CONF_MODEL = "model"
 
 FILAMENT_TYPES = ["PLA", "PETG", "ABS"]
 
@@ -37,6 +32,10 @@ class FilamentConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         _LOGGER.debug("Options Flow")
         return FilamentTrackerOptionsFlowHandler(config_entry)
 
+    async def async_step_import(self, import_data):
+        """Create a spool from a validated inventory record."""
+        return self.async_create_entry(title=import_data[CONF_NAME], data=import_data)
+
     async def async_step_user(self, user_input=None):
         """Handle the initial step of the config flow for user input."""
         if user_input is not None:
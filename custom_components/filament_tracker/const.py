@@ -1,6 +1,37 @@
 """Constants for the Filament Tracker integration."""
 
 DOMAIN = "filament_tracker"
+
+CONF_BRAND = "brand"
+CONF_COLOR = "color"
+CONF_MODEL = "model"
+CONF_PRICE = "price"
+CONF_TAG_UID = "tag_uid"
+CONF_TRAY_UUID = "tray_uuid"
+CONF_TYPE = "type"
+
+# Spool identifiers reported by AMS trays, also the options binding a spool
+TRAY_IDENTIFIERS = (CONF_TRAY_UUID, CONF_TAG_UID)
+
+# Largest CIELAB ΔE between a color and a spool to still match it
+DEFAULT_COLOR_TOLERANCE = 2.3
+
+CHECKPOINTS_KEY = f"{DOMAIN}_checkpoints"
+COORDINATORS_KEY = f"{DOMAIN}_coordinators"
+FORECASTS_KEY = f"{DOMAIN}_forecasts"
+INVENTORY_KEY = f"{DOMAIN}_inventory"
+JOURNAL_KEY = f"{DOMAIN}_journal"
+LEDGER_KEY = f"{DOMAIN}_ledger"
+NOTIFIER_KEY = f"{DOMAIN}_notifier"
+NUMBER_ENTITIES_KEY = f"{DOMAIN}_number_entities"
+SENSOR_PLATFORMS_KEY = f"{DOMAIN}_sensor_platforms"
+SNAPSHOT_KEY = f"{DOMAIN}_snapshot"
+SPOOL_INDEX_KEY = f"{DOMAIN}_spool_index"
+STATISTICS_KEY = f"{DOMAIN}_statistics"
+STATS_KEY = f"{DOMAIN}_stats"
+TRACES_KEY = f"{DOMAIN}_traces"
+TRANSLATIONS_KEY = f"{DOMAIN}_translations"
+
 SENSOR_TYPES = {
     "weight": ["Weight", "g", "mdi:weight-gram"],
     "lenght": ["Lenght", "m", "mdi:map-marker-distance"],
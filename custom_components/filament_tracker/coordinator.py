@@ -0,0 +1,793 @@
+"""AMS coordinator for Filament Tracker."""
+
+from __future__ import annotations
+
+from dataclasses import replace
+from datetime import datetime
+import logging
+import time
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.exceptions import ServiceValidationError
+import homeassistant.helpers.entity_registry as er
+from homeassistant.helpers.event import async_call_later, async_track_state_change_event
+from homeassistant.helpers.start import async_at_started
+import homeassistant.util.dt as dt_util
+
+from .checkpoint import JobCheckpoints
+from .const import (
+    CHECKPOINTS_KEY,
+    COORDINATORS_KEY,
+    NOTIFIER_KEY,
+    NUMBER_ENTITIES_KEY,
+    SPOOL_INDEX_KEY,
+    STATS_KEY,
+    TRAY_IDENTIFIERS,
+)
+from .index import SpoolIndex, normalize_identifier
+from .options_flow import (
+    AMS_ACTIVE,
+    DEFAULT_LIVE_UPDATE_INTERVAL,
+    LIVE_TRACKING,
+    LIVE_UPDATE_INTERVAL,
+    USAGE_GRAMS,
+    USAGE_METERS,
+    get_ams_trays,
+)
+from .stats import PerformanceStats, timed
+from .usage import (
+    SpoolUsage,
+    async_apply_usage,
+    async_is_duplicate,
+    async_plan_usage,
+    async_record_usage,
+    async_resolve_spool,
+)
+
+_LOGGER = logging.getLogger(__package__)
+
+
+class AmsCoordinator:
+    """Route the filament used by one printer's AMS to the right spool.
+
+    Every config entry pointing at the same printer shares one coordinator,
+    so the printer entities are subscribed once and each print is deducted
+    exactly once. A printer may have any number of trays across its AMS
+    units; each tray has its own subscription and routing entry, keyed by
+    entity id, so attaching a spool only subscribes the trays it adds.
+
+    Without live tracking, the usage of a print is split across the trays
+    it used when the AMS turns off. Each tray only keeps running totals of
+    its active time and of how much the usage sensors grew while it was
+    active, so a print swapping trays thousands of times stays small.
+
+    When live tracking is enabled, usage sensor changes during the print are
+    queued for the active spool and applied at most once per update interval.
+    The usage applied so far is checkpointed with the spool values it left,
+    so a restart mid-print resumes without counting it twice, even when the
+    spool snapshot was saved at another time than the checkpoint.
+
+    Prints are journaled under the config entry of the printer and the time
+    the AMS turned on, which stays the same however often the AMS drops out
+    during the print, so a print that was already deducted is ignored.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        ams_active: str,
+        usage_grams: str,
+        usage_meters: str,
+    ) -> None:
+        """Initialize the coordinator."""
+        self.hass = hass
+        self.ams_active = ams_active
+        self.usage_grams = usage_grams
+        self.usage_meters = usage_meters
+        self._stats: PerformanceStats = hass.data[STATS_KEY]
+        self._entry_trays: dict[str, tuple[str, ...]] = {}
+        self._entry_live: dict[str, int] = {}
+        self._tray_unsubs: dict[str, CALLBACK_TYPE] = {}
+        self._routes: dict[str, str | None] = {}
+        self._active_tray: str | None = None
+        self._unsub_ams: CALLBACK_TYPE | None = None
+        self._unsub_index: CALLBACK_TYPE | None = None
+        self._unsub_usage: CALLBACK_TYPE | None = None
+        self._unsub_flush: CALLBACK_TYPE | None = None
+        self._unsub_resume: CALLBACK_TYPE | None = None
+        # When the AMS turned on for the running print, part of its job key
+        self._job_started: str | None = None
+        # Live tracking state of the running print
+        self._job_active = False
+        self._job_applied = [0.0, 0.0]
+        self._job_spools: dict[str, list[float]] = {}
+        self._pending: dict[str, list[float]] = {}
+        # Tray timeline of the running print: [seconds, grams, meters] per tray
+        self._timeline: dict[str, list[float]] | None = None
+        self._segment: tuple[str, float, float, float] | None = None
+
+    @property
+    def live_interval(self) -> int | None:
+        """Return the live update interval, or None when live tracking is off."""
+        return min(self._entry_live.values(), default=None)
+
+    @callback
+    def as_dict(self) -> dict[str, Any]:
+        """Return the coordinator state as diagnostics data."""
+        return {
+            "ams_active": self.ams_active,
+            "usage_grams": self.usage_grams,
+            "usage_meters": self.usage_meters,
+            "spools": {
+                entry_id: list(trays) for entry_id, trays in self._entry_trays.items()
+            },
+            "trays": sorted(self._tray_unsubs),
+            "routes": dict(self._routes),
+            "active_tray": self._active_tray,
+            "live_interval": self.live_interval,
+            "job_active": self._job_active,
+            "job_started": self._job_started,
+            "job_applied": list(self._job_applied),
+            "pending": {
+                entry_id: list(usage) for entry_id, usage in self._pending.items()
+            },
+            "timeline": None
+            if self._timeline is None
+            else {tray_id: list(totals) for tray_id, totals in self._timeline.items()},
+        }
+
+    @callback
+    def async_start(self) -> None:
+        """Subscribe to the AMS status and spool index."""
+        index: SpoolIndex = self.hass.data[SPOOL_INDEX_KEY]
+        self._unsub_index = index.async_add_listener(self._async_clear_routes)
+        self._unsub_ams = async_track_state_change_event(
+            self.hass, [self.ams_active], self._ams_status_changed
+        )
+
+    @callback
+    def async_stop(self) -> None:
+        """Drop every subscription of the coordinator."""
+        if self._job_active:
+            # The checkpoint lets the next coordinator pick the print up
+            self._async_flush()
+        for unsub in self._tray_unsubs.values():
+            unsub()
+        self._tray_unsubs.clear()
+        for unsub in (
+            self._unsub_ams,
+            self._unsub_index,
+            self._unsub_usage,
+            self._unsub_flush,
+            self._unsub_resume,
+        ):
+            if unsub is not None:
+                unsub()
+        self._unsub_ams = self._unsub_index = None
+        self._unsub_usage = self._unsub_flush = self._unsub_resume = None
+
+    @callback
+    def async_attach(
+        self, entry_id: str, trays: tuple[str, ...], live_interval: int | None
+    ) -> None:
+        """Register the trays a config entry configured for this printer."""
+        self._entry_trays[entry_id] = trays
+        if live_interval is None:
+            self._entry_live.pop(entry_id, None)
+        else:
+            self._entry_live[entry_id] = live_interval
+        self._async_update_trays()
+        self._async_update_live_tracking()
+
+    @callback
+    def async_detach(self, entry_id: str) -> bool:
+        """Forget a config entry, returning True when none is left."""
+        if self._entry_trays.pop(entry_id, None) is None:
+            return False
+        self._entry_live.pop(entry_id, None)
+        self._async_update_trays()
+        self._async_update_live_tracking()
+        return not self._entry_trays
+
+    @callback
+    def async_set_usage_sensors(self, usage_grams: str, usage_meters: str) -> None:
+        """Follow other print usage sensors, keeping the running print."""
+        self.usage_grams = usage_grams
+        self.usage_meters = usage_meters
+        if self._unsub_usage is not None:
+            self._unsub_usage()
+            self._unsub_usage = async_track_state_change_event(
+                self.hass, [usage_grams, usage_meters], self._usage_changed
+            )
+
+    @property
+    def trays(self) -> tuple[str, ...]:
+        """Return the trays of every attached config entry."""
+        return tuple(sorted(self._tray_unsubs))
+
+    @property
+    def entry_ids(self) -> set[str]:
+        """Return the config entries attached to this printer."""
+        return set(self._entry_trays)
+
+    @callback
+    def async_route(self, tray_id: str) -> str | None:
+        """Return the spool entry id loaded in a tray."""
+        if tray_id not in self._routes:
+            self._routes[tray_id] = self._async_resolve_tray(tray_id)
+        return self._routes[tray_id]
+
+    @callback
+    def _async_resolve_tray(self, tray_id: str) -> str | None:
+        """Find the spool in a tray by its identifiers, or else by its color.
+
+        A spool found by color is bound to the identifiers of the tray when
+        it has none yet, so the next lookup is direct.
+        """
+        state = self.hass.states.get(tray_id)
+        attributes = state.attributes if state else {}
+        index: SpoolIndex = self.hass.data[SPOOL_INDEX_KEY]
+        identifiers = {
+            key: identifier
+            for key in TRAY_IDENTIFIERS
+            if normalize_identifier(identifier := attributes.get(key))
+        }
+        for identifier in identifiers.values():
+            if (entry_id := index.async_lookup_identifier(identifier)) is not None:
+                self._stats.async_increment("lookup_identifier")
+                return entry_id
+
+        try:
+            entry_id = async_resolve_spool(self.hass, attributes.get("color"))
+        except ServiceValidationError as err:
+            _LOGGER.warning("Cannot route tray %s: %s", tray_id, err)
+            return None
+        entry = self.hass.config_entries.async_get_entry(entry_id)
+        if (
+            identifiers
+            and entry is not None
+            and not any(entry.options.get(key) for key in TRAY_IDENTIFIERS)
+        ):
+            _LOGGER.info("Binding %s to the spool in %s", entry.title, tray_id)
+            self.hass.config_entries.async_update_entry(
+                entry, options={**entry.options, **identifiers}
+            )
+        return entry_id
+
+    @callback
+    def _async_clear_routes(self) -> None:
+        """Resolve every tray again after the spools changed."""
+        self._routes.clear()
+
+    @callback
+    def _async_update_trays(self) -> None:
+        """Subscribe to added trays and drop the ones no spool uses anymore."""
+        trays = {tray for trays in self._entry_trays.values() for tray in trays}
+        for tray_id in self._tray_unsubs.keys() - trays:
+            self._tray_unsubs.pop(tray_id)()
+            self._routes.pop(tray_id, None)
+        for tray_id in trays - self._tray_unsubs.keys():
+            self._tray_unsubs[tray_id] = async_track_state_change_event(
+                self.hass, tray_id, self._tray_state_changed
+            )
+
+    @callback
+    def _async_update_live_tracking(self) -> None:
+        """Follow the usage sensors only while live tracking is enabled.
+
+        A print tracked live when live tracking is turned off is still
+        finished live, while a print running when it is turned on is
+        carried over to live tracking.
+        """
+        if self.live_interval is None and self._unsub_usage is not None:
+            self._unsub_usage()
+            self._unsub_usage = None
+            if self._unsub_resume is not None:
+                self._unsub_resume()
+                self._unsub_resume = None
+        elif self.live_interval is not None and self._unsub_usage is None:
+            self._unsub_usage = async_track_state_change_event(
+                self.hass, [self.usage_grams, self.usage_meters], self._usage_changed
+            )
+            if self._timeline is not None:
+                self._async_convert_timeline()
+            self._unsub_resume = async_at_started(self.hass, self._async_resume_job)
+
+    @callback
+    @timed("listener.tray")
+    def _tray_state_changed(self, event: Event) -> None:
+        """Track last tray that became active."""
+        tray_id = event.data["entity_id"]
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("Tray %s state changed: %s", tray_id, event.data)
+        # The tray may hold a different spool now
+        self._routes.pop(tray_id, None)
+        new_state = event.data.get("new_state")
+        if new_state and new_state.attributes.get("active") is True:
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                _LOGGER.debug("Tray %s is now active", tray_id)
+            if self._job_active and self._active_tray != tray_id:
+                # Charge what was used so far to the tray that used it
+                self._async_track_usage()
+            self._active_tray = tray_id
+            if self._timeline is not None and (
+                self._segment is None or self._segment[0] != tray_id
+            ):
+                self._async_open_segment(tray_id)
+        elif self._segment is not None and self._segment[0] == tray_id:
+            self._async_close_segment()
+
+    @callback
+    @timed("listener.ams")
+    def _ams_status_changed(self, event: Event) -> None:
+        """Handle AMS status going from on to off."""
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("AMS status changed: %s", event.data)
+        old_state = event.data.get("old_state")
+        new_state = event.data.get("new_state")
+        if not old_state or not new_state:
+            return
+        if new_state.state == "off" and self._job_active:
+            self._async_finish_job()
+            return
+        if new_state.state == "on" and old_state.state != "on":
+            if self._job_active or self._timeline is not None:
+                # The AMS dropped out and came back during the print
+                _LOGGER.debug("Resuming print on %s", self.ams_active)
+                return
+            started = new_state.last_changed.isoformat()
+            if self.live_interval is None:
+                self._async_start_timeline(started)
+            else:
+                self._async_start_job(started)
+            return
+        if self.live_interval is not None or new_state.state != "off":
+            return
+        if old_state.state != "on" and self._timeline is None:
+            return
+
+        # Without a timeline the print started before we were listening
+        started = self._job_started or old_state.last_changed.isoformat()
+        self._job_started = None
+        active_tray, self._active_tray = self._active_tray, None
+        if (deductions := self._async_timeline_deductions(active_tray)) is None:
+            _LOGGER.warning("No tray was recently active at AMS shutdown")
+            self._stats.async_increment("deductions_skipped")
+            return
+        if not deductions:
+            return
+        key = self._job_key(started)
+        if async_is_duplicate(self.hass, key):
+            return
+        try:
+            usages = async_plan_usage(
+                self.hass,
+                [(entry_id, *amounts) for entry_id, amounts in deductions.items()],
+            )
+        except ServiceValidationError as err:
+            _LOGGER.warning("%s", err)
+            self._stats.async_increment("deductions_failed")
+            return
+        async_apply_usage(self.hass, usages, key=key)
+        self.hass.data[NOTIFIER_KEY].async_queue(usages, self.ams_active, key)
+
+    @callback
+    def _async_timeline_deductions(
+        self, active_tray: str | None
+    ) -> dict[str, list[float]] | None:
+        """Split the usage so far across the spools of the trays the print used.
+
+        Returns None when no tray is known to have been used, and ends the
+        timeline of the print.
+        """
+        shares = self._async_split_usage()
+        if not shares:
+            if not active_tray:
+                return None
+            # The print started before we were listening
+            shares = {active_tray: (1.0, 1.0)}
+
+        weight = self._usage(self.usage_grams)
+        meters = self._usage(self.usage_meters)
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug(
+                "Print on %s used: trays=%s, weight=%s, meters=%s",
+                self.ams_active,
+                shares,
+                weight,
+                meters,
+            )
+        deductions: dict[str, list[float]] = {}
+        for tray_id, (weight_share, meters_share) in shares.items():
+            if (entry_id := self.async_route(tray_id)) is None:
+                self._stats.async_increment("deductions_skipped")
+                continue
+            amounts = deductions.setdefault(entry_id, [0.0, 0.0])
+            amounts[0] += weight * weight_share
+            amounts[1] += meters * meters_share
+        return deductions
+
+    @callback
+    def _async_convert_timeline(self) -> None:
+        """Track a print started without live tracking live from now on.
+
+        What the print used so far is split across its trays as usual and
+        applied as the first update of the live job.
+        """
+        started = self._job_started or dt_util.utcnow().isoformat()
+        self._job_started = None
+        deductions = self._async_timeline_deductions(self._active_tray)
+        self._async_start_job(started)
+        if not self._job_active or deductions is None:
+            # Usage of an unknown tray waits for the next active tray
+            return
+        self._job_applied = [
+            self._usage(self.usage_grams),
+            self._usage(self.usage_meters),
+        ]
+        self._pending = deductions
+        self._async_flush()
+
+    @callback
+    def _async_start_timeline(self, started: str) -> None:
+        """Start recording which trays a print uses."""
+        self._job_started = started
+        self._timeline = {}
+        self._segment = None
+        if self._active_tray is not None:
+            self._async_open_segment(self._active_tray)
+
+    @callback
+    def _async_open_segment(self, tray_id: str) -> None:
+        """Start counting a tray as the one in use."""
+        self._async_close_segment()
+        self._segment = (
+            tray_id,
+            time.monotonic(),
+            self._usage(self.usage_grams),
+            self._usage(self.usage_meters),
+        )
+
+    @callback
+    def _async_close_segment(self) -> None:
+        """Add the time and usage since the active tray was loaded to its totals."""
+        if self._segment is None or self._timeline is None:
+            return
+        tray_id, start, grams, meters = self._segment
+        self._segment = None
+        totals = self._timeline.setdefault(tray_id, [0.0, 0.0, 0.0])
+        totals[0] += time.monotonic() - start
+        totals[1] += _growth(self._usage(self.usage_grams), grams)
+        totals[2] += _growth(self._usage(self.usage_meters), meters)
+
+    @callback
+    def _async_split_usage(self) -> dict[str, tuple[float, float]]:
+        """Return the weight and length shares of every tray the print used.
+
+        A share follows how much the usage sensor grew while the tray was
+        active, when it grew for more than one tray. Otherwise the sensor
+        only reported a total, and the share follows the active time.
+        """
+        self._async_close_segment()
+        timeline, self._timeline = self._timeline or {}, None
+        shares: dict[str, list[float]] = {tray_id: [0.0, 0.0] for tray_id in timeline}
+        for i in (0, 1):
+            column = 1 + i
+            if sum(totals[column] > 0 for totals in timeline.values()) < 2:
+                column = 0
+            if not (total := sum(totals[column] for totals in timeline.values())):
+                return {}
+            for tray_id, totals in timeline.items():
+                shares[tray_id][i] = totals[column] / total
+        return {
+            tray_id: (weight_share, meters_share)
+            for tray_id, (weight_share, meters_share) in shares.items()
+            if weight_share or meters_share
+        }
+
+    @callback
+    def _async_resume_job(self, _hass: HomeAssistant) -> None:
+        """Pick up a print that was running before a restart or reload."""
+        self._unsub_resume = None
+        if self._job_active:
+            return
+        checkpoints: JobCheckpoints = self.hass.data[CHECKPOINTS_KEY]
+        checkpoint = checkpoints.async_get(self.ams_active)
+        state = self.hass.states.get(self.ams_active)
+        if checkpoint is None:
+            if state is not None and state.state == "on":
+                self._async_start_job(state.last_changed.isoformat())
+            return
+
+        _LOGGER.debug("Resuming live print on %s: %s", self.ams_active, checkpoint)
+        self._job_active = True
+        # Checkpoints saved before job keys were stable have no start time
+        self._job_started = checkpoint.get("started") or dt_util.utcnow().isoformat()
+        self._job_applied = list(checkpoint["applied"])
+        self._job_spools = {
+            entry_id: list(totals) for entry_id, totals in checkpoint["spools"].items()
+        }
+        self._pending = {
+            entry_id: list(amounts)
+            for entry_id, amounts in checkpoint.get("pending", {}).items()
+        }
+        self._active_tray = self._active_tray or checkpoint.get("tray")
+        self._async_reconcile(checkpoint.get("remaining", {}))
+        if state is not None and state.state == "off":
+            # The print ended while we were not listening
+            self._async_finish_job()
+        else:
+            self._async_track_usage()
+            self._async_flush()
+
+    @callback
+    def _async_reconcile(self, remaining: dict[str, list[float]]) -> None:
+        """Line the spools up with the values the checkpoint left them at.
+
+        The checkpoint and the spool snapshot are stored separately, so after
+        a crash either one can be behind. Usage a spool misses is deducted
+        again, and usage only the spool holds is counted as applied.
+        """
+        entities = self.hass.data[NUMBER_ENTITIES_KEY]
+        missing: list[tuple[str, float, float]] = []
+        for entry_id, values in remaining.items():
+            spool = entities.get(entry_id, {})
+            if "weight" not in spool or "lenght" not in spool:
+                continue
+            current = (spool["weight"].native_value, spool["lenght"].native_value)
+            extra = [value - current[i] for i, value in enumerate(values)]
+            if not any(extra):
+                continue
+            _LOGGER.debug("Reconciling %s with the checkpoint: %s", entry_id, extra)
+            totals = self._job_spools.setdefault(entry_id, [0.0, 0.0])
+            for i, amount in enumerate(extra):
+                if amount > 0:
+                    totals[i] += amount
+                    self._job_applied[i] += amount
+            missing.append((entry_id, max(-extra[0], 0.0), max(-extra[1], 0.0)))
+        if not missing:
+            return
+        try:
+            usages = async_plan_usage(self.hass, missing)
+        except ServiceValidationError as err:
+            _LOGGER.warning("%s", err)
+            return
+        async_apply_usage(self.hass, usages, record=False)
+
+    @callback
+    def _async_start_job(self, started: str) -> None:
+        """Start tracking a new print live, unless it was already deducted."""
+        if async_is_duplicate(self.hass, self._job_key(started)):
+            return
+        _LOGGER.debug("Live tracking a new print on %s", self.ams_active)
+        self._job_active = True
+        self._job_started = started
+        self._job_applied = [0.0, 0.0]
+        self._job_spools = {}
+        self._pending = {}
+        self._async_save_checkpoint()
+
+    @callback
+    @timed("listener.usage")
+    def _usage_changed(self, event: Event) -> None:
+        """Handle a change of the print usage sensors."""
+        if self._job_active:
+            self._async_track_usage()
+
+    @callback
+    def _async_track_usage(self) -> None:
+        """Queue the usage since the last update for the active spool."""
+        usage = [self._usage(self.usage_grams), self._usage(self.usage_meters)]
+        delta = [0.0, 0.0]
+        for i, value in enumerate(usage):
+            delta[i] = _growth(value, self._job_applied[i])
+        if delta[0] <= 0 and delta[1] <= 0:
+            return
+        if self._active_tray is None:
+            # Keep the usage unapplied until we know which tray it came from
+            return
+        if (entry_id := self.async_route(self._active_tray)) is None:
+            return
+
+        self._job_applied = usage
+        pending = self._pending.setdefault(entry_id, [0.0, 0.0])
+        pending[0] += max(delta[0], 0.0)
+        pending[1] += max(delta[1], 0.0)
+        if self._unsub_flush is None:
+            self._unsub_flush = async_call_later(
+                self.hass, self.live_interval or 0, self._async_scheduled_flush
+            )
+
+    @callback
+    def _async_scheduled_flush(self, _now: datetime) -> None:
+        """Apply queued usage once the update interval passed."""
+        self._unsub_flush = None
+        self._async_flush()
+
+    @callback
+    def _async_flush(self) -> None:
+        """Apply the queued usage to the spools with one write per spool."""
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+            self._unsub_flush = None
+        pending, self._pending = self._pending, {}
+        if pending:
+            try:
+                usages = async_plan_usage(
+                    self.hass,
+                    [(entry_id, *amounts) for entry_id, amounts in pending.items()],
+                )
+            except ServiceValidationError as err:
+                _LOGGER.warning("%s", err)
+                self._stats.async_increment("deductions_failed")
+                # Keep the usage queued and retry on the next flush
+                for entry_id, amounts in pending.items():
+                    queued = self._pending.setdefault(entry_id, [0.0, 0.0])
+                    queued[0] += amounts[0]
+                    queued[1] += amounts[1]
+                self._async_save_checkpoint()
+                return
+            # The ledger gets one record per spool when the print finishes
+            async_apply_usage(self.hass, usages, record=False)
+            for usage in usages:
+                totals = self._job_spools.setdefault(usage.entry_id, [0.0, 0.0])
+                totals[0] += usage.weight
+                totals[1] += usage.meters
+        self._async_save_checkpoint()
+
+    @callback
+    def _async_finish_job(self) -> None:
+        """Apply the last usage of a live tracked print and report it."""
+        self._async_track_usage()
+        self._async_flush()
+        self._job_active = False
+        self._active_tray = None
+        checkpoints: JobCheckpoints = self.hass.data[CHECKPOINTS_KEY]
+        checkpoints.async_remove(self.ams_active)
+        key = self._job_key(self._job_started or dt_util.utcnow().isoformat())
+        self._job_started = None
+
+        job_spools, self._job_spools = self._job_spools, {}
+        if not job_spools:
+            _LOGGER.warning("No usage was tracked for the print on %s", self.ams_active)
+            self._stats.async_increment("deductions_skipped")
+            return
+        try:
+            current = async_plan_usage(
+                self.hass, [(entry_id, 0.0, 0.0) for entry_id in job_spools]
+            )
+        except ServiceValidationError as err:
+            _LOGGER.warning("%s", err)
+            return
+        usages: list[SpoolUsage] = [
+            replace(
+                usage,
+                old_weight=usage.old_weight + job_spools[usage.entry_id][0],
+                old_meters=usage.old_meters + job_spools[usage.entry_id][1],
+                weight=job_spools[usage.entry_id][0],
+                meters=job_spools[usage.entry_id][1],
+            )
+            for usage in current
+        ]
+        async_record_usage(self.hass, usages, key=key)
+        self.hass.data[NOTIFIER_KEY].async_queue(usages, self.ams_active, key)
+
+    @callback
+    def _async_save_checkpoint(self) -> None:
+        """Persist what was applied so far for the running print."""
+        numbers = self.hass.data[NUMBER_ENTITIES_KEY]
+        checkpoint: dict[str, Any] = {
+            "applied": list(self._job_applied),
+            "spools": {
+                entry_id: list(totals) for entry_id, totals in self._job_spools.items()
+            },
+            "pending": {
+                entry_id: list(amounts) for entry_id, amounts in self._pending.items()
+            },
+            "tray": self._active_tray,
+            "started": self._job_started,
+            # What the spools were left at, to reconcile with the snapshot
+            "remaining": {
+                entry_id: [
+                    entities["weight"].native_value,
+                    entities["lenght"].native_value,
+                ]
+                for entry_id in self._job_spools
+                if "weight" in (entities := numbers.get(entry_id, {}))
+                and "lenght" in entities
+            },
+        }
+        self.hass.data[CHECKPOINTS_KEY].async_set(self.ams_active, checkpoint)
+
+    def _job_key(self, started: str) -> str:
+        """Return the journal key of the print the AMS turned on for at a time."""
+        entity = er.async_get(self.hass).async_get(self.ams_active)
+        printer = entity.config_entry_id if entity is not None else None
+        return f"{printer or self.ams_active}@{started}"
+
+    def _usage(self, entity_id: str) -> float:
+        """Return the numeric value of a print usage sensor."""
+        state = self.hass.states.get(entity_id)
+        try:
+            return float(state.state or 0)
+        except (AttributeError, TypeError, ValueError):
+            _LOGGER.warning("Invalid print usage value in %s", entity_id)
+            return 0.0
+
+
+def _growth(value: float, start: float) -> float:
+    """Return how much a usage sensor grew since it read start.
+
+    A lower reading means the sensor restarted counting from zero.
+    """
+    return value - start if value >= start else value
+
+
+@callback
+def async_setup_printer(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Attach a config entry to the coordinator of its printer.
+
+    This also applies changed options in place: the entry is only detached
+    from a printer it no longer uses, so the coordinator it keeps, and the
+    print it is tracking, stay untouched and only changed trays are
+    subscribed or dropped.
+    """
+    options = entry.options
+    ams_status_entity = options.get(AMS_ACTIVE)
+    usage_grams_entity = options.get(USAGE_GRAMS)
+    usage_meters_entity = options.get(USAGE_METERS)
+    ams_trays = get_ams_trays(options)
+    live_interval = (
+        options.get(LIVE_UPDATE_INTERVAL, DEFAULT_LIVE_UPDATE_INTERVAL)
+        if options.get(LIVE_TRACKING)
+        else None
+    )
+    if not (
+        ams_status_entity and usage_grams_entity and usage_meters_entity and ams_trays
+    ):
+        ams_status_entity = None
+
+    async_unload_printer(hass, entry.entry_id, keep=ams_status_entity)
+    if ams_status_entity is None:
+        return
+
+    coordinators: dict[str, AmsCoordinator] = hass.data[COORDINATORS_KEY]
+    if (coordinator := coordinators.get(ams_status_entity)) is None:
+        _LOGGER.debug("Creating AMS coordinator for %s", ams_status_entity)
+        coordinator = coordinators[ams_status_entity] = AmsCoordinator(
+            hass, ams_status_entity, usage_grams_entity, usage_meters_entity
+        )
+        coordinator.async_start()
+    elif (coordinator.usage_grams, coordinator.usage_meters) != (
+        usage_grams_entity,
+        usage_meters_entity,
+    ):
+        if coordinator.entry_ids <= {entry.entry_id}:
+            coordinator.async_set_usage_sensors(usage_grams_entity, usage_meters_entity)
+        else:
+            _LOGGER.warning(
+                "%s uses different print usage sensors than other spools on %s, "
+                "keeping %s and %s",
+                entry.title,
+                ams_status_entity,
+                coordinator.usage_grams,
+                coordinator.usage_meters,
+            )
+    coordinator.async_attach(entry.entry_id, ams_trays, live_interval)
+
+
+@callback
+def async_unload_printer(
+    hass: HomeAssistant, entry_id: str, keep: str | None = None
+) -> None:
+    """Detach a config entry, stopping coordinators nobody uses anymore.
+
+    The coordinator of the printer `keep` is left attached.
+    """
+    coordinators: dict[str, AmsCoordinator] = hass.data[COORDINATORS_KEY]
+    for ams_status_entity, coordinator in list(coordinators.items()):
+        if ams_status_entity != keep and coordinator.async_detach(entry_id):
+            coordinator.async_stop()
+            del coordinators[ams_status_entity]
@@ -0,0 +1,30 @@
+"""Diagnostics support for Filament Tracker."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import COORDINATORS_KEY, STATS_KEY
+from .coordinator import AmsCoordinator
+from .options_flow import AMS_ACTIVE
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: AmsCoordinator | None = hass.data[COORDINATORS_KEY].get(
+        entry.options.get(AMS_ACTIVE)
+    )
+    return {
+        "entry": {
+            "title": entry.title,
+            "data": dict(entry.data),
+            "options": dict(entry.options),
+        },
+        "printer": coordinator.as_dict() if coordinator else None,
+        "stats": hass.data[STATS_KEY].as_dict(),
+    }
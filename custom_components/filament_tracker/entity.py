@@ -0,0 +1,42 @@
+"""Base entity for Filament Tracker."""
+
+from __future__ import annotations
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_NAME
+from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
+from homeassistant.helpers.entity import Entity
+
+from .const import CONF_BRAND, CONF_MODEL, DOMAIN
+
+# Device of the entities covering the whole inventory, whichever spool
+# provides them
+INVENTORY_DEVICE_INFO = DeviceInfo(
+    identifiers={(DOMAIN, "inventory")},
+    name="Filament Inventory",
+    manufacturer="Filament Tracker",
+    entry_type=DeviceEntryType.SERVICE,
+)
+
+
+def build_device_info(config_entry: ConfigEntry) -> DeviceInfo:
+    """Return the device info grouping the entities of a spool."""
+    return DeviceInfo(
+        identifiers={(DOMAIN, config_entry.entry_id)},
+        name=config_entry.data[CONF_NAME],
+        manufacturer=config_entry.data.get(CONF_BRAND) or "Filament Tracker",
+        model=config_entry.data.get(CONF_MODEL) or "Generic",
+    )
+
+
+class FilamentTrackerEntity(Entity):
+    """Entity belonging to a filament spool device."""
+
+    def __init__(
+        self, config_entry: ConfigEntry, device_info: DeviceInfo, key: str, label: str
+    ) -> None:
+        """Initialize the spool entity."""
+        self._entry_id = config_entry.entry_id
+        self._attr_unique_id = f"{config_entry.entry_id}_{key}"
+        self._attr_name = f"{config_entry.data[CONF_NAME]} {label}"
+        self._attr_device_info = device_info
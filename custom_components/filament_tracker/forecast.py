@@ -0,0 +1,291 @@
+"""Run-out forecasts for Filament Tracker."""
+
+from __future__ import annotations
+
+from asyncio import Handle
+from collections.abc import Iterable
+from datetime import datetime, timedelta
+from math import exp
+import time
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
+
+from .const import CONF_TYPE, DOMAIN, STATS_KEY
+
+if TYPE_CHECKING:
+    from .usage import SpoolUsage
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.forecasts"
+SAVE_DELAY = 30
+
+DAY = 86400
+# Time constant of the exponentially weighted usage rate
+RATE_WINDOW = 14 * DAY
+# Rates decay while nothing is printed, so forecasts are refreshed hourly
+REFRESH_INTERVAL = timedelta(hours=1)
+
+KIND_SPOOL = "spool"
+KIND_TYPE = "type"
+
+Key = tuple[str, str]
+
+
+class MedianSketch:
+    """Streaming median estimate in constant memory (the P² algorithm)."""
+
+    __slots__ = ("count", "desired", "heights", "positions")
+
+    _INCREMENTS = (0.0, 0.25, 0.5, 0.75, 1.0)
+
+    def __init__(self, data: dict[str, Any] | None = None) -> None:
+        """Initialize the sketch, optionally from stored data."""
+        data = data or {}
+        self.count: int = data.get("count", 0)
+        self.heights: list[float] = data.get("heights", [])
+        self.positions: list[int] = data.get("positions", [1, 2, 3, 4, 5])
+        self.desired: list[float] = data.get("desired", [1.0, 2.0, 3.0, 4.0, 5.0])
+
+    def add(self, value: float) -> None:
+        """Add an observation."""
+        self.count += 1
+        heights = self.heights
+        if self.count <= 5:
+            heights.append(value)
+            heights.sort()
+            return
+
+        if value < heights[0]:
+            heights[0] = value
+            cell = 0
+        elif value >= heights[4]:
+            heights[4] = value
+            cell = 3
+        else:
+            cell = next(i for i in range(4) if heights[i] <= value < heights[i + 1])
+        positions = self.positions
+        for i in range(cell + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self._INCREMENTS[i]
+
+        for i in (1, 2, 3):
+            offset = self.desired[i] - positions[i]
+            if (offset >= 1 and positions[i + 1] - positions[i] > 1) or (
+                offset <= -1 and positions[i - 1] - positions[i] < -1
+            ):
+                step = 1 if offset > 0 else -1
+                height = self._parabolic(i, step)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = heights[i] + step * (heights[i + step] - heights[i]) / (
+                        positions[i + step] - positions[i]
+                    )
+                heights[i] = height
+                positions[i] += step
+
+    def _parabolic(self, i: int, step: int) -> float:
+        """Return the piecewise-parabolic adjustment of a marker height."""
+        q, n = self.heights, self.positions
+        return q[i] + step / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + step) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - step) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    @property
+    def median(self) -> float | None:
+        """Return the estimated median."""
+        if not self.count:
+            return None
+        if self.count <= 5:
+            return self.heights[(self.count - 1) // 2]
+        return self.heights[2]
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the sketch as storage data."""
+        return {
+            "count": self.count,
+            "heights": list(self.heights),
+            "positions": list(self.positions),
+            "desired": list(self.desired),
+        }
+
+
+class UsageForecast:
+    """Exponentially weighted usage rate and median job size."""
+
+    __slots__ = ("first", "last", "sketch", "total")
+
+    def __init__(self, data: dict[str, Any] | None = None) -> None:
+        """Initialize the forecast, optionally from stored data."""
+        data = data or {}
+        self.first: float | None = data.get("first")
+        self.last: float | None = data.get("last")
+        self.total: float = data.get("total", 0.0)
+        self.sketch = MedianSketch(data.get("sketch"))
+
+    def add(self, now: float, weight: float, job: bool = True) -> None:
+        """Add the grams used by a job, or given back when a job is undone.
+
+        Corrections that are not jobs of their own only move the usage rate.
+        """
+        if self.last is None:
+            self.first = now
+        else:
+            self.total *= exp(-(now - self.last) / RATE_WINDOW)
+        self.last = now
+        self.total = max(self.total + weight, 0.0)
+        if job and weight > 0:
+            self.sketch.add(weight)
+
+    def rate(self, now: float) -> float | None:
+        """Return the usage rate in grams per day."""
+        if self.last is None or self.first is None:
+            return None
+        total = self.total * exp(-max(now - self.last, 0) / RATE_WINDOW)
+        # Without a full window of history the weighted sum is still filling up
+        age = max(now - self.first, DAY)
+        return total / (RATE_WINDOW / DAY) / (1 - exp(-age / RATE_WINDOW))
+
+    def values(self, remaining: float | None, now: float) -> dict[str, float | None]:
+        """Return the rate, days until empty and prints left on a remaining weight."""
+        rate = self.rate(now)
+        median = self.sketch.median
+        return {
+            "rate": None if rate is None else round(rate, 2),
+            "days": round(remaining / rate, 1)
+            if rate and remaining is not None
+            else None,
+            "prints": int(remaining // median)
+            if median and remaining is not None
+            else None,
+        }
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the forecast as storage data."""
+        return {
+            "first": self.first,
+            "last": self.last,
+            "total": self.total,
+            "sketch": self.sketch.as_dict(),
+        }
+
+
+class UsageForecasts:
+    """Run-out forecasts per spool and per filament type.
+
+    Every recorded deduction updates the forecasts of its spool and type in
+    constant time and memory, so the recorder history is never read.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize empty forecasts."""
+        self._hass = hass
+        self._store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._forecasts: dict[Key, UsageForecast] = {}
+        self._listeners: dict[Key, list[CALLBACK_TYPE]] = {}
+        self._dirty: set[Key] = set()
+        self._notify_handle: Handle | None = None
+        self._unsub_refresh: CALLBACK_TYPE | None = None
+
+    async def async_load(self) -> None:
+        """Load the forecasts and start refreshing them."""
+        if (data := await self._store.async_load()) is not None:
+            for kind in (KIND_SPOOL, KIND_TYPE):
+                for key, forecast in data.get(kind, {}).items():
+                    self._forecasts[(kind, key)] = UsageForecast(forecast)
+        self._unsub_refresh = async_track_time_interval(
+            self._hass, self._async_refresh, REFRESH_INTERVAL
+        )
+        self._hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, self._async_stop)
+
+    @callback
+    def _async_stop(self, _event: Event) -> None:
+        """Stop refreshing the forecasts."""
+        if self._unsub_refresh is not None:
+            self._unsub_refresh()
+            self._unsub_refresh = None
+        if self._notify_handle is not None:
+            self._notify_handle.cancel()
+            self._notify_handle = None
+
+    @callback
+    def async_values(
+        self, key: Key, remaining: float | None
+    ) -> dict[str, float | None]:
+        """Return the forecast values of a spool or type."""
+        if (forecast := self._forecasts.get(key)) is None:
+            return {"rate": None, "days": None, "prints": None}
+        return forecast.values(remaining, time.time())
+
+    @callback
+    def async_add_listener(
+        self, key: Key, update_callback: CALLBACK_TYPE
+    ) -> CALLBACK_TYPE:
+        """Listen for changes to the forecast of a spool or type."""
+        listeners = self._listeners.setdefault(key, [])
+        listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def async_record(self, usages: Iterable[SpoolUsage], jobs: bool = True) -> None:
+        """Add recorded deductions to the forecasts.
+
+        Negative usage, from an undone job, is taken back from the rates.
+        """
+        now = time.time()
+        for usage in usages:
+            if not usage.weight:
+                continue
+            keys: list[Key] = [(KIND_SPOOL, usage.entry_id)]
+            if entry := self._hass.config_entries.async_get_entry(usage.entry_id):
+                keys.append((KIND_TYPE, entry.data.get(CONF_TYPE) or "PLA"))
+            for key in keys:
+                if (forecast := self._forecasts.get(key)) is None:
+                    if usage.weight < 0:
+                        continue
+                    forecast = self._forecasts[key] = UsageForecast()
+                forecast.add(now, usage.weight, jobs)
+                self._dirty.add(key)
+        if self._dirty:
+            if self._notify_handle is None:
+                self._notify_handle = self._hass.loop.call_soon(self._async_notify)
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def async_remove_spool(self, entry_id: str) -> None:
+        """Forget the forecast of a deleted spool."""
+        if self._forecasts.pop((KIND_SPOOL, entry_id), None) is not None:
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _async_refresh(self, _now: datetime) -> None:
+        """Update every forecast as its rate decays."""
+        self._dirty.update(self._listeners)
+        self._async_notify()
+
+    @callback
+    def _async_notify(self) -> None:
+        """Tell the listeners of every changed forecast."""
+        self._notify_handle = None
+        dirty, self._dirty = self._dirty, set()
+        for key in dirty:
+            for update_callback in list(self._listeners.get(key, ())):
+                update_callback()
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the forecasts to store."""
+        self._hass.data[STATS_KEY].async_increment("storage_flush.forecasts")
+        data: dict[str, dict[str, Any]] = {KIND_SPOOL: {}, KIND_TYPE: {}}
+        for (kind, key), forecast in self._forecasts.items():
+            data[kind][key] = forecast.as_dict()
+        return data
@@ -0,0 +1,193 @@
+"""Spool lookup index for Filament Tracker."""
+
+from __future__ import annotations
+
+import logging
+from math import ceil, floor
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+
+from .color import Lab, delta_e, hex_to_lab
+from .const import CONF_COLOR, CONF_TYPE, TRAY_IDENTIFIERS
+
+_LOGGER = logging.getLogger(__package__)
+
+# Edge of the CIELAB grid cells used for nearest color lookups, in ΔE
+GRID_SIZE = 10.0
+
+
+def normalize_color(val: str | None) -> str:
+    """Normalize a color by removing '#', any alpha, and making it lowercase.
+
+    AMS trays report RRGGBBAA colors, which match RRGGBB spool colors.
+    """
+    val = val.strip().removeprefix("#").lower() if val else ""
+    return val[:6] if len(val) == 8 else val
+
+
+def normalize_type(val: str | None) -> str:
+    """Normalize a filament type for comparisons."""
+    return val.strip().upper() if val else ""
+
+
+def normalize_identifier(val: str | None) -> str:
+    """Normalize a tray identifier, which is empty for spools without a tag."""
+    val = val.strip().upper() if val else ""
+    return val if val.strip("0") else ""
+
+
+def _grid_cell(lab: Lab) -> tuple[int, int, int]:
+    """Return the grid cell holding a CIELAB value."""
+    return (
+        floor(lab[0] / GRID_SIZE),
+        floor(lab[1] / GRID_SIZE),
+        floor(lab[2] / GRID_SIZE),
+    )
+
+
+class SpoolIndex:
+    """In-memory index from normalized color to spool config entries.
+
+    Spool colors are also converted to CIELAB once, when the spool is
+    indexed, and bucketed in a grid of GRID_SIZE cells, so a nearest color
+    lookup only measures the spools in the cells around the wanted color.
+    Spools bound to tray identifiers (tray UUID or RFID tag UID) are also
+    indexed by them, which tells apart spools of the same color.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize an empty index."""
+        self._hass = hass
+        self._by_color: dict[str, set[str]] = {}
+        self._entry_color: dict[str, str] = {}
+        self._entry_type: dict[str, str] = {}
+        self._entry_lab: dict[str, Lab] = {}
+        self._grid: dict[tuple[int, int, int], set[str]] = {}
+        self._by_identifier: dict[str, str] = {}
+        self._entry_identifiers: dict[str, list[str]] = {}
+        self._listeners: list[CALLBACK_TYPE] = []
+
+    @callback
+    def async_add_listener(self, update_callback: CALLBACK_TYPE) -> CALLBACK_TYPE:
+        """Listen for changes to the index."""
+        self._listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def async_add_entry(self, entry: ConfigEntry) -> None:
+        """Index a spool config entry, replacing any previous data for it."""
+        self._remove(entry.entry_id)
+        color = normalize_color(entry.data.get(CONF_COLOR))
+        self._entry_color[entry.entry_id] = color
+        self._by_color.setdefault(color, set()).add(entry.entry_id)
+        self._entry_type[entry.entry_id] = normalize_type(entry.data.get(CONF_TYPE))
+        if (lab := hex_to_lab(color)) is not None:
+            self._entry_lab[entry.entry_id] = lab
+            self._grid.setdefault(_grid_cell(lab), set()).add(entry.entry_id)
+        identifiers = self._entry_identifiers[entry.entry_id] = []
+        for key in TRAY_IDENTIFIERS:
+            identifier = normalize_identifier(entry.options.get(key))
+            if not identifier or identifier in identifiers:
+                continue
+            if (other := self._by_identifier.get(identifier)) is not None:
+                _LOGGER.warning(
+                    "Tray identifier %s is bound to several spools, using %s",
+                    identifier,
+                    entry.title,
+                )
+                self._entry_identifiers[other].remove(identifier)
+            self._by_identifier[identifier] = entry.entry_id
+            identifiers.append(identifier)
+        _LOGGER.debug("Indexed spool %s with color %s", entry.entry_id, color)
+        self._async_notify_listeners()
+
+    @callback
+    def async_remove_entry(self, entry_id: str) -> None:
+        """Drop a spool config entry from the index."""
+        self._remove(entry_id)
+        self._async_notify_listeners()
+
+    @callback
+    def async_lookup(
+        self, color: str | None, filament_type: str | None = None
+    ) -> list[str]:
+        """Return the entry ids of all spools matching the given color."""
+        matches = self._by_color.get(normalize_color(color), ())
+        if filament_type:
+            filament_type = normalize_type(filament_type)
+            return sorted(
+                entry_id
+                for entry_id in matches
+                if self._entry_type[entry_id] == filament_type
+            )
+        return sorted(matches)
+
+    @callback
+    def async_lookup_identifier(self, identifier: str | None) -> str | None:
+        """Return the entry id of the spool bound to a tray identifier."""
+        return self._by_identifier.get(normalize_identifier(identifier))
+
+    @callback
+    def async_nearest(
+        self, color: str | None, tolerance: float, filament_type: str | None = None
+    ) -> list[str]:
+        """Return the spools closest to a color within a ΔE tolerance.
+
+        Several entry ids are returned only when they are equally close.
+        """
+        if (lab := hex_to_lab(normalize_color(color))) is None:
+            return []
+        filament_type = normalize_type(filament_type)
+        reach = ceil(tolerance / GRID_SIZE)
+        cell_l, cell_a, cell_b = _grid_cell(lab)
+        best = tolerance
+        matches: list[str] = []
+        for dl in range(-reach, reach + 1):
+            for da in range(-reach, reach + 1):
+                for db in range(-reach, reach + 1):
+                    cell = self._grid.get((cell_l + dl, cell_a + da, cell_b + db))
+                    if not cell:
+                        continue
+                    for entry_id in cell:
+                        if (
+                            filament_type
+                            and self._entry_type[entry_id] != filament_type
+                        ):
+                            continue
+                        distance = delta_e(lab, self._entry_lab[entry_id])
+                        if distance < best:
+                            best = distance
+                            matches = [entry_id]
+                        elif distance == best:
+                            matches.append(entry_id)
+        return sorted(matches)
+
+    def _remove(self, entry_id: str) -> None:
+        """Drop a spool config entry without notifying listeners."""
+        color = self._entry_color.pop(entry_id, None)
+        if color is not None:
+            entries = self._by_color[color]
+            entries.discard(entry_id)
+            if not entries:
+                del self._by_color[color]
+        self._entry_type.pop(entry_id, None)
+        for identifier in self._entry_identifiers.pop(entry_id, ()):
+            del self._by_identifier[identifier]
+        if (lab := self._entry_lab.pop(entry_id, None)) is not None:
+            cell = _grid_cell(lab)
+            entries = self._grid[cell]
+            entries.discard(entry_id)
+            if not entries:
+                del self._grid[cell]
+
+    @callback
+    def _async_notify_listeners(self) -> None:
+        """Tell listeners the index changed."""
+        for update_callback in list(self._listeners):
+            update_callback()
@@ -0,0 +1,267 @@
+"""Bulk inventory import and export for Filament Tracker."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Iterator
+import csv
+from itertools import islice
+import json
+import logging
+import os
+from pathlib import Path
+from typing import IO, Any
+
+import voluptuous as vol
+
+from homeassistant.config_entries import SOURCE_IMPORT, ConfigEntry
+from homeassistant.const import CONF_NAME
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+
+from .config_flow import CONF_INITIAL_LENGTH, CONF_INITIAL_WEIGHT, FILAMENT_TYPES
+from .const import (
+    CONF_BRAND,
+    CONF_COLOR,
+    CONF_MODEL,
+    CONF_PRICE,
+    CONF_TYPE,
+    DOMAIN,
+    NUMBER_ENTITIES_KEY,
+)
+
+_LOGGER = logging.getLogger(__package__)
+
+FORMAT_CSV = "csv"
+FORMAT_JSONL = "jsonl"
+FORMATS = (FORMAT_CSV, FORMAT_JSONL)
+
+# Records read, set up or written per executor round trip
+CHUNK_SIZE = 50
+
+SPOOL_FIELDS = (
+    CONF_NAME,
+    CONF_COLOR,
+    CONF_INITIAL_LENGTH,
+    CONF_INITIAL_WEIGHT,
+    CONF_PRICE,
+    CONF_TYPE,
+    CONF_BRAND,
+    CONF_MODEL,
+)
+
+SPOOL_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_NAME): cv.string,
+        vol.Required(CONF_COLOR): cv.string,
+        vol.Optional(CONF_INITIAL_LENGTH, default=330.0): vol.Coerce(float),
+        vol.Optional(CONF_INITIAL_WEIGHT, default=1000.0): vol.Coerce(float),
+        vol.Optional(CONF_PRICE, default=100.0): vol.Coerce(float),
+        vol.Optional(CONF_TYPE, default="PLA"): vol.In(FILAMENT_TYPES),
+        vol.Optional(CONF_BRAND, default=""): cv.string,
+        vol.Optional(CONF_MODEL, default=""): cv.string,
+    },
+    extra=vol.REMOVE_EXTRA,
+)
+
+
+def resolve_path(
+    hass: HomeAssistant, path: str, file_format: str | None
+) -> tuple[str, str]:
+    """Return the allowed absolute path and the format of an inventory file."""
+    full_path = hass.config.path(path)
+    if not hass.config.is_allowed_path(full_path):
+        raise ServiceValidationError(
+            translation_domain=DOMAIN,
+            translation_key="path_not_allowed",
+            translation_placeholders={"path": full_path},
+        )
+    if file_format is None:
+        file_format = (
+            FORMAT_CSV if Path(full_path).suffix.lower() == ".csv" else FORMAT_JSONL
+        )
+    return full_path, file_format
+
+
+def _iter_records(file: IO[str], file_format: str) -> Iterator[Any]:
+    """Yield the raw records of an inventory file, one at a time."""
+    if file_format == FORMAT_CSV:
+        for row in csv.DictReader(file):
+            # Empty cells fall back to the schema defaults
+            yield {key: value for key, value in row.items() if key and value}
+        return
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as err:
+            yield err
+
+
+def _read_error(path: str, err: Exception) -> ServiceValidationError:
+    """Return the error of an inventory file that cannot be read."""
+    return ServiceValidationError(
+        translation_domain=DOMAIN,
+        translation_key="cannot_read",
+        translation_placeholders={"path": path, "error": str(err)},
+    )
+
+
+def _open_records(path: str, file_format: str) -> tuple[IO[str], Iterator[Any]]:
+    """Open an inventory file for streaming."""
+    file = open(path, encoding="utf-8", newline="")  # noqa: SIM115
+    return file, _iter_records(file, file_format)
+
+
+async def async_import_inventory(
+    hass: HomeAssistant, path: str, file_format: str
+) -> dict[str, Any]:
+    """Create a spool for every valid record of an inventory file.
+
+    Records are read and validated in chunks, and the spools of a chunk are
+    set up concurrently. Records whose name already exists are skipped.
+    """
+    names = {entry.title for entry in hass.config_entries.async_entries(DOMAIN)}
+    created = 0
+    skipped: list[str] = []
+    errors: list[dict[str, Any]] = []
+
+    try:
+        file, records = await hass.async_add_executor_job(
+            _open_records, path, file_format
+        )
+    except OSError as err:
+        raise _read_error(path, err) from err
+
+    try:
+        line = 0
+        while chunk := await hass.async_add_executor_job(
+            list, islice(records, CHUNK_SIZE)
+        ):
+            batch = []
+            for record in chunk:
+                line += 1
+                if isinstance(record, ValueError):
+                    errors.append({"record": line, "error": str(record)})
+                    continue
+                try:
+                    data = SPOOL_SCHEMA(record)
+                except vol.Invalid as err:
+                    errors.append({"record": line, "error": str(err)})
+                    continue
+                if data[CONF_NAME] in names:
+                    skipped.append(data[CONF_NAME])
+                    continue
+                names.add(data[CONF_NAME])
+                batch.append(data)
+
+            await asyncio.gather(
+                *(
+                    hass.config_entries.flow.async_init(
+                        DOMAIN, context={"source": SOURCE_IMPORT}, data=data
+                    )
+                    for data in batch
+                )
+            )
+            created += len(batch)
+    except UnicodeDecodeError as err:
+        raise ServiceValidationError(
+            translation_domain=DOMAIN,
+            translation_key="invalid_encoding",
+            translation_placeholders={"path": path, "position": str(err.start)},
+        ) from err
+    except (OSError, csv.Error) as err:
+        raise _read_error(path, err) from err
+    finally:
+        await hass.async_add_executor_job(file.close)
+
+    _LOGGER.debug(
+        "Imported %d spools from %s, skipped %d, %d invalid",
+        created,
+        path,
+        len(skipped),
+        len(errors),
+    )
+    return {"created": created, "skipped": skipped, "errors": errors}
+
+
+def _export_record(hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
+    """Return a spool as an inventory record holding what is left of it."""
+    record = {field: entry.data.get(field) for field in SPOOL_FIELDS}
+    entities = hass.data[NUMBER_ENTITIES_KEY].get(entry.entry_id, {})
+    if (weight := entities.get("weight")) is not None:
+        record[CONF_INITIAL_WEIGHT] = weight.native_value
+    if (lenght := entities.get("lenght")) is not None:
+        record[CONF_INITIAL_LENGTH] = lenght.native_value
+    return record
+
+
+def _open_writer(path: str, file_format: str) -> tuple[IO[str], csv.DictWriter | None]:
+    """Open a temporary file next to the export and write its header."""
+    file = open(f"{path}.tmp", "w", encoding="utf-8", newline="")  # noqa: SIM115
+    if file_format != FORMAT_CSV:
+        return file, None
+    writer = csv.DictWriter(file, fieldnames=SPOOL_FIELDS)
+    writer.writeheader()
+    return file, writer
+
+
+def _write_records(
+    file: IO[str], writer: csv.DictWriter | None, records: list[dict[str, Any]]
+) -> None:
+    """Append records to an export file."""
+    if writer is not None:
+        writer.writerows(records)
+    else:
+        file.writelines(
+            json.dumps(record, ensure_ascii=False) + "\n" for record in records
+        )
+
+
+def _finish_export(file: IO[str], path: str, complete: bool) -> None:
+    """Close an export and move it into place once it is complete."""
+    file.close()
+    if complete:
+        os.replace(f"{path}.tmp", path)
+    else:
+        os.remove(f"{path}.tmp")
+
+
+async def async_export_inventory(
+    hass: HomeAssistant, path: str, file_format: str
+) -> int:
+    """Write every spool to an inventory file, one chunk at a time."""
+    entries = hass.config_entries.async_entries(DOMAIN)
+    try:
+        file, writer = await hass.async_add_executor_job(
+            _open_writer, path, file_format
+        )
+    except OSError as err:
+        raise ServiceValidationError(
+            translation_domain=DOMAIN,
+            translation_key="cannot_write",
+            translation_placeholders={"path": path, "error": str(err)},
+        ) from err
+
+    complete = False
+    try:
+        for start in range(0, len(entries), CHUNK_SIZE):
+            records = [
+                _export_record(hass, entry)
+                for entry in entries[start : start + CHUNK_SIZE]
+            ]
+            await hass.async_add_executor_job(_write_records, file, writer, records)
+        complete = True
+    except OSError as err:
+        raise ServiceValidationError(
+            translation_domain=DOMAIN,
+            translation_key="cannot_write",
+            translation_placeholders={"path": path, "error": str(err)},
+        ) from err
+    finally:
+        await hass.async_add_executor_job(_finish_export, file, path, complete)
+
+    _LOGGER.debug("Exported %d spools to %s", len(entries), path)
+    return len(entries)
@@ -0,0 +1,103 @@
+"""Journal of keyed deductions for Filament Tracker."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+import time
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, STATS_KEY
+
+if TYPE_CHECKING:
+    from .usage import SpoolUsage
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.journal"
+SAVE_DELAY = 10
+
+# Deductions are remembered for this long, and at most this many of them
+KEY_TTL = 30 * 86400
+MAX_ENTRIES = 1000
+
+
+@dataclass(slots=True)
+class JournalEntry:
+    """What one keyed deduction took from each spool."""
+
+    ts: float
+    deductions: list[tuple[str, float, float]]
+    undone: bool = False
+
+
+class DeductionJournal:
+    """Recently applied deductions by job key.
+
+    Entries are kept in the order they were added, so the expired ones, and
+    the oldest ones past MAX_ENTRIES, are dropped from the front. Whether a
+    job was already deducted is one dict lookup. Each entry holds what was
+    actually taken from the spools, so undoing it restores them exactly.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize an empty journal."""
+        self._hass = hass
+        self._store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._entries: dict[str, JournalEntry] = {}
+
+    async def async_load(self) -> None:
+        """Load the journal from storage."""
+        if (data := await self._store.async_load()) is None:
+            return
+        for key, ts, undone, deductions in data["entries"]:
+            self._entries[key] = JournalEntry(
+                ts, [tuple(deduction) for deduction in deductions], undone
+            )
+        self._async_expire()
+
+    @callback
+    def async_get(self, key: str) -> JournalEntry | None:
+        """Return the journaled deduction of a job."""
+        self._async_expire()
+        return self._entries.get(key)
+
+    @callback
+    def async_add(self, key: str, usages: Iterable[SpoolUsage]) -> None:
+        """Journal the deduction of a job."""
+        self._entries.pop(key, None)
+        self._entries[key] = JournalEntry(
+            time.time(),
+            [(usage.entry_id, usage.weight, usage.meters) for usage in usages],
+        )
+        self._async_expire()
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def async_set_undone(self, key: str, undone: bool) -> None:
+        """Mark the deduction of a job as undone or applied again."""
+        self._entries[key].undone = undone
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _async_expire(self) -> None:
+        """Drop the entries past their time or beyond MAX_ENTRIES."""
+        oldest = time.time() - KEY_TTL
+        while self._entries:
+            key = next(iter(self._entries))
+            if len(self._entries) <= MAX_ENTRIES and self._entries[key].ts >= oldest:
+                break
+            del self._entries[key]
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the journal to store."""
+        self._hass.data[STATS_KEY].async_increment("storage_flush.journal")
+        return {
+            "entries": [
+                [key, entry.ts, entry.undone, [list(d) for d in entry.deductions]]
+                for key, entry in self._entries.items()
+            ]
+        }
@@ -0,0 +1,209 @@
+"""Append-only usage ledger for Filament Tracker."""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections.abc import Iterable
+from datetime import datetime
+from itertools import islice
+import logging
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+import homeassistant.util.dt as dt_util
+
+from .const import DOMAIN, STATS_KEY
+
+if TYPE_CHECKING:
+    from .usage import SpoolUsage
+
+_LOGGER = logging.getLogger(__package__)
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.ledger"
+SAVE_DELAY = 10
+
+# Raw records kept before the oldest ones are folded into daily totals
+MAX_RECORDS = 5000
+COMPACT_RECORDS = 1000
+MAX_DAYS = 3 * 366
+DAY = 86400
+
+
+def _empty_totals() -> list[float]:
+    """Return zeroed [weight, meters, cost, count] totals."""
+    return [0.0, 0.0, 0.0, 0]
+
+
+class UsageLedger:
+    """History of every deduction, stored as packed columns.
+
+    Recent deductions are kept as individual records sorted by time. Once
+    there are more than MAX_RECORDS, the oldest ones are compacted into
+    per-day, per-spool totals, and days older than MAX_DAYS are dropped, so
+    the stored ledger stays bounded. Each record also holds how many jobs it
+    counts as: 1 for a deduction, 0 for undoing or redoing one.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize an empty ledger."""
+        self._hass = hass
+        self._store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._spools: list[str] = []
+        self._spool_ids: dict[str, int] = {}
+        self._ts: list[int] = []
+        self._spool: list[int] = []
+        self._weight: list[float] = []
+        self._meters: list[float] = []
+        self._cost: list[float] = []
+        self._jobs: list[int] = []
+        self._daily: dict[int, dict[int, list[float]]] = {}
+
+    async def async_load(self) -> None:
+        """Load the ledger from storage."""
+        if (data := await self._store.async_load()) is None:
+            return
+        self._spools = data["spools"]
+        self._spool_ids = {entry_id: i for i, entry_id in enumerate(self._spools)}
+        self._ts = data["ts"]
+        self._spool = data["spool"]
+        self._weight = data["weight"]
+        self._meters = data["meters"]
+        self._cost = data["cost"]
+        # Ledgers stored before reversals were recorded only hold jobs
+        self._jobs = data.get("jobs") or [1] * len(self._ts)
+        self._daily = {
+            int(day): {int(spool): totals for spool, totals in spools.items()}
+            for day, spools in data["daily"].items()
+        }
+        _LOGGER.debug(
+            "Loaded usage ledger with %d records and %d days",
+            len(self._ts),
+            len(self._daily),
+        )
+
+    @callback
+    def async_record(self, usages: Iterable[SpoolUsage], jobs: bool = True) -> None:
+        """Append deductions and schedule a debounced write.
+
+        Pass jobs=False for reversals, which are not counted as jobs.
+        """
+        now = int(dt_util.utcnow().timestamp())
+        if self._ts:
+            # Keep the time column sorted even if the clock moves back
+            now = max(now, self._ts[-1])
+        for usage in usages:
+            if (spool := self._spool_ids.get(usage.entry_id)) is None:
+                spool = self._spool_ids[usage.entry_id] = len(self._spools)
+                self._spools.append(usage.entry_id)
+            self._ts.append(now)
+            self._spool.append(spool)
+            self._weight.append(usage.weight)
+            self._meters.append(usage.meters)
+            self._cost.append(round(usage.cost, 4))
+            self._jobs.append(int(jobs))
+
+        if len(self._ts) > MAX_RECORDS:
+            self._compact()
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def async_query(
+        self,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        entry_id: str | None = None,
+    ) -> dict[str, list[float]]:
+        """Return [weight, meters, cost, count] totals per spool in [start, end).
+
+        Compacted days are counted when they overlap the range.
+        """
+        spool_filter = None
+        if (
+            entry_id is not None
+            and (spool_filter := self._spool_ids.get(entry_id)) is None
+        ):
+            return {}
+        start_ts = int(start.timestamp()) if start else 0
+        end_ts = int(end.timestamp()) if end else None
+        totals: dict[int, list[float]] = {}
+
+        for day, spools in self._daily.items():
+            if day + DAY <= start_ts or (end_ts is not None and day >= end_ts):
+                continue
+            for spool, day_totals in spools.items():
+                if spool_filter is None or spool == spool_filter:
+                    spool_totals = totals.setdefault(spool, _empty_totals())
+                    for i, value in enumerate(day_totals):
+                        spool_totals[i] += value
+
+        lo = bisect_left(self._ts, start_ts)
+        hi = len(self._ts) if end_ts is None else bisect_left(self._ts, end_ts)
+        for spool, weight, meters, cost, jobs in zip(
+            islice(self._spool, lo, hi),
+            islice(self._weight, lo, hi),
+            islice(self._meters, lo, hi),
+            islice(self._cost, lo, hi),
+            islice(self._jobs, lo, hi),
+            strict=True,
+        ):
+            if spool_filter is None or spool == spool_filter:
+                spool_totals = totals.setdefault(spool, _empty_totals())
+                spool_totals[0] += weight
+                spool_totals[1] += meters
+                spool_totals[2] += cost
+                spool_totals[3] += jobs
+
+        return {self._spools[spool]: values for spool, values in totals.items()}
+
+    def _compact(self) -> None:
+        """Fold the oldest records into daily totals."""
+        for ts, spool, weight, meters, cost, jobs in zip(
+            islice(self._ts, COMPACT_RECORDS),
+            self._spool,
+            self._weight,
+            self._meters,
+            self._cost,
+            self._jobs,
+            strict=False,
+        ):
+            day_totals = self._daily.setdefault(ts - ts % DAY, {}).setdefault(
+                spool, _empty_totals()
+            )
+            day_totals[0] += weight
+            day_totals[1] += meters
+            day_totals[2] += cost
+            day_totals[3] += jobs
+        for column in (
+            self._ts,
+            self._spool,
+            self._weight,
+            self._meters,
+            self._cost,
+            self._jobs,
+        ):
+            del column[:COMPACT_RECORDS]
+
+        oldest_day = self._ts[0] - self._ts[0] % DAY - MAX_DAYS * DAY
+        for day in [day for day in self._daily if day < oldest_day]:
+            del self._daily[day]
+        _LOGGER.debug("Compacted usage ledger into %d days", len(self._daily))
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return a copy of the ledger in its packed storage layout."""
+        self._hass.data[STATS_KEY].async_increment("storage_flush.ledger")
+        return {
+            "spools": list(self._spools),
+            "ts": list(self._ts),
+            "spool": list(self._spool),
+            "weight": list(self._weight),
+            "meters": list(self._meters),
+            "cost": list(self._cost),
+            "jobs": list(self._jobs),
+            "daily": {
+                str(day): {str(spool): list(totals) for spool, totals in spools.items()}
+                for day, spools in self._daily.items()
+            },
+        }
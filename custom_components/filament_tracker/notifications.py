@@ -0,0 +1,150 @@
+"""Coalesced usage notifications for Filament Tracker."""
+
+from __future__ import annotations
+
+from dataclasses import replace
+from datetime import datetime
+from functools import partial
+import logging
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.util import slugify
+import homeassistant.util.dt as dt_util
+
+from .const import DOMAIN
+from .options_flow import (
+    DEFAULT_LOW_STOCK_THRESHOLD,
+    DEFAULT_NOTIFY_WINDOW,
+    LOW_STOCK_THRESHOLD,
+    NOTIFY_TARGET,
+    NOTIFY_WINDOW,
+)
+from .usage import (
+    SpoolUsage,
+    format_jobs,
+    format_low_stock,
+    format_usage,
+    format_usage_summary,
+)
+
+_LOGGER = logging.getLogger(__package__)
+
+# Source of deductions made through the services
+SOURCE_SERVICE = "service"
+
+
+class UsageNotifier:
+    """Send usage notifications without holding up deductions.
+
+    Deductions are queued per source (a printer or the services) and notify
+    target. The first one starts the notification window of the spool; when
+    it closes, everything queued is sent as one notification, so a busy
+    printer sends at most one per window. Each window gets a persistent
+    notification of its own, ending with the keys of the jobs it covers,
+    which undo_usage takes. Low stock alerts are sent once, when a spool
+    crosses its threshold. Whatever is still queued is sent when Home
+    Assistant stops.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the notifier."""
+        self._hass = hass
+        self._pending: dict[tuple[str, str], dict[str, SpoolUsage]] = {}
+        self._jobs: dict[tuple[str, str], list[str]] = {}
+        self._unsub_send: dict[tuple[str, str], CALLBACK_TYPE] = {}
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, self._async_flush)
+
+    @callback
+    def async_queue(
+        self, usages: list[SpoolUsage], source: str, job_id: str | None = None
+    ) -> None:
+        """Queue the notification of applied deductions."""
+        for usage in usages:
+            entry = self._hass.config_entries.async_get_entry(usage.entry_id)
+            options = entry.options if entry else {}
+            target = options.get(NOTIFY_TARGET) or ""
+
+            threshold = options.get(LOW_STOCK_THRESHOLD, DEFAULT_LOW_STOCK_THRESHOLD)
+            if threshold and usage.old_weight > threshold >= usage.new_weight:
+                self._async_send(
+                    target,
+                    f"{DOMAIN}_low_stock_{usage.entry_id}",
+                    *format_low_stock(self._hass, usage, threshold),
+                )
+
+            key = (source, target)
+            pending = self._pending.setdefault(key, {})
+            if (queued := pending.get(usage.entry_id)) is None:
+                pending[usage.entry_id] = replace(usage)
+            else:
+                queued.weight += usage.weight
+                queued.meters += usage.meters
+            jobs = self._jobs.setdefault(key, [])
+            if job_id is not None and job_id not in jobs:
+                jobs.append(job_id)
+            if key not in self._unsub_send:
+                self._unsub_send[key] = async_call_later(
+                    self._hass,
+                    options.get(NOTIFY_WINDOW, DEFAULT_NOTIFY_WINDOW),
+                    partial(self._async_send_queued, key),
+                )
+
+    @callback
+    def _async_flush(self, _event: Event) -> None:
+        """Send everything queued without waiting for the windows to close."""
+        for key, unsub in list(self._unsub_send.items()):
+            unsub()
+            self._async_send_queued(key)
+
+    @callback
+    def _async_send_queued(
+        self, key: tuple[str, str], _now: datetime | None = None
+    ) -> None:
+        """Send one notification for everything queued for a source."""
+        self._unsub_send.pop(key, None)
+        jobs = self._jobs.pop(key, None)
+        if not (pending := self._pending.pop(key, None)):
+            return
+        source, target = key
+        usages = list(pending.values())
+        if len(usages) == 1:
+            title, message = format_usage(self._hass, usages[0])
+        else:
+            title, message = format_usage_summary(self._hass, usages)
+        if jobs:
+            message = f"{message}\n{format_jobs(self._hass, jobs)}"
+        # Job keys are unique, so an unread notification is never replaced
+        window = jobs[0] if jobs else dt_util.utcnow().isoformat()
+        self._async_send(
+            target,
+            f"{DOMAIN}_usage_{slugify(source)}_{slugify(window)}",
+            title,
+            message,
+        )
+
+    @callback
+    def _async_send(
+        self, target: str, notification_id: str, title: str, message: str
+    ) -> None:
+        """Send a notification without waiting for it."""
+        domain, _, service = target.partition(".")
+        if target and not self._hass.services.has_service(domain, service):
+            _LOGGER.warning(
+                "Notify service %s not found, using a persistent notification",
+                target,
+            )
+            target = ""
+        if target:
+            data = {"title": title, "message": message}
+        else:
+            domain, service = "persistent_notification", "create"
+            data = {
+                "title": title,
+                "message": message,
+                "notification_id": notification_id,
+            }
+        self._hass.async_create_task(
+            self._hass.services.async_call(domain, service, data)
+        )
@@ -1,11 +1,22 @@
 """Number entities for Filament Tracker."""
 
+from asyncio import Handle
+
 from homeassistant.components.number import NumberEntity
-from homeassistant.const import CONF_NAME
-from homeassistant.core import HomeAssistant
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.device_registry import DeviceInfo
 from homeassistant.helpers.restore_state import RestoreEntity
 
-from .const import DOMAIN, SENSOR_TYPES
+from .const import (
+    INVENTORY_KEY,
+    NUMBER_ENTITIES_KEY,
+    SENSOR_TYPES,
+    SNAPSHOT_KEY,
+    STATS_KEY,
+)
+from .entity import FilamentTrackerEntity, build_device_info
+from .snapshot import SpoolSnapshot
 
 CONF_INITIAL_LENGTH = "initial_length"
 CONF_INITIAL_WEIGHT = "initial_weight"
@@ -15,69 +26,107 @@ async def async_setup_entry(
     hass: HomeAssistant, config_entry, async_add_entities
 ) -> None:
     """Set up filament tracker number entities from a config entry."""
-    name = config_entry.data[CONF_NAME]
+    device_info = build_device_info(config_entry)
     initial_lenght = config_entry.data.get(CONF_INITIAL_LENGTH, 0.0)
     initial_weight = config_entry.data.get(CONF_INITIAL_WEIGHT, 0.0)
 
     entities = [
-        FilamentNumberEntity(config_entry.entry_id, name, "lenght", initial_lenght),
-        FilamentNumberEntity(config_entry.entry_id, name, "weight", initial_weight),
+        FilamentNumberEntity(config_entry, device_info, "lenght", initial_lenght),
+        FilamentNumberEntity(config_entry, device_info, "weight", initial_weight),
     ]
     async_add_entities(entities)
 
 
-class FilamentNumberEntity(NumberEntity, RestoreEntity):
+class FilamentNumberEntity(FilamentTrackerEntity, NumberEntity, RestoreEntity):
     """Number entity for tracking filament properties."""
 
     def __init__(
-        self, entry_id: str, name: str, number_type: str, initial_value: float
+        self,
+        config_entry: ConfigEntry,
+        device_info: DeviceInfo,
+        number_type: str,
+        initial_value: float,
     ) -> None:
         """Initialize the Filament number entity."""
-        self._attr_unique_id = f"{entry_id}_{number_type}"
-        self._attr_name = f"{name} {SENSOR_TYPES[number_type][0]}"
+        super().__init__(
+            config_entry, device_info, number_type, SENSOR_TYPES[number_type][0]
+        )
         self._attr_native_unit_of_measurement = SENSOR_TYPES[number_type][1]
         self._attr_icon = SENSOR_TYPES[number_type][2]
         self._attr_native_min_value = 0.0
         self._attr_native_max_value = 100000.0
         self._attr_native_step = 0.01
+        self._number_type = number_type
         self._state = initial_value
+        self._write_handle: Handle | None = None
 
     @property
     def native_value(self) -> float:
         """Return the current value."""
         return self._state
 
-    @property
-    def device_info(self) -> dict:
-        """Return device info for grouping entities under one device."""
-        config_entry = next(
-            (
-                entry
-                for entry in self.hass.config_entries.async_entries(DOMAIN)
-                if entry.entry_id == self._attr_unique_id.split("_", maxsplit=1)[0]
-            ),
-            None,
-        )
-        brand = config_entry.data.get("brand", "") if config_entry else ""
-        model = config_entry.data.get("model", "") if config_entry else ""
-        return {
-            "identifiers": {(DOMAIN, self._attr_unique_id.split("_", maxsplit=1)[0])},
-            "name": self._attr_name.split(" ", maxsplit=1)[0],
-            "manufacturer": brand or "Filament Tracker",
-            "model": model or "Generic",
-        }
-
     async def async_set_native_value(self, value: float) -> None:
         """Set a new value."""
+        self.async_set_remaining(value)
+
+    @callback
+    def async_set_remaining(self, value: float) -> None:
+        """Set a new value directly, without going through the service layer.
+
+        The value changes immediately, so the next deduction reads it, while
+        the state write is deferred to the end of the event loop iteration
+        and shared by every change made to the spool during it.
+        """
         self._state = value
+        if self._write_handle is None:
+            self._write_handle = self.hass.loop.call_soon(self._async_write_remaining)
+        else:
+            self.hass.data[STATS_KEY].async_increment("state_writes_merged")
+
+    @callback
+    def _async_write_remaining(self) -> None:
+        """Write the latest value of the spool."""
+        self._write_handle = None
         self.async_write_ha_state()
+        self.hass.data[SNAPSHOT_KEY].async_set(
+            self._entry_id, self._number_type, self._state
+        )
+        self.hass.data[INVENTORY_KEY].async_set_remaining(
+            self._entry_id, self._number_type, self._state
+        )
 
     async def async_added_to_hass(self) -> None:
         """Restore previous state after Home Assistant restart."""
-        if (
-            last_state := await self.async_get_last_state()
-        ) is not None and last_state.state not in (None, "unknown"):
-            try:
-                self._state = float(last_state.state)
-            except (ValueError, TypeError):
-                self._state = self._state
+        snapshot: SpoolSnapshot = self.hass.data[SNAPSHOT_KEY]
+        if (value := snapshot.async_get(self._entry_id, self._number_type)) is not None:
+            self._state = value
+        else:
+            # Spools saved before the snapshot existed restore their last state
+            if (
+                last_state := await self.async_get_last_state()
+            ) is not None and last_state.state not in (None, "unknown"):
+                try:
+                    self._state = float(last_state.state)
+                except (ValueError, TypeError):
+                    self._state = self._state
+            snapshot.async_set(self._entry_id, self._number_type, self._state)
+
+        self.hass.data[INVENTORY_KEY].async_set_remaining(
+            self._entry_id, self._number_type, self._state
+        )
+        # Deductions update the entity directly once its value is restored
+        self.hass.data[NUMBER_ENTITIES_KEY].setdefault(self._entry_id, {})[
+            self._number_type
+        ] = self
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Write a pending value, then forget the entity when it is removed."""
+        if self._write_handle is not None:
+            # The last deduction must reach the snapshot before the entity goes
+            self._write_handle.cancel()
+            self._async_write_remaining()
+        entities = self.hass.data[NUMBER_ENTITIES_KEY].get(self._entry_id, {})
+        if entities.get(self._number_type) is self:
+            del entities[self._number_type]
+        if not entities:
+            self.hass.data[NUMBER_ENTITIES_KEY].pop(self._entry_id, None)
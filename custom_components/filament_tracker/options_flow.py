@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+from collections.abc import Mapping
 import logging
 from typing import Any
 
@@ -10,15 +11,33 @@ import voluptuous as vol
 from homeassistant import config_entries
 from homeassistant.helpers.selector import EntitySelector, EntitySelectorConfig
 
+from .const import TRAY_IDENTIFIERS
+
 _LOGGER = logging.getLogger(__package__)
 
 AMS_ACTIVE = "ams_active"
 USAGE_GRAMS = "usage_grams"
 USAGE_METERS = "usage_meters"
-AMS_TRAY_1 = "ams_tray_1"
-AMS_TRAY_2 = "ams_tray_2"
-AMS_TRAY_3 = "ams_tray_3"
-AMS_TRAY_4 = "ams_tray_4"
+AMS_TRAYS = "ams_trays"
+LIVE_TRACKING = "live_tracking"
+LIVE_UPDATE_INTERVAL = "live_update_interval"
+LOW_STOCK_THRESHOLD = "low_stock_threshold"
+NOTIFY_TARGET = "notify_target"
+NOTIFY_WINDOW = "notify_window"
+
+DEFAULT_LIVE_UPDATE_INTERVAL = 30
+DEFAULT_LOW_STOCK_THRESHOLD = 100.0
+DEFAULT_NOTIFY_WINDOW = 60
+
+# Fixed tray options used before any number of trays could be selected
+LEGACY_AMS_TRAYS = ("ams_tray_1", "ams_tray_2", "ams_tray_3", "ams_tray_4")
+
+
+def get_ams_trays(options: Mapping[str, Any]) -> tuple[str, ...]:
+    """Return the tray entities configured in the options."""
+    if AMS_TRAYS in options:
+        return tuple(options[AMS_TRAYS])
+    return tuple(tray for key in LEGACY_AMS_TRAYS if (tray := options.get(key)))
 
 
 class FilamentTrackerOptionsFlowHandler(config_entries.OptionsFlow):
@@ -57,21 +76,44 @@ class FilamentTrackerOptionsFlowHandler(config_entries.OptionsFlow):
                         default=options.get(AMS_ACTIVE, ""),
                     ): EntitySelector(EntitySelectorConfig(domain="binary_sensor")),
                     vol.Required(
-                        AMS_TRAY_1,
-                        default=options.get(AMS_TRAY_1, ""),
-                    ): EntitySelector(EntitySelectorConfig(domain="sensor")),
-                    vol.Required(
-                        AMS_TRAY_2,
-                        default=options.get(AMS_TRAY_2, ""),
-                    ): EntitySelector(EntitySelectorConfig(domain="sensor")),
-                    vol.Required(
-                        AMS_TRAY_3,
-                        default=options.get(AMS_TRAY_3, ""),
-                    ): EntitySelector(EntitySelectorConfig(domain="sensor")),
-                    vol.Required(
-                        AMS_TRAY_4,
-                        default=options.get(AMS_TRAY_4, ""),
-                    ): EntitySelector(EntitySelectorConfig(domain="sensor")),
+                        AMS_TRAYS,
+                        default=list(get_ams_trays(options)),
+                    ): EntitySelector(
+                        EntitySelectorConfig(domain="sensor", multiple=True)
+                    ),
+                    vol.Optional(
+                        LIVE_TRACKING,
+                        default=options.get(LIVE_TRACKING, False),
+                    ): bool,
+                    vol.Optional(
+                        LIVE_UPDATE_INTERVAL,
+                        default=options.get(
+                            LIVE_UPDATE_INTERVAL, DEFAULT_LIVE_UPDATE_INTERVAL
+                        ),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=1, max=3600)),
+                    vol.Optional(
+                        NOTIFY_TARGET,
+                        description={
+                            "suggested_value": options.get(NOTIFY_TARGET, ""),
+                        },
+                    ): str,
+                    vol.Optional(
+                        NOTIFY_WINDOW,
+                        default=options.get(NOTIFY_WINDOW, DEFAULT_NOTIFY_WINDOW),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0, max=86400)),
+                    vol.Optional(
+                        LOW_STOCK_THRESHOLD,
+                        default=options.get(
+                            LOW_STOCK_THRESHOLD, DEFAULT_LOW_STOCK_THRESHOLD
+                        ),
+                    ): vol.All(vol.Coerce(float), vol.Range(min=0)),
+                    **{
+                        vol.Optional(
+                            key,
+                            description={"suggested_value": options.get(key, "")},
+                        ): str
+                        for key in TRAY_IDENTIFIERS
+                    },
                 }
             ),
         )
@@ -1,111 +1,175 @@
 """Sensor entities for Filament Tracker."""
 
-from homeassistant.components.sensor import SensorEntity
-from homeassistant.const import CONF_NAME
-from homeassistant.core import HomeAssistant
+from typing import Any
 
-from .const import DOMAIN
+from homeassistant.components.sensor import SensorEntity, SensorStateClass
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.device_registry import DeviceInfo
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+import homeassistant.helpers.entity_registry as er
+from homeassistant.util import slugify
 
-CONF_PRICE = "price"
-CONF_COLOR = "color"
-CONF_TYPE = "type"
+from .aggregate import (
+    GROUP_TOTAL,
+    GROUP_TYPE,
+    METERS,
+    SPOOLS,
+    VALUE,
+    WEIGHT,
+    Group,
+    InventoryAggregates,
+)
+from .const import (
+    CONF_COLOR,
+    CONF_PRICE,
+    CONF_TYPE,
+    DOMAIN,
+    FORECASTS_KEY,
+    INVENTORY_KEY,
+    NUMBER_ENTITIES_KEY,
+    SENSOR_PLATFORMS_KEY,
+    STATS_KEY,
+)
+from .entity import INVENTORY_DEVICE_INFO, FilamentTrackerEntity, build_device_info
+from .forecast import KIND_SPOOL, KIND_TYPE, UsageForecasts
+from .stats import PerformanceStats
+
+# Inventory total: (label, unit, icon)
+INVENTORY_TYPES = {
+    WEIGHT: ("Weight", "g", "mdi:weight-gram"),
+    METERS: ("Lenght", "m", "mdi:map-marker-distance"),
+    VALUE: ("Value", "R$", "mdi:currency-brl"),
+    SPOOLS: ("Spools", None, "mdi:printer-3d-nozzle"),
+}
+
+# Forecast: (label, unit, icon)
+FORECAST_TYPES = {
+    "rate": ("Usage Rate", "g/d", "mdi:chart-line"),
+    "days": ("Days Left", "d", "mdi:calendar-clock"),
+    "prints": ("Prints Left", None, "mdi:printer-3d"),
+}
 
 
 async def async_setup_entry(hass: HomeAssistant, config_entry, async_add_entities):
     """Set up filament tracker sensor entities from a config entry."""
-    name = config_entry.data[CONF_NAME]
+    device_info = build_device_info(config_entry)
     color = config_entry.data.get(CONF_COLOR, "#FFFFFF")
     price = config_entry.data.get(CONF_PRICE, 0.0)
     filament_type = config_entry.data.get(CONF_TYPE, "PLA")
 
     entities = [
-        FilamentPriceSensor(config_entry.entry_id, name, price),
-        FilamentColorSensor(config_entry.entry_id, name, color),
-        FilamentTypeSensor(config_entry.entry_id, name, filament_type),
+        FilamentPriceSensor(config_entry, device_info, price),
+        FilamentColorSensor(config_entry, device_info, color),
+        FilamentTypeSensor(config_entry, device_info, filament_type),
+        *(
+            FilamentForecastSensor(config_entry, device_info, forecast)
+            for forecast in FORECAST_TYPES
+        ),
     ]
+
     async_add_entities(entities)
 
+    # Sensors covering the whole inventory are provided by a single entry, on
+    # a device of their own so they outlive the spool that provides them
+    platforms: dict[str, AddEntitiesCallback] = hass.data[SENSOR_PLATFORMS_KEY]
+    platforms[config_entry.entry_id] = async_add_entities
+    config_entry.async_on_unload(
+        lambda: _async_release_platform(hass, config_entry.entry_id)
+    )
+    if len(platforms) == 1:
+        _async_add_integration_sensors(hass, config_entry, async_add_entities)
+
+
+@callback
+def _async_add_integration_sensors(
+    hass: HomeAssistant, config_entry: ConfigEntry, async_add_entities
+) -> None:
+    """Add the stats and inventory sensors through a config entry."""
+    aggregates: InventoryAggregates = hass.data[INVENTORY_KEY]
+
+    def group_sensors(group: Group) -> list[SensorEntity]:
+        sensors: list[SensorEntity] = [
+            FilamentInventorySensor(aggregates, group, total)
+            for total in INVENTORY_TYPES
+        ]
+        if group[0] == GROUP_TYPE:
+            sensors.extend(
+                FilamentTypeForecastSensor(hass, group[1], forecast)
+                for forecast in FORECAST_TYPES
+            )
+        return sensors
+
+    async_add_entities(
+        [
+            FilamentStatsSensor(hass.data[STATS_KEY]),
+            *(sensor for group in aggregates.groups for sensor in group_sensors(group)),
+        ]
+    )
+    config_entry.async_on_unload(
+        aggregates.async_add_group_listener(
+            lambda group: async_add_entities(group_sensors(group))
+        )
+    )
 
-class FilamentPriceSensor(SensorEntity):
+
+@callback
+def _async_release_platform(hass: HomeAssistant, entry_id: str) -> None:
+    """Hand the integration sensors over to another entry on unload."""
+    platforms: dict[str, AddEntitiesCallback] = hass.data[SENSOR_PLATFORMS_KEY]
+    owner = next(iter(platforms), None)
+    platforms.pop(entry_id, None)
+    if owner != entry_id or not platforms:
+        return
+    next_entry_id, async_add_entities = next(iter(platforms.items()))
+    if (entry := hass.config_entries.async_get_entry(next_entry_id)) is not None:
+        _async_add_integration_sensors(hass, entry, async_add_entities)
+
+
+class FilamentPriceSensor(FilamentTrackerEntity, SensorEntity):
     """Sensor entity for displaying the price (read-only)."""
 
-    def __init__(self, entry_id: str, name: str, price: float) -> None:
+    def __init__(
+        self, config_entry: ConfigEntry, device_info: DeviceInfo, price: float
+    ) -> None:
         """Initialize the Filament price sensor."""
-        self._attr_unique_id = f"{entry_id}_price"
-        self._attr_name = f"{name} Price"
+        super().__init__(config_entry, device_info, "price", "Price")
         self._attr_native_unit_of_measurement = "R$"
         self._attr_icon = "mdi:currency-brl"
         self._state = price
 
-    @property
-    def device_info(self) -> dict:
-        """Return device info for grouping entities under one device."""
-        config_entry = next(
-            (
-                entry
-                for entry in self.hass.config_entries.async_entries(DOMAIN)
-                if entry.entry_id == self._attr_unique_id.split("_", maxsplit=1)[0]
-            ),
-            None,
-        )
-        brand = config_entry.data.get("brand", "") if config_entry else ""
-        model = config_entry.data.get("model", "") if config_entry else ""
-        return {
-            "identifiers": {(DOMAIN, self._attr_unique_id.split("_", maxsplit=1)[0])},
-            "name": self._attr_name.split(" ", maxsplit=1)[0],
-            "manufacturer": brand or "Filament Tracker",
-            "model": model or "Generic",
-        }
-
     @property
     def native_value(self) -> float:
         """Return the current price."""
         return self._state
 
 
-class FilamentColorSensor(SensorEntity):
+class FilamentColorSensor(FilamentTrackerEntity, SensorEntity):
     """Sensor entity for displaying the color (read-only)."""
 
-    def __init__(self, entry_id: str, name: str, color: str) -> None:
+    def __init__(
+        self, config_entry: ConfigEntry, device_info: DeviceInfo, color: str
+    ) -> None:
         """Initialize the Filament color sensor."""
-        self._attr_unique_id = f"{entry_id}_color"
-        self._attr_name = f"{name} Color"
+        super().__init__(config_entry, device_info, "color", "Color")
         self._attr_icon = "mdi:palette"
         self._state = color
 
-    @property
-    def device_info(self) -> dict:
-        """Return device info for grouping entities under one device."""
-        config_entry = next(
-            (
-                entry
-                for entry in self.hass.config_entries.async_entries(DOMAIN)
-                if entry.entry_id == self._attr_unique_id.split("_", maxsplit=1)[0]
-            ),
-            None,
-        )
-        brand = config_entry.data.get("brand", "") if config_entry else ""
-        model = config_entry.data.get("model", "") if config_entry else ""
-        return {
-            "identifiers": {(DOMAIN, self._attr_unique_id.split("_", maxsplit=1)[0])},
-            "name": self._attr_name.split(" ", maxsplit=1)[0],
-            "manufacturer": brand or "Filament Tracker",
-            "model": model or "Generic",
-        }
-
     @property
     def native_value(self) -> str:
         """Return the current color."""
         return self._state
 
 
-class FilamentTypeSensor(SensorEntity):
+class FilamentTypeSensor(FilamentTrackerEntity, SensorEntity):
     """Sensor entity for displaying the filament type (read-only)."""
 
-    def __init__(self, entry_id: str, name: str, filament_type: str) -> None:
+    def __init__(
+        self, config_entry: ConfigEntry, device_info: DeviceInfo, filament_type: str
+    ) -> None:
         """Initialize the Filament type sensor."""
-        self._attr_unique_id = f"{entry_id}_type"
-        self._attr_name = f"{name} Type"
+        super().__init__(config_entry, device_info, "type", "Type")
         self._attr_icon = "mdi:format-list-bulleted-type"
         self._state = filament_type
 
@@ -114,22 +178,183 @@ class FilamentTypeSensor(SensorEntity):
         """Return the current filament type."""
         return self._state
 
+
+class FilamentStatsSensor(SensorEntity):
+    """Diagnostic sensor exposing the runtime performance counters."""
+
+    _attr_device_info = INVENTORY_DEVICE_INFO
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_icon = "mdi:speedometer"
+    _attr_name = "Filament Tracker Stats"
+    _attr_should_poll = False
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_unique_id = f"{DOMAIN}_stats"
+    _unrecorded_attributes = frozenset({"counters", "p99_ms"})
+
+    def __init__(self, stats: PerformanceStats) -> None:
+        """Initialize the stats sensor."""
+        self._stats = stats
+
+    async def async_added_to_hass(self) -> None:
+        """Follow the counters."""
+        self.async_on_remove(self._stats.async_add_listener(self.async_write_ha_state))
+
     @property
-    def device_info(self) -> dict:
-        """Return device info for grouping entities under one device."""
-        config_entry = next(
-            (
-                entry
-                for entry in self.hass.config_entries.async_entries(DOMAIN)
-                if entry.entry_id == self._attr_unique_id.split("_", maxsplit=1)[0]
-            ),
-            None,
-        )
-        brand = config_entry.data.get("brand", "") if config_entry else ""
-        model = config_entry.data.get("model", "") if config_entry else ""
+    def native_value(self) -> int:
+        """Return the number of deductions applied since startup."""
+        return self._stats.counters["deductions_applied"]
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the counters and the p99 latency of each hot path."""
         return {
-            "identifiers": {(DOMAIN, self._attr_unique_id.split("_", maxsplit=1)[0])},
-            "name": self._attr_name.split(" ", maxsplit=1)[0],
-            "manufacturer": brand or "Filament Tracker",
-            "model": model or "Generic",
+            "counters": dict(self._stats.counters),
+            "p99_ms": {
+                name: histogram.percentile(0.99)
+                for name, histogram in self._stats.histograms.items()
+            },
         }
+
+
+class FilamentGroupSensor(SensorEntity):
+    """Sensor of a group of spools, removed once the group has no spools."""
+
+    _attr_device_info = INVENTORY_DEVICE_INFO
+    _attr_should_poll = False
+
+    def __init__(self, aggregates: InventoryAggregates, group: Group) -> None:
+        """Initialize the group sensor."""
+        self._aggregates = aggregates
+        self._group = group
+
+    async def async_added_to_hass(self) -> None:
+        """Follow the totals of the group."""
+        self.async_on_remove(
+            self._aggregates.async_add_listener(self._group, self._async_group_changed)
+        )
+
+    @callback
+    def _async_group_changed(self) -> None:
+        """Update the sensor, or remove it when its group is gone."""
+        if self._aggregates.async_has_group(self._group):
+            self.async_write_ha_state()
+        elif self.registry_entry is not None:
+            er.async_get(self.hass).async_remove(self.entity_id)
+        else:
+            self.hass.async_create_task(self.async_remove())
+
+
+class FilamentInventorySensor(FilamentGroupSensor):
+    """Total of the inventory, or of one filament type or brand."""
+
+    _attr_state_class = SensorStateClass.MEASUREMENT
+
+    def __init__(
+        self, aggregates: InventoryAggregates, group: Group, total: int
+    ) -> None:
+        """Initialize the inventory sensor."""
+        super().__init__(aggregates, group)
+        label, unit, icon = INVENTORY_TYPES[total]
+        kind, value = group
+        if kind == GROUP_TOTAL:
+            self._attr_name = f"Filament Inventory {label}"
+            self._attr_unique_id = f"{DOMAIN}_inventory_{slugify(label)}"
+        else:
+            self._attr_name = f"Filament Inventory {value} {label}"
+            self._attr_unique_id = (
+                f"{DOMAIN}_inventory_{kind}_{slugify(value)}_{slugify(label)}"
+            )
+        self._attr_native_unit_of_measurement = unit
+        self._attr_icon = icon
+        if kind == GROUP_TYPE:
+            self._attr_extra_state_attributes = {CONF_TYPE: value}
+        self._total = total
+
+    @property
+    def native_value(self) -> float | int:
+        """Return the current total."""
+        value = self._aggregates.async_totals(self._group)[self._total]
+        return int(value) if self._total == SPOOLS else round(value, 2)
+
+
+class FilamentForecastSensor(FilamentTrackerEntity, SensorEntity):
+    """Run-out forecast of a spool."""
+
+    def __init__(
+        self, config_entry: ConfigEntry, device_info: DeviceInfo, forecast: str
+    ) -> None:
+        """Initialize the forecast sensor."""
+        label, unit, icon = FORECAST_TYPES[forecast]
+        super().__init__(config_entry, device_info, f"forecast_{forecast}", label)
+        self._attr_native_unit_of_measurement = unit
+        self._attr_icon = icon
+        self._attr_should_poll = False
+        self._forecast = forecast
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the forecast value."""
+        forecasts: UsageForecasts = self.hass.data[FORECASTS_KEY]
+        weight = (
+            self.hass.data[NUMBER_ENTITIES_KEY].get(self._entry_id, {}).get("weight")
+        )
+        return forecasts.async_values(
+            (KIND_SPOOL, self._entry_id),
+            weight.native_value if weight is not None else None,
+        )[self._forecast]
+
+    async def async_added_to_hass(self) -> None:
+        """Follow the forecast and the remaining weight of the spool."""
+        self.async_on_remove(
+            self.hass.data[FORECASTS_KEY].async_add_listener(
+                (KIND_SPOOL, self._entry_id), self.async_write_ha_state
+            )
+        )
+        self.async_on_remove(
+            self.hass.data[INVENTORY_KEY].async_add_spool_listener(
+                self._async_spools_changed
+            )
+        )
+
+    @callback
+    def _async_spools_changed(self, entry_ids: set[str]) -> None:
+        """Update the days and prints left when the spool is refilled or used."""
+        if self._entry_id in entry_ids:
+            self.async_write_ha_state()
+
+
+class FilamentTypeForecastSensor(FilamentGroupSensor):
+    """Run-out forecast of all spools of a filament type."""
+
+    def __init__(self, hass: HomeAssistant, filament_type: str, forecast: str) -> None:
+        """Initialize the forecast sensor."""
+        super().__init__(hass.data[INVENTORY_KEY], (GROUP_TYPE, filament_type))
+        label, unit, icon = FORECAST_TYPES[forecast]
+        self._attr_name = f"Filament Inventory {filament_type} {label}"
+        self._attr_unique_id = (
+            f"{DOMAIN}_forecast_{KIND_TYPE}_{slugify(filament_type)}_{forecast}"
+        )
+        self._attr_native_unit_of_measurement = unit
+        self._attr_icon = icon
+        self._attr_extra_state_attributes = {CONF_TYPE: filament_type}
+        self._forecasts: UsageForecasts = hass.data[FORECASTS_KEY]
+        self._filament_type = filament_type
+        self._forecast = forecast
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the forecast value."""
+        remaining = self._aggregates.async_totals(self._group)
+        return self._forecasts.async_values(
+            (KIND_TYPE, self._filament_type), remaining[WEIGHT]
+        )[self._forecast]
+
+    async def async_added_to_hass(self) -> None:
+        """Follow the forecast and the remaining weight of the type."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self._forecasts.async_add_listener(
+                (KIND_TYPE, self._filament_type), self.async_write_ha_state
+            )
+        )
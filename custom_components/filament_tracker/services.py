@@ -0,0 +1,374 @@
+"""Services for Filament Tracker."""
+
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable
+import logging
+from time import perf_counter
+
+import voluptuous as vol
+
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import ServiceValidationError
+import homeassistant.helpers.config_validation as cv
+import homeassistant.util.dt as dt_util
+from homeassistant.util.ulid import ulid_now
+
+from .const import (
+    CONF_TYPE,
+    COORDINATORS_KEY,
+    DEFAULT_COLOR_TOLERANCE,
+    DOMAIN,
+    LEDGER_KEY,
+    NOTIFIER_KEY,
+    STATS_KEY,
+    TRACES_KEY,
+)
+from .inventory import (
+    FORMAT_JSONL,
+    FORMATS,
+    async_export_inventory,
+    async_import_inventory,
+    resolve_path,
+)
+from .ledger import UsageLedger
+from .notifications import SOURCE_SERVICE
+from .stats import PerformanceStats
+from .trace import TraceRecorder
+from .usage import (
+    SpoolUsage,
+    async_apply_usage,
+    async_is_duplicate,
+    async_plan_usage,
+    async_resolve_spool,
+    async_revert_usage,
+)
+
+_LOGGER = logging.getLogger(__package__)
+
+SERVICE_USE_FILAMENT = "use_filament"
+SERVICE_USE_FILAMENT_BATCH = "use_filament_batch"
+SERVICE_QUERY_USAGE = "query_usage"
+SERVICE_IMPORT_INVENTORY = "import_inventory"
+SERVICE_EXPORT_INVENTORY = "export_inventory"
+SERVICE_START_TRACE = "start_trace"
+SERVICE_STOP_TRACE = "stop_trace"
+SERVICE_UNDO_USAGE = "undo_usage"
+SERVICE_REDO_USAGE = "redo_usage"
+
+CONF_AMS_ACTIVE = "ams_active"
+
+CONF_DEDUCTIONS = "deductions"
+CONF_END = "end"
+CONF_ENTRY_ID = "entry_id"
+CONF_FORMAT = "format"
+CONF_JOB_ID = "job_id"
+CONF_PATH = "path"
+CONF_START = "start"
+CONF_TOLERANCE = "tolerance"
+
+SERVICE_SCHEMA = vol.Schema(
+    {
+        vol.Required("weight"): vol.Coerce(float),
+        vol.Required("meters"): vol.Coerce(float),
+        vol.Required("color"): str,
+        vol.Optional(CONF_TYPE): cv.string,
+        vol.Optional(CONF_TOLERANCE, default=DEFAULT_COLOR_TOLERANCE): vol.All(
+            vol.Coerce(float), vol.Range(min=0, max=50)
+        ),
+    }
+)
+
+USE_FILAMENT_SERVICE_SCHEMA = SERVICE_SCHEMA.extend(
+    {
+        vol.Optional(CONF_JOB_ID): cv.string,
+    }
+)
+
+BATCH_SERVICE_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_DEDUCTIONS): vol.All(
+            cv.ensure_list, vol.Length(min=1), [SERVICE_SCHEMA]
+        ),
+        vol.Optional(CONF_JOB_ID): cv.string,
+    }
+)
+
+JOB_SERVICE_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_JOB_ID): cv.string,
+    }
+)
+
+QUERY_SERVICE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(CONF_START): cv.datetime,
+        vol.Optional(CONF_END): cv.datetime,
+        vol.Optional(CONF_ENTRY_ID): cv.string,
+    }
+)
+
+INVENTORY_SERVICE_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_PATH): cv.string,
+        vol.Optional(CONF_FORMAT): vol.In(FORMATS),
+    }
+)
+
+STOP_TRACE_SERVICE_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_AMS_ACTIVE): cv.entity_id,
+    }
+)
+
+START_TRACE_SERVICE_SCHEMA = STOP_TRACE_SERVICE_SCHEMA.extend(
+    {
+        vol.Required(CONF_PATH): cv.string,
+    }
+)
+
+
+def _timed_service(
+    hass: HomeAssistant,
+    service: str,
+    handler: Callable[[ServiceCall], Awaitable[ServiceResponse]],
+) -> Callable[[ServiceCall], Awaitable[ServiceResponse]]:
+    """Count calls and errors of a service handler and time them."""
+    name = f"service.{service}"
+
+    async def wrapper(call: ServiceCall) -> ServiceResponse:
+        stats: PerformanceStats = hass.data[STATS_KEY]
+        stats.async_increment(name)
+        start = perf_counter()
+        try:
+            return await handler(call)
+        except ServiceValidationError:
+            stats.async_increment(f"{name}.rejected")
+            raise
+        finally:
+            stats.async_observe(name, perf_counter() - start)
+
+    return wrapper
+
+
+def _usage_response(
+    usages: list[SpoolUsage], job_id: str, duplicate: bool = False
+) -> ServiceResponse:
+    """Return the service response of a deduction."""
+    return {
+        "spools": [usage.as_dict() for usage in usages],
+        "total_weight": sum(usage.weight for usage in usages),
+        "total_meters": sum(usage.meters for usage in usages),
+        "total_cost": round(sum(usage.cost for usage in usages), 2),
+        "job_id": job_id,
+        "duplicate": duplicate,
+    }
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the Filament Tracker services."""
+
+    async def handle_use_filament(call: ServiceCall) -> ServiceResponse:
+        weight = call.data["weight"]
+        meters = call.data["meters"]
+        color = call.data["color"]
+        # Deductions without a job key get one, so they can be undone too
+        job_id = call.data.get(CONF_JOB_ID) or ulid_now()
+
+        _LOGGER.debug(
+            "Service called with weight=%s, meters=%s, color=%s", weight, meters, color
+        )
+        if async_is_duplicate(hass, job_id):
+            return _usage_response([], job_id, duplicate=True)
+
+        entry_id = async_resolve_spool(
+            hass, color, call.data.get(CONF_TYPE), call.data[CONF_TOLERANCE]
+        )
+        usages = async_plan_usage(hass, [(entry_id, weight, meters)])
+        _LOGGER.debug("Found matching filament: %s", usages[0].entry_id)
+        async_apply_usage(hass, usages, key=job_id)
+        hass.data[NOTIFIER_KEY].async_queue(usages, SOURCE_SERVICE, job_id)
+        return _usage_response(usages, job_id)
+
+    async def handle_use_filament_batch(call: ServiceCall) -> ServiceResponse:
+        deductions = call.data[CONF_DEDUCTIONS]
+        job_id = call.data.get(CONF_JOB_ID) or ulid_now()
+        _LOGGER.debug("Batch service called with %d deductions", len(deductions))
+        if async_is_duplicate(hass, job_id):
+            return _usage_response([], job_id, duplicate=True)
+
+        # Every deduction is resolved and validated before any spool changes
+        usages = async_plan_usage(
+            hass,
+            [
+                (
+                    async_resolve_spool(
+                        hass,
+                        deduction["color"],
+                        deduction.get(CONF_TYPE),
+                        deduction[CONF_TOLERANCE],
+                    ),
+                    deduction["weight"],
+                    deduction["meters"],
+                )
+                for deduction in deductions
+            ],
+        )
+        async_apply_usage(hass, usages, key=job_id)
+        hass.data[NOTIFIER_KEY].async_queue(usages, SOURCE_SERVICE, job_id)
+        return _usage_response(usages, job_id)
+
+    async def handle_undo_usage(call: ServiceCall) -> ServiceResponse:
+        job_id = call.data[CONF_JOB_ID]
+        usages = async_revert_usage(hass, job_id, undo=True)
+        return {"spools": [usage.as_dict() for usage in usages], "job_id": job_id}
+
+    async def handle_redo_usage(call: ServiceCall) -> ServiceResponse:
+        job_id = call.data[CONF_JOB_ID]
+        usages = async_revert_usage(hass, job_id, undo=False)
+        return {"spools": [usage.as_dict() for usage in usages], "job_id": job_id}
+
+    async def handle_query_usage(call: ServiceCall) -> ServiceResponse:
+        start = call.data.get(CONF_START)
+        end = call.data.get(CONF_END)
+        ledger: UsageLedger = hass.data[LEDGER_KEY]
+        totals = ledger.async_query(
+            start=dt_util.as_utc(start) if start else None,
+            end=dt_util.as_utc(end) if end else None,
+            entry_id=call.data.get(CONF_ENTRY_ID),
+        )
+
+        spools = []
+        for entry_id, (weight, meters, cost, count) in totals.items():
+            entry = hass.config_entries.async_get_entry(entry_id)
+            spools.append(
+                {
+                    "entry_id": entry_id,
+                    "name": entry.title if entry else None,
+                    "weight": round(weight, 2),
+                    "meters": round(meters, 2),
+                    "cost": round(cost, 2),
+                    "count": int(count),
+                }
+            )
+        return {
+            "spools": spools,
+            "total_weight": round(sum(spool["weight"] for spool in spools), 2),
+            "total_meters": round(sum(spool["meters"] for spool in spools), 2),
+            "total_cost": round(sum(spool["cost"] for spool in spools), 2),
+        }
+
+    async def handle_import_inventory(call: ServiceCall) -> ServiceResponse:
+        path, file_format = resolve_path(
+            hass, call.data[CONF_PATH], call.data.get(CONF_FORMAT)
+        )
+        return await async_import_inventory(hass, path, file_format)
+
+    async def handle_export_inventory(call: ServiceCall) -> ServiceResponse:
+        path, file_format = resolve_path(
+            hass, call.data[CONF_PATH], call.data.get(CONF_FORMAT)
+        )
+        count = await async_export_inventory(hass, path, file_format)
+        return {"path": path, "count": count}
+
+    async def handle_start_trace(call: ServiceCall) -> None:
+        ams_active = call.data[CONF_AMS_ACTIVE]
+        traces: dict[str, TraceRecorder] = hass.data[TRACES_KEY]
+        if (coordinator := hass.data[COORDINATORS_KEY].get(ams_active)) is None:
+            raise ServiceValidationError(
+                translation_domain=DOMAIN,
+                translation_key="printer_not_found",
+                translation_placeholders={"ams_active": ams_active},
+            )
+        if ams_active in traces:
+            raise ServiceValidationError(
+                translation_domain=DOMAIN,
+                translation_key="already_tracing",
+                translation_placeholders={"ams_active": ams_active},
+            )
+        path, _ = resolve_path(hass, call.data[CONF_PATH], FORMAT_JSONL)
+        recorder = traces[ams_active] = TraceRecorder(hass, coordinator, path)
+        recorder.async_start()
+
+    async def handle_stop_trace(call: ServiceCall) -> ServiceResponse:
+        ams_active = call.data[CONF_AMS_ACTIVE]
+        traces: dict[str, TraceRecorder] = hass.data[TRACES_KEY]
+        if (recorder := traces.pop(ams_active, None)) is None:
+            raise ServiceValidationError(
+                translation_domain=DOMAIN,
+                translation_key="not_tracing",
+                translation_placeholders={"ams_active": ams_active},
+            )
+        recorder.async_stop()
+        await recorder.async_save()
+        return {"path": recorder.path, "events": recorder.events}
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_USE_FILAMENT,
+        _timed_service(hass, SERVICE_USE_FILAMENT, handle_use_filament),
+        schema=USE_FILAMENT_SERVICE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_USE_FILAMENT_BATCH,
+        _timed_service(hass, SERVICE_USE_FILAMENT_BATCH, handle_use_filament_batch),
+        schema=BATCH_SERVICE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_QUERY_USAGE,
+        _timed_service(hass, SERVICE_QUERY_USAGE, handle_query_usage),
+        schema=QUERY_SERVICE_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_IMPORT_INVENTORY,
+        _timed_service(hass, SERVICE_IMPORT_INVENTORY, handle_import_inventory),
+        schema=INVENTORY_SERVICE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_EXPORT_INVENTORY,
+        _timed_service(hass, SERVICE_EXPORT_INVENTORY, handle_export_inventory),
+        schema=INVENTORY_SERVICE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_START_TRACE,
+        _timed_service(hass, SERVICE_START_TRACE, handle_start_trace),
+        schema=START_TRACE_SERVICE_SCHEMA,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_STOP_TRACE,
+        _timed_service(hass, SERVICE_STOP_TRACE, handle_stop_trace),
+        schema=STOP_TRACE_SERVICE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_UNDO_USAGE,
+        _timed_service(hass, SERVICE_UNDO_USAGE, handle_undo_usage),
+        schema=JOB_SERVICE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_REDO_USAGE,
+        _timed_service(hass, SERVICE_REDO_USAGE, handle_redo_usage),
+        schema=JOB_SERVICE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
@@ -0,0 +1,60 @@
+"""Snapshot of the remaining filament of every spool."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, STATS_KEY
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.spools"
+SAVE_DELAY = 10
+
+
+class SpoolSnapshot:
+    """Remaining weight and length of every spool, read once at startup.
+
+    This is where spool entities restore their value from. It is written
+    with a debounced save, which is flushed when Home Assistant stops.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize an empty snapshot."""
+        self._hass = hass
+        self._store: Store[dict[str, dict[str, float]]] = Store(
+            hass, STORAGE_VERSION, STORAGE_KEY
+        )
+        self._spools: dict[str, dict[str, float]] = {}
+
+    async def async_load(self) -> None:
+        """Load the snapshot from storage."""
+        if (data := await self._store.async_load()) is not None:
+            self._spools = data
+
+    @callback
+    def async_get(self, entry_id: str, number_type: str) -> float | None:
+        """Return the stored value of a spool, if any."""
+        return self._spools.get(entry_id, {}).get(number_type)
+
+    @callback
+    def async_set(self, entry_id: str, number_type: str, value: float) -> None:
+        """Store a value of a spool."""
+        values = self._spools.setdefault(entry_id, {})
+        if values.get(number_type) != value:
+            values[number_type] = value
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def async_remove(self, entry_id: str) -> None:
+        """Forget a deleted spool."""
+        if self._spools.pop(entry_id, None) is not None:
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the snapshot to store."""
+        self._hass.data[STATS_KEY].async_increment("storage_flush.spools")
+        return {entry_id: dict(values) for entry_id, values in self._spools.items()}
@@ -0,0 +1,171 @@
+"""Hourly consumption statistics for Filament Tracker."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from datetime import datetime
+import logging
+from typing import TYPE_CHECKING, Any
+
+from homeassistant.components.recorder.models import StatisticData, StatisticMetaData
+from homeassistant.components.recorder.statistics import async_add_external_statistics
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.storage import Store
+from homeassistant.util import slugify
+import homeassistant.util.dt as dt_util
+
+from .const import CONF_TYPE, DOMAIN, STATS_KEY
+
+if TYPE_CHECKING:
+    from .usage import SpoolUsage
+
+_LOGGER = logging.getLogger(__package__)
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.statistics"
+SAVE_DELAY = 30
+# Deductions are pushed to the recorder at most once per minute
+FLUSH_DELAY = 60
+
+# Statistic: (label, unit)
+STATISTIC_TYPES = {
+    "grams": ("Weight used", "g"),
+    "meters": ("Lenght used", "m"),
+    "cost": ("Cost", "R$"),
+}
+
+
+class ConsumptionStatistics:
+    """Per spool and per type consumption as recorder external statistics.
+
+    Each statistic is an hourly series of cumulative sums. Only the running
+    hour of a series is kept: the sum of the finished hours and the usage
+    of the running one. Changed series are pushed to the recorder after a
+    short delay, updating the row of the running hour. The row of an hour
+    that closes before it was pushed is pushed right away, and whatever is
+    still unpushed when Home Assistant stops is pushed then, or stored and
+    pushed with the next flush.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the statistics."""
+        self._hass = hass
+        self._store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._series: dict[str, dict[str, Any]] = {}
+        self._dirty: set[str] = set()
+        self._unsub_flush: CALLBACK_TYPE | None = None
+
+    async def async_load(self) -> None:
+        """Load the running hour of every series."""
+        if (data := await self._store.async_load()) is not None:
+            self._series = data
+            self._dirty = {
+                statistic_id
+                for statistic_id, series in data.items()
+                if series.pop("pending", False)
+            }
+        self._hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, self._async_stop)
+
+    @callback
+    def _async_stop(self, _event: Event) -> None:
+        """Push the changed series before Home Assistant stops."""
+        if self._unsub_flush is not None:
+            self._unsub_flush()
+        self._async_flush()
+
+    @callback
+    def async_record(self, usages: Iterable[SpoolUsage]) -> None:
+        """Add deductions to the running hour of their spool and type series."""
+        if "recorder" not in self._hass.config.components:
+            return
+        hour = dt_util.utcnow().replace(minute=0, second=0, microsecond=0).timestamp()
+        for usage in usages:
+            series = [(f"spool_{usage.entry_id.lower()}", usage.name)]
+            if entry := self._hass.config_entries.async_get_entry(usage.entry_id):
+                filament_type = entry.data.get(CONF_TYPE) or "PLA"
+                series.append((f"type_{slugify(filament_type)}", filament_type))
+            amounts = {
+                "grams": usage.weight,
+                "meters": usage.meters,
+                "cost": usage.cost,
+            }
+            for key, name in series:
+                for statistic, amount in amounts.items():
+                    self._async_add(
+                        f"{DOMAIN}:{key}_{statistic}", name, statistic, hour, amount
+                    )
+
+        if self._dirty and self._unsub_flush is None:
+            self._unsub_flush = async_call_later(
+                self._hass, FLUSH_DELAY, self._async_flush
+            )
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def _async_add(
+        self, statistic_id: str, name: str, statistic: str, hour: float, amount: float
+    ) -> None:
+        """Add an amount to the running hour of a series."""
+        label, unit = STATISTIC_TYPES[statistic]
+        if (series := self._series.get(statistic_id)) is None:
+            series = self._series[statistic_id] = {
+                "hour": hour,
+                "sum": 0.0,
+                "used": 0.0,
+            }
+        elif series["hour"] != hour:
+            if statistic_id in self._dirty:
+                # The closed hour was not pushed yet, its row is final now
+                self._async_push(statistic_id, series)
+            series["sum"] += series["used"]
+            series["hour"] = hour
+            series["used"] = 0.0
+        series["used"] += amount
+        series["name"] = f"{name} {label}"
+        series["unit"] = unit
+        self._dirty.add(statistic_id)
+
+    @callback
+    def _async_flush(self, _now: datetime | None = None) -> None:
+        """Push the running hour of every changed series to the recorder."""
+        self._unsub_flush = None
+        if "recorder" not in self._hass.config.components:
+            return
+        dirty, self._dirty = self._dirty, set()
+        for statistic_id in dirty:
+            self._async_push(statistic_id, self._series[statistic_id])
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+        _LOGGER.debug("Pushed %d consumption statistics", len(dirty))
+
+    @callback
+    def _async_push(self, statistic_id: str, series: dict[str, Any]) -> None:
+        """Push the running hour of a series to the recorder."""
+        metadata = StatisticMetaData(
+            has_mean=False,
+            has_sum=True,
+            name=series["name"],
+            source=DOMAIN,
+            statistic_id=statistic_id,
+            unit_of_measurement=series["unit"],
+        )
+        async_add_external_statistics(
+            self._hass,
+            metadata,
+            [
+                StatisticData(
+                    start=dt_util.utc_from_timestamp(series["hour"]),
+                    sum=series["sum"] + series["used"],
+                )
+            ],
+        )
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        """Return the running hour of every series to store."""
+        self._hass.data[STATS_KEY].async_increment("storage_flush.statistics")
+        return {
+            statistic_id: {**series, "pending": statistic_id in self._dirty}
+            for statistic_id, series in self._series.items()
+        }
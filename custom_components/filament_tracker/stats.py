@@ -0,0 +1,151 @@
+"""Runtime performance counters for Filament Tracker."""
+
+from __future__ import annotations
+
+from asyncio import Handle
+from bisect import bisect_left
+from collections import Counter
+from collections.abc import Callable
+from functools import wraps
+from time import perf_counter
+from typing import Any, Concatenate, ParamSpec, TypeVar
+
+from homeassistant.core import CALLBACK_TYPE, HomeAssistant, callback
+
+from .const import STATS_KEY
+
+_P = ParamSpec("_P")
+_R = TypeVar("_R")
+
+# Upper bounds of the latency buckets, in milliseconds
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+class LatencyHistogram:
+    """Fixed bucket latency histogram."""
+
+    __slots__ = ("buckets", "count", "max_ms", "total_ms")
+
+    def __init__(self) -> None:
+        """Initialize an empty histogram."""
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """Add a sample."""
+        ms = seconds * 1000
+        self.buckets[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, fraction: float) -> float | None:
+        """Return the upper bound of the bucket holding a percentile."""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        # The overflow bucket has no bound and is covered by max_ms
+        for bound, hits in zip(BUCKETS_MS, self.buckets, strict=False):
+            seen += hits
+            if seen >= rank:
+                return bound
+        return self.max_ms
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the histogram as diagnostics data."""
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 4) if self.count else None,
+            "p50_ms": self.percentile(0.5),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max_ms, 4),
+            "buckets": {
+                f"le_{bound}": hits
+                for bound, hits in zip((*BUCKETS_MS, "inf"), self.buckets, strict=True)
+            },
+        }
+
+
+class PerformanceStats:
+    """Counters and latency histograms of the integration's hot paths.
+
+    Listeners are told about changed counters once per event loop
+    iteration, and only while there are any.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize empty statistics."""
+        self._hass = hass
+        self.counters: Counter[str] = Counter()
+        self.histograms: dict[str, LatencyHistogram] = {}
+        self._listeners: list[CALLBACK_TYPE] = []
+        self._notify_handle: Handle | None = None
+
+    @callback
+    def async_increment(self, name: str, amount: int = 1) -> None:
+        """Increase a counter."""
+        self.counters[name] += amount
+        if self._listeners and self._notify_handle is None:
+            self._notify_handle = self._hass.loop.call_soon(self._async_notify)
+
+    @callback
+    def async_add_listener(self, update_callback: CALLBACK_TYPE) -> CALLBACK_TYPE:
+        """Listen for changes to the counters."""
+        self._listeners.append(update_callback)
+
+        @callback
+        def remove_listener() -> None:
+            self._listeners.remove(update_callback)
+
+        return remove_listener
+
+    @callback
+    def _async_notify(self) -> None:
+        """Tell the listeners the counters changed."""
+        self._notify_handle = None
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    @callback
+    def async_observe(self, name: str, seconds: float) -> None:
+        """Add a latency sample to a histogram."""
+        if (histogram := self.histograms.get(name)) is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        histogram.observe(seconds)
+
+    @callback
+    def as_dict(self) -> dict[str, Any]:
+        """Return the statistics as diagnostics data."""
+        return {
+            "counters": dict(sorted(self.counters.items())),
+            "latency": {
+                name: histogram.as_dict()
+                for name, histogram in sorted(self.histograms.items())
+            },
+        }
+
+
+def timed(
+    name: str,
+) -> Callable[[Callable[Concatenate[Any, _P], _R]], Callable[Concatenate[Any, _P], _R]]:
+    """Count calls of a method with a `hass` attribute and time them."""
+
+    def decorator(
+        func: Callable[Concatenate[Any, _P], _R],
+    ) -> Callable[Concatenate[Any, _P], _R]:
+        @wraps(func)
+        def wrapper(self: Any, *args: _P.args, **kwargs: _P.kwargs) -> _R:
+            stats: PerformanceStats = self.hass.data[STATS_KEY]
+            stats.async_increment(name)
+            start = perf_counter()
+            try:
+                return func(self, *args, **kwargs)
+            finally:
+                stats.async_observe(name, perf_counter() - start)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,129 @@
+"""AMS event traces for Filament Tracker."""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import time
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers.event import async_track_state_change_event
+
+from .const import DOMAIN, TRAY_IDENTIFIERS
+from .coordinator import AmsCoordinator
+
+_LOGGER = logging.getLogger(__package__)
+
+TRACE_VERSION = 1
+# Tray attributes the coordinator reads
+TRACE_ATTRIBUTES = ("active", "color", *TRAY_IDENTIFIERS)
+# A trace stops growing after this many state changes
+MAX_EVENTS = 100_000
+
+
+class TraceRecorder:
+    """Record the state changes a printer's coordinator listens to.
+
+    A trace is a JSON Lines file: a header with the printer entities and
+    their states when recording began, then one [seconds since start,
+    entity id, state, attributes] row per state change. Only the tray
+    attributes the coordinator reads are kept. The benchmarks replay traces
+    against a test instance, without a printer.
+    """
+
+    def __init__(
+        self, hass: HomeAssistant, coordinator: AmsCoordinator, path: str
+    ) -> None:
+        """Initialize the recorder."""
+        self._hass = hass
+        self.path = path
+        self._header: dict[str, Any] = {
+            "version": TRACE_VERSION,
+            "ams_active": coordinator.ams_active,
+            "usage_grams": coordinator.usage_grams,
+            "usage_meters": coordinator.usage_meters,
+            "ams_trays": list(coordinator.trays),
+            "live_interval": coordinator.live_interval,
+            "states": [],
+        }
+        self._entity_ids = [
+            coordinator.ams_active,
+            coordinator.usage_grams,
+            coordinator.usage_meters,
+            *coordinator.trays,
+        ]
+        self._rows: list[list[Any]] = []
+        self._start = 0.0
+        self._unsub: CALLBACK_TYPE | None = None
+
+    @property
+    def events(self) -> int:
+        """Return how many state changes were recorded."""
+        return len(self._rows)
+
+    @callback
+    def async_start(self) -> None:
+        """Record the current states and start following their changes."""
+        self._start = time.monotonic()
+        self._header["states"] = [
+            _compact([entity_id, state.state], state.attributes)
+            for entity_id in self._entity_ids
+            if (state := self._hass.states.get(entity_id)) is not None
+        ]
+        self._unsub = async_track_state_change_event(
+            self._hass, self._entity_ids, self._state_changed
+        )
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop recording."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+
+    async def async_save(self) -> None:
+        """Write the trace to its file."""
+        try:
+            await self._hass.async_add_executor_job(self._write)
+        except OSError as err:
+            raise ServiceValidationError(
+                translation_domain=DOMAIN,
+                translation_key="cannot_write",
+                translation_placeholders={"path": self.path, "error": str(err)},
+            ) from err
+        _LOGGER.debug("Wrote %d trace events to %s", len(self._rows), self.path)
+
+    @callback
+    def _state_changed(self, event: Event) -> None:
+        """Record a state change."""
+        if len(self._rows) >= MAX_EVENTS:
+            _LOGGER.warning(
+                "Trace %s reached %d events, stopping", self.path, MAX_EVENTS
+            )
+            self.async_stop()
+            return
+        row = [round(time.monotonic() - self._start, 3), event.data["entity_id"]]
+        if (new_state := event.data.get("new_state")) is None:
+            # A removed entity is replayed as a removal
+            self._rows.append([*row, None])
+        else:
+            self._rows.append(_compact([*row, new_state.state], new_state.attributes))
+
+    def _write(self) -> None:
+        """Write the header and rows next to the trace, then move it into place."""
+        with open(f"{self.path}.tmp", "w", encoding="utf-8") as file:
+            file.write(json.dumps(self._header) + "\n")
+            file.writelines(
+                json.dumps(row, separators=(",", ":")) + "\n" for row in self._rows
+            )
+        os.replace(f"{self.path}.tmp", self.path)
+
+
+def _compact(row: list[Any], attributes: Any) -> list[Any]:
+    """Append the traced attributes of a state to a row, if it has any."""
+    if attrs := {key: attributes[key] for key in TRACE_ATTRIBUTES if key in attributes}:
+        row.append(attrs)
+    return row
@@ -0,0 +1,69 @@
+"""Cached translations for Filament Tracker notifications."""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Any
+
+from homeassistant.core import Event, HomeAssistant
+from homeassistant.util.json import load_json
+
+_LOGGER = logging.getLogger(__package__)
+
+TRANSLATIONS_DIR = Path(__file__).parent / "translations"
+FALLBACK_LANGUAGE = "en"
+
+
+def _load_translations(language: str) -> dict[str, Any]:
+    """Load translations with english fallback (runs in the executor)."""
+    translations = {}
+
+    try:
+        translations = load_json(TRANSLATIONS_DIR / f"{language}.json")
+        _LOGGER.debug("Loaded %s translations: %s", language, bool(translations))
+    except (FileNotFoundError, ValueError) as e:
+        _LOGGER.warning("Failed to load %s translations: %s", language, str(e))
+
+    # English fallback
+    if not translations and language != FALLBACK_LANGUAGE:
+        try:
+            translations = load_json(TRANSLATIONS_DIR / f"{FALLBACK_LANGUAGE}.json")
+            _LOGGER.debug(
+                "Loaded English fallback translations: %s", bool(translations)
+            )
+        except (FileNotFoundError, ValueError) as e:
+            _LOGGER.error("Failed to load English fallback translations: %s", str(e))
+
+    return translations if isinstance(translations, dict) else {}
+
+
+class TranslationCache:
+    """Translations of the configured language, loaded once and kept in memory."""
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize an empty cache."""
+        self._hass = hass
+        self._cache: dict[str, dict[str, Any]] = {}
+        self.language: str | None = None
+
+    @property
+    def translations(self) -> dict[str, Any]:
+        """Return the translations of the active language."""
+        return self._cache.get(self.language, {})
+
+    async def async_load(self) -> None:
+        """Load the translations of the configured language if not cached yet."""
+        language = self._hass.config.language
+        if language not in self._cache:
+            self._cache[language] = await self._hass.async_add_executor_job(
+                _load_translations, language
+            )
+        self.language = language
+
+    async def async_core_config_updated(self, event: Event) -> None:
+        """Switch translations when the configured language changes."""
+        if self._hass.config.language == self.language:
+            return
+        _LOGGER.debug("Language changed to %s", self._hass.config.language)
+        await self.async_load()
@@ -0,0 +1,385 @@
+"""Filament usage deductions for Filament Tracker."""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass
+import logging
+from time import perf_counter
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import ServiceValidationError
+
+from .const import (
+    CONF_PRICE,
+    DEFAULT_COLOR_TOLERANCE,
+    DOMAIN,
+    FORECASTS_KEY,
+    JOURNAL_KEY,
+    LEDGER_KEY,
+    NUMBER_ENTITIES_KEY,
+    SPOOL_INDEX_KEY,
+    STATISTICS_KEY,
+    STATS_KEY,
+    TRANSLATIONS_KEY,
+)
+from .index import SpoolIndex
+from .journal import DeductionJournal
+from .stats import PerformanceStats
+
+_LOGGER = logging.getLogger(__package__)
+
+
+@dataclass(slots=True)
+class SpoolUsage:
+    """Deduction planned for a single spool."""
+
+    entry_id: str
+    name: str
+    price: float
+    old_weight: float
+    old_meters: float
+    weight: float = 0.0
+    meters: float = 0.0
+
+    @property
+    def new_weight(self) -> float:
+        """Return the remaining weight after the deduction."""
+        return max(0, self.old_weight - self.weight)
+
+    @property
+    def new_meters(self) -> float:
+        """Return the remaining length after the deduction."""
+        return max(0, self.old_meters - self.meters)
+
+    @property
+    def cost(self) -> float:
+        """Return the estimated cost of the deducted filament."""
+        return (self.price / 1000) * self.weight
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the deduction as service response data."""
+        return {
+            "entry_id": self.entry_id,
+            "name": self.name,
+            "weight": self.weight,
+            "meters": self.meters,
+            "cost": round(self.cost, 2),
+            "new_weight": self.new_weight,
+            "new_meters": self.new_meters,
+        }
+
+
+@callback
+def async_resolve_spool(
+    hass: HomeAssistant,
+    color: str,
+    filament_type: str | None = None,
+    tolerance: float = DEFAULT_COLOR_TOLERANCE,
+) -> str:
+    """Return the entry id of the only spool matching a color.
+
+    Without an exact match, the perceptually nearest spool within the ΔE
+    tolerance is used. An optional filament type narrows both lookups.
+    """
+    index: SpoolIndex = hass.data[SPOOL_INDEX_KEY]
+    stats: PerformanceStats = hass.data[STATS_KEY]
+    start = perf_counter()
+    matches = index.async_lookup(color, filament_type)
+    stats.async_observe("lookup", perf_counter() - start)
+    if not matches and tolerance > 0:
+        start = perf_counter()
+        matches = index.async_nearest(color, tolerance, filament_type)
+        stats.async_observe("lookup.nearest", perf_counter() - start)
+        if matches:
+            stats.async_increment("lookup_nearest")
+    if not matches:
+        stats.async_increment("lookup_misses")
+        raise ServiceValidationError(
+            translation_domain=DOMAIN,
+            translation_key="no_matching_filament",
+            translation_placeholders={"color": color},
+        )
+    if len(matches) > 1:
+        stats.async_increment("lookup_ambiguous")
+        names = ", ".join(
+            entry.title
+            for entry_id in matches
+            if (entry := hass.config_entries.async_get_entry(entry_id))
+        )
+        raise ServiceValidationError(
+            translation_domain=DOMAIN,
+            translation_key="ambiguous_color",
+            translation_placeholders={
+                "color": color,
+                "count": str(len(matches)),
+                "names": names,
+            },
+        )
+    stats.async_increment("lookup_hits")
+    return matches[0]
+
+
+@callback
+def async_plan_usage(
+    hass: HomeAssistant, deductions: Iterable[tuple[str, float, float]]
+) -> list[SpoolUsage]:
+    """Validate (entry_id, weight, meters) deductions without changing any spool.
+
+    Deductions on the same spool are merged into one, and capped at what the
+    spool holds, so the history records what was actually taken from it.
+    """
+    usages: dict[str, SpoolUsage] = {}
+
+    for entry_id, weight, meters in deductions:
+        if (usage := usages.get(entry_id)) is None:
+            if (entry := hass.config_entries.async_get_entry(entry_id)) is None:
+                raise ServiceValidationError(
+                    translation_domain=DOMAIN,
+                    translation_key="unknown_filament",
+                    translation_placeholders={"entry_id": entry_id},
+                )
+            entities = hass.data[NUMBER_ENTITIES_KEY].get(entry_id, {})
+            if "weight" not in entities or "lenght" not in entities:
+                raise ServiceValidationError(
+                    translation_domain=DOMAIN,
+                    translation_key="missing_entities",
+                    translation_placeholders={"name": entry.title},
+                )
+            usage = usages[entry_id] = SpoolUsage(
+                entry_id=entry_id,
+                name=entry.title,
+                price=float(entry.data.get(CONF_PRICE) or 0.0),
+                old_weight=entities["weight"].native_value,
+                old_meters=entities["lenght"].native_value,
+            )
+        usage.weight += weight
+        usage.meters += meters
+
+    for usage in usages.values():
+        usage.weight = min(usage.weight, usage.old_weight)
+        usage.meters = min(usage.meters, usage.old_meters)
+    return list(usages.values())
+
+
+@callback
+def async_apply_usage(
+    hass: HomeAssistant,
+    usages: list[SpoolUsage],
+    record: bool = True,
+    key: str | None = None,
+) -> None:
+    """Write planned deductions to the spool entities.
+
+    Deductions are serialized per spool by applying them in the same event
+    loop step they were planned in: with no await in between, no other
+    deduction can read the old values of the spool. Pass record=False when
+    the caller adds the deductions to the ledger itself.
+    """
+    for usage in usages:
+        entities = hass.data[NUMBER_ENTITIES_KEY][usage.entry_id]
+        _LOGGER.debug(
+            "Setting %s weight to %s and lenght to %s",
+            usage.name,
+            usage.new_weight,
+            usage.new_meters,
+        )
+        entities["weight"].async_set_remaining(usage.new_weight)
+        entities["lenght"].async_set_remaining(usage.new_meters)
+    hass.data[STATS_KEY].async_increment("deductions_applied", len(usages))
+    if record:
+        async_record_usage(hass, usages, key)
+
+
+@callback
+def async_record_usage(
+    hass: HomeAssistant,
+    usages: list[SpoolUsage],
+    key: str | None = None,
+    jobs: bool = True,
+) -> None:
+    """Add applied deductions to the ledger, forecasts and statistics.
+
+    Deductions of a job key are also journaled, so they can be undone. Pass
+    jobs=False when the deductions correct earlier ones instead of being
+    new jobs, so they are not counted as jobs and only move the usage rate
+    of the forecasts.
+    """
+    hass.data[LEDGER_KEY].async_record(usages, jobs)
+    hass.data[FORECASTS_KEY].async_record(usages, jobs)
+    hass.data[STATISTICS_KEY].async_record(usages)
+    if key is not None:
+        hass.data[JOURNAL_KEY].async_add(key, usages)
+
+
+@callback
+def async_is_duplicate(hass: HomeAssistant, key: str | None) -> bool:
+    """Return whether the deduction of a job key was already journaled."""
+    if key is None:
+        return False
+    journal: DeductionJournal = hass.data[JOURNAL_KEY]
+    if journal.async_get(key) is None:
+        return False
+    _LOGGER.debug("Job %s was already deducted, ignoring it", key)
+    hass.data[STATS_KEY].async_increment("deductions_duplicate")
+    return True
+
+
+@callback
+def async_revert_usage(hass: HomeAssistant, key: str, undo: bool) -> list[SpoolUsage]:
+    """Undo the journaled deduction of a job, or apply it again after an undo.
+
+    Every spool is validated before any of them changes. The ledger,
+    statistics and usage rates get the reversal as negative usage.
+    """
+    journal: DeductionJournal = hass.data[JOURNAL_KEY]
+    if (entry := journal.async_get(key)) is None:
+        raise ServiceValidationError(
+            translation_domain=DOMAIN,
+            translation_key="job_not_journaled",
+            translation_placeholders={"job_id": key},
+        )
+    if entry.undone == undo:
+        raise ServiceValidationError(
+            translation_domain=DOMAIN,
+            translation_key="job_already_undone" if undo else "job_already_applied",
+            translation_placeholders={"job_id": key},
+        )
+    sign = -1 if undo else 1
+    usages = async_plan_usage(
+        hass,
+        [
+            (entry_id, sign * weight, sign * meters)
+            for entry_id, weight, meters in entry.deductions
+        ],
+    )
+    async_apply_usage(hass, usages, record=False)
+    async_record_usage(hass, usages, jobs=False)
+    journal.async_set_undone(key, undo)
+    return usages
+
+
+def _notification_config(
+    hass: HomeAssistant, service: str, key: str = "notification"
+) -> dict[str, Any]:
+    """Return the translated notification strings of a service."""
+    return (
+        hass.data[TRANSLATIONS_KEY]
+        .translations.get("services", {})
+        .get(service, {})
+        .get(key, {})
+    )
+
+
+@callback
+def format_usage(hass: HomeAssistant, usage: SpoolUsage) -> tuple[str, str]:
+    """Return the title and message of the usage notification of a spool."""
+    notification_config = _notification_config(hass, "use_filament")
+
+    title = notification_config.get(
+        "title",
+        "Filament Usage 🧵",  # Fallback padrão
+    )
+
+    message_template = notification_config.get(
+        "message",
+        "This print used {weight:.2f}g.\nEstimated cost: R$ {cost:.2f}\nRemaining on spool: {new_weight:.2f}g and {new_meters:.2f}m",
+    )
+
+    # Formata a mensagem
+    try:
+        message = message_template.format(
+            weight=usage.weight,
+            cost=usage.cost,
+            new_weight=usage.new_weight,
+            new_meters=usage.new_meters,
+        )
+    except KeyError as e:
+        _LOGGER.error("Missing key in translation: %s", str(e))
+        message = f"Print data: {usage.weight}g used, {usage.cost}R$ cost, {usage.new_weight}g remaining"
+
+    return title, message
+
+
+@callback
+def format_usage_summary(
+    hass: HomeAssistant, usages: list[SpoolUsage]
+) -> tuple[str, str]:
+    """Return the title and message summing up deductions on several spools."""
+    notification_config = _notification_config(hass, "use_filament_batch")
+
+    title = notification_config.get("title", "Filament Usage 🧵")
+    message_template = notification_config.get(
+        "message",
+        "This print used {weight:.2f}g from {spools} spools.\nEstimated cost: R$ {cost:.2f}",
+    )
+    line_template = notification_config.get(
+        "line",
+        "{name}: {weight:.2f}g used, {new_weight:.2f}g and {new_meters:.2f}m remaining",
+    )
+
+    try:
+        lines = [
+            message_template.format(
+                weight=sum(usage.weight for usage in usages),
+                cost=sum(usage.cost for usage in usages),
+                spools=len(usages),
+            )
+        ]
+        lines.extend(
+            line_template.format(
+                name=usage.name,
+                weight=usage.weight,
+                new_weight=usage.new_weight,
+                new_meters=usage.new_meters,
+            )
+            for usage in usages
+        )
+    except KeyError as e:
+        _LOGGER.error("Missing key in translation: %s", str(e))
+        lines = [
+            f"{usage.name}: {usage.weight}g used, {usage.new_weight}g remaining"
+            for usage in usages
+        ]
+
+    return title, "\n".join(lines)
+
+
+@callback
+def format_jobs(hass: HomeAssistant, keys: list[str]) -> str:
+    """Return the notification line with the keys of the notified jobs."""
+    notification_config = _notification_config(hass, "use_filament")
+
+    job_template = notification_config.get("job", "Job: {job_id}")
+    try:
+        return job_template.format(job_id=", ".join(keys))
+    except KeyError as e:
+        _LOGGER.error("Missing key in translation: %s", str(e))
+        return ", ".join(keys)
+
+
+@callback
+def format_low_stock(
+    hass: HomeAssistant, usage: SpoolUsage, threshold: float
+) -> tuple[str, str]:
+    """Return the title and message of a low stock alert."""
+    notification_config = _notification_config(hass, "use_filament", "low_stock")
+
+    title = notification_config.get("title", "Filament Running Low 🧵")
+    message_template = notification_config.get(
+        "message",
+        "{name} is below {threshold:.0f}g: {new_weight:.2f}g and {new_meters:.2f}m remaining",
+    )
+    try:
+        message = message_template.format(
+            name=usage.name,
+            threshold=threshold,
+            new_weight=usage.new_weight,
+            new_meters=usage.new_meters,
+        )
+    except KeyError as e:
+        _LOGGER.error("Missing key in translation: %s", str(e))
+        message = f"{usage.name}: {usage.new_weight}g remaining"
+
+    return title, message
@@ -0,0 +1,122 @@
+"""Websocket API for Filament Tracker."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, callback
+
+from .aggregate import InventoryAggregates
+from .const import (
+    CONF_BRAND,
+    CONF_COLOR,
+    CONF_PRICE,
+    CONF_TYPE,
+    DOMAIN,
+    INVENTORY_KEY,
+    SNAPSHOT_KEY,
+)
+from .snapshot import SpoolSnapshot
+
+
+@callback
+def async_setup_websocket_api(hass: HomeAssistant) -> None:
+    """Register the Filament Tracker websocket commands."""
+    websocket_api.async_register_command(hass, websocket_inventory)
+    websocket_api.async_register_command(hass, websocket_subscribe_inventory)
+
+
+@callback
+def _spool_record(hass: HomeAssistant, entry_id: str) -> dict[str, Any] | None:
+    """Return the compact record of a spool, or None once it is gone."""
+    aggregates: InventoryAggregates = hass.data[INVENTORY_KEY]
+    if not aggregates.async_has_spool(entry_id) or not (
+        entry := hass.config_entries.async_get_entry(entry_id)
+    ):
+        return None
+    snapshot: SpoolSnapshot = hass.data[SNAPSHOT_KEY]
+    return {
+        "entry_id": entry_id,
+        "name": entry.title,
+        "color": entry.data.get(CONF_COLOR),
+        "type": entry.data.get(CONF_TYPE),
+        "brand": entry.data.get(CONF_BRAND),
+        "price": entry.data.get(CONF_PRICE),
+        "weight": snapshot.async_get(entry_id, "weight"),
+        "lenght": snapshot.async_get(entry_id, "lenght"),
+    }
+
+
+@callback
+def _inventory(hass: HomeAssistant) -> dict[str, dict[str, Any]]:
+    """Return the records of every spool by entry id."""
+    return {
+        entry.entry_id: record
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if (record := _spool_record(hass, entry.entry_id)) is not None
+    }
+
+
+@websocket_api.websocket_command({vol.Required("type"): f"{DOMAIN}/inventory"})
+@callback
+def websocket_inventory(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: dict[str, Any],
+) -> None:
+    """Return every spool as one snapshot."""
+    connection.send_result(msg["id"], {"spools": list(_inventory(hass).values())})
+
+
+@websocket_api.websocket_command(
+    {vol.Required("type"): f"{DOMAIN}/inventory/subscribe"}
+)
+@callback
+def websocket_subscribe_inventory(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: dict[str, Any],
+) -> None:
+    """Send every spool as one snapshot, then only what changes.
+
+    After the snapshot, each event holds the changed fields of the spools
+    that changed in one event loop iteration, keyed by entry id, and the
+    entry ids of removed spools.
+    """
+    sent = _inventory(hass)
+
+    @callback
+    def forward_changes(entry_ids: set[str]) -> None:
+        changed: dict[str, dict[str, Any]] = {}
+        removed: list[str] = []
+        for entry_id in entry_ids:
+            old = sent.pop(entry_id, None)
+            if (record := _spool_record(hass, entry_id)) is None:
+                if old is not None:
+                    removed.append(entry_id)
+                continue
+            sent[entry_id] = record
+            if old is None:
+                changed[entry_id] = record
+            elif delta := {
+                key: value for key, value in record.items() if old.get(key) != value
+            }:
+                changed[entry_id] = delta
+        if changed or removed:
+            connection.send_message(
+                websocket_api.event_message(
+                    msg["id"], {"changed": changed, "removed": removed}
+                )
+            )
+
+    aggregates: InventoryAggregates = hass.data[INVENTORY_KEY]
+    connection.subscriptions[msg["id"]] = aggregates.async_add_spool_listener(
+        forward_changes
+    )
+    connection.send_result(msg["id"])
+    connection.send_message(
+        websocket_api.event_message(msg["id"], {"spools": list(sent.values())})
+    )
@@ -0,0 +1 @@
+"""Tests for the Filament Tracker components."""
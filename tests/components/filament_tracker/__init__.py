@@ -0,0 +1,52 @@
+"""Tests for the Filament Tracker integration."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.filament_tracker.const import DOMAIN, NUMBER_ENTITIES_KEY
+from homeassistant.core import HomeAssistant
+from homeassistant.setup import async_setup_component
+
+
+def add_spool(
+    hass: HomeAssistant,
+    name: str,
+    color: str,
+    options: dict[str, Any] | None = None,
+    **data: Any,
+) -> MockConfigEntry:
+    """Add a 1 kg, 330 m spool config entry."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title=name,
+        data={
+            "name": name,
+            "color": color,
+            "initial_length": 330.0,
+            "initial_weight": 1000.0,
+            "price": 100.0,
+            "type": "PLA",
+            "brand": "Test",
+            "model": "Basic",
+            **data,
+        },
+        options=options or {},
+    )
+    entry.add_to_hass(hass)
+    return entry
+
+
+async def async_setup_integration(hass: HomeAssistant) -> None:
+    """Set up the integration and every spool entry."""
+    assert await async_setup_component(hass, "persistent_notification", {})
+    assert await async_setup_component(hass, DOMAIN, {})
+    await hass.async_block_till_done()
+
+
+def remaining(hass: HomeAssistant, entry: MockConfigEntry) -> tuple[float, float]:
+    """Return the remaining weight and lenght of a spool."""
+    entities = hass.data[NUMBER_ENTITIES_KEY][entry.entry_id]
+    return entities["weight"].native_value, entities["lenght"].native_value
@@ -0,0 +1,394 @@
+"""Tests for the Filament Tracker AMS coordinator."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+from typing import Any
+
+import pytest
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.filament_tracker.const import DOMAIN
+from homeassistant.components.persistent_notification import (
+    _async_get_or_create_notifications,
+)
+from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import HomeAssistant
+import homeassistant.util.dt as dt_util
+
+from . import add_spool, async_setup_integration, remaining
+
+AMS_ACTIVE = "binary_sensor.p1s_ams_active"
+USAGE_GRAMS = "sensor.p1s_print_weight"
+USAGE_METERS = "sensor.p1s_print_length"
+TRAYS = ["sensor.p1s_ams_tray_1", "sensor.p1s_ams_tray_2", "sensor.p1s_ams_tray_3"]
+COLORS = ["#FF0000", "#FFFFFF", "#0000FF"]
+PRINTER_OPTIONS = {
+    "ams_active": AMS_ACTIVE,
+    "usage_grams": USAGE_GRAMS,
+    "usage_meters": USAGE_METERS,
+    "ams_trays": TRAYS,
+}
+LIVE_OPTIONS = {**PRINTER_OPTIONS, "live_tracking": True, "live_update_interval": 30}
+
+
+def set_usage(hass: HomeAssistant, grams: float, meters: float) -> None:
+    """Set the print usage sensors."""
+    hass.states.async_set(USAGE_GRAMS, str(grams))
+    hass.states.async_set(USAGE_METERS, str(meters))
+
+
+async def async_set_active(hass: HomeAssistant, tray: int | None) -> None:
+    """Make one tray the active one, or none of them."""
+    for i, tray_id in enumerate(TRAYS):
+        hass.states.async_set(
+            tray_id, "PLA", {"color": f"{COLORS[i][1:]}FF", "active": i == tray}
+        )
+    await hass.async_block_till_done()
+
+
+async def async_setup_printer(
+    hass: HomeAssistant, options: dict[str, Any]
+) -> list[Any]:
+    """Set up an idle printer with a red and a white spool."""
+    hass.states.async_set(AMS_ACTIVE, "off")
+    set_usage(hass, 0, 0)
+    await async_set_active(hass, None)
+    spools = [
+        add_spool(hass, "Red", COLORS[0], options),
+        add_spool(hass, "White", COLORS[1], options),
+    ]
+    await async_setup_integration(hass)
+    return spools
+
+
+async def async_set_ams(hass: HomeAssistant, state: str) -> None:
+    """Set the AMS status and wait for the coordinator."""
+    hass.states.async_set(AMS_ACTIVE, state)
+    await hass.async_block_till_done()
+
+
+async def async_query_usage(hass: HomeAssistant) -> dict[str, list[Any]]:
+    """Return the ledger totals of every spool by name."""
+    response = await hass.services.async_call(
+        DOMAIN, "query_usage", {}, blocking=True, return_response=True
+    )
+    return {
+        spool["name"]: [spool["weight"], spool["count"]] for spool in response["spools"]
+    }
+
+
+async def test_print_deducted_at_shutdown(hass: HomeAssistant) -> None:
+    """Test the usage of a print goes to the spool of the active tray."""
+    red, white = await async_setup_printer(hass, PRINTER_OPTIONS)
+
+    await async_set_ams(hass, "on")
+    await async_set_active(hass, 0)
+    set_usage(hass, 12.5, 4.2)
+    await async_set_ams(hass, "off")
+
+    assert remaining(hass, red) == pytest.approx((987.5, 325.8))
+    assert remaining(hass, white) == (1000.0, 330.0)
+
+
+async def test_live_print(hass: HomeAssistant) -> None:
+    """Test a live tracked print is deducted as it goes and recorded once."""
+    red, _ = await async_setup_printer(hass, LIVE_OPTIONS)
+
+    await async_set_ams(hass, "on")
+    await async_set_active(hass, 0)
+    set_usage(hass, 5.0, 1.5)
+    await hass.async_block_till_done()
+    # Usage is applied after the update interval, or when the print ends
+    assert remaining(hass, red) == (1000.0, 330.0)
+
+    set_usage(hass, 12.0, 4.0)
+    await async_set_ams(hass, "off")
+
+    assert remaining(hass, red) == (988.0, 326.0)
+    assert await async_query_usage(hass) == {"Red": [12.0, 1]}
+
+
+async def test_live_print_resumed_after_reload(hass: HomeAssistant) -> None:
+    """Test a print running while the spools reload is only deducted once."""
+    red, white = await async_setup_printer(hass, LIVE_OPTIONS)
+
+    await async_set_ams(hass, "on")
+    await async_set_active(hass, 0)
+    set_usage(hass, 5.0, 1.5)
+    await hass.async_block_till_done()
+
+    # The last spool to go stops the coordinator, which checkpoints the print
+    assert await hass.config_entries.async_unload(white.entry_id)
+    assert await hass.config_entries.async_unload(red.entry_id)
+    assert await hass.config_entries.async_setup(red.entry_id)
+    assert await hass.config_entries.async_setup(white.entry_id)
+    await hass.async_block_till_done()
+    assert remaining(hass, red) == (995.0, 328.5)
+
+    set_usage(hass, 12.0, 4.0)
+    await async_set_ams(hass, "off")
+
+    assert remaining(hass, red) == (988.0, 326.0)
+    assert await async_query_usage(hass) == {"Red": [12.0, 1]}
+
+
+@pytest.mark.parametrize(
+    ("saved_weight", "saved_lenght"), [(None, None), (990.0, 327.0)]
+)
+async def test_live_print_resumed_from_checkpoint(
+    hass: HomeAssistant,
+    hass_storage: dict[str, Any],
+    saved_weight: float | None,
+    saved_lenght: float | None,
+) -> None:
+    """Test a checkpoint saved apart from the spool snapshot is reconciled.
+
+    Without a snapshot the spool misses the usage the checkpoint applied; a
+    snapshot saved after the checkpoint holds usage the checkpoint misses.
+    """
+    hass.states.async_set(AMS_ACTIVE, "on")
+    set_usage(hass, 10.0, 3.0)
+    await async_set_active(hass, 0)
+    red = add_spool(hass, "Red", COLORS[0], LIVE_OPTIONS)
+    add_spool(hass, "White", COLORS[1], LIVE_OPTIONS)
+    if saved_weight is not None:
+        hass_storage["filament_tracker.spools"] = {
+            "version": 1,
+            "key": "filament_tracker.spools",
+            "data": {red.entry_id: {"weight": saved_weight, "lenght": saved_lenght}},
+        }
+    hass_storage["filament_tracker.live_jobs"] = {
+        "version": 1,
+        "key": "filament_tracker.live_jobs",
+        "data": {
+            AMS_ACTIVE: {
+                "applied": [5.0, 1.5],
+                "spools": {red.entry_id: [5.0, 1.5]},
+                "pending": {},
+                "tray": TRAYS[0],
+                "started": dt_util.utcnow().isoformat(),
+                "remaining": {red.entry_id: [995.0, 328.5]},
+            }
+        },
+    }
+    await async_setup_integration(hass)
+
+    set_usage(hass, 12.0, 4.0)
+    await async_set_ams(hass, "off")
+
+    assert remaining(hass, red) == (988.0, 326.0)
+    assert await async_query_usage(hass) == {"Red": [12.0, 1]}
+
+
+async def test_live_print_survives_ams_flap(hass: HomeAssistant) -> None:
+    """Test the AMS dropping out mid-print neither restarts nor loses it."""
+    red, white = await async_setup_printer(hass, LIVE_OPTIONS)
+
+    await async_set_ams(hass, "on")
+    await async_set_active(hass, 0)
+    set_usage(hass, 5.0, 1.5)
+    await hass.async_block_till_done()
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=30))
+    await hass.async_block_till_done()
+    assert remaining(hass, red) == (995.0, 328.5)
+
+    await async_set_ams(hass, "unavailable")
+    await async_set_ams(hass, "on")
+
+    await async_set_active(hass, 1)
+    set_usage(hass, 8.0, 2.5)
+    await async_set_ams(hass, "off")
+
+    assert remaining(hass, red) == (995.0, 328.5)
+    assert remaining(hass, white) == (997.0, 329.0)
+    assert await async_query_usage(hass) == {"Red": [5.0, 1], "White": [3.0, 1]}
+
+
+async def test_print_split_across_trays(hass: HomeAssistant) -> None:
+    """Test a print is split by how much each tray used."""
+    red, white = await async_setup_printer(hass, PRINTER_OPTIONS)
+
+    await async_set_ams(hass, "on")
+    await async_set_active(hass, 0)
+    set_usage(hass, 6.0, 2.0)
+    await async_set_active(hass, 1)
+    set_usage(hass, 10.0, 3.0)
+    await async_set_ams(hass, "off")
+
+    assert remaining(hass, red) == pytest.approx((994.0, 328.0))
+    assert remaining(hass, white) == pytest.approx((996.0, 329.0))
+
+
+async def test_print_split_after_usage_reset(hass: HomeAssistant) -> None:
+    """Test usage restarting from zero mid-print is charged to the active tray."""
+    hass.states.async_set(AMS_ACTIVE, "off")
+    # The usage sensors still hold the total of the previous print
+    set_usage(hass, 50.0, 16.0)
+    await async_set_active(hass, None)
+    red, white, blue = (
+        add_spool(hass, name, color, PRINTER_OPTIONS)
+        for name, color in zip(("Red", "White", "Blue"), COLORS, strict=True)
+    )
+    await async_setup_integration(hass)
+
+    await async_set_ams(hass, "on")
+    await async_set_active(hass, 0)
+    set_usage(hass, 30.0, 10.0)
+    await async_set_active(hass, 1)
+    set_usage(hass, 50.0, 16.0)
+    await async_set_active(hass, 2)
+    set_usage(hass, 60.0, 20.0)
+    await async_set_ams(hass, "off")
+
+    assert remaining(hass, red) == pytest.approx((970.0, 320.0))
+    assert remaining(hass, white) == pytest.approx((980.0, 324.0))
+    assert remaining(hass, blue) == pytest.approx((990.0, 326.0))
+
+
+async def test_print_split_survives_ams_flap(hass: HomeAssistant) -> None:
+    """Test the AMS dropping out between two trays keeps the tray timeline."""
+    red, white = await async_setup_printer(hass, PRINTER_OPTIONS)
+
+    await async_set_ams(hass, "on")
+    await async_set_active(hass, 0)
+    set_usage(hass, 6.0, 2.0)
+    await async_set_ams(hass, "unavailable")
+    await async_set_ams(hass, "on")
+    await async_set_active(hass, 1)
+    set_usage(hass, 10.0, 3.0)
+    await async_set_ams(hass, "off")
+
+    assert remaining(hass, red) == pytest.approx((994.0, 328.0))
+    assert remaining(hass, white) == pytest.approx((996.0, 329.0))
+    assert await async_query_usage(hass) == {"Red": [6.0, 1], "White": [4.0, 1]}
+
+
+async def test_print_ending_while_ams_unavailable(hass: HomeAssistant) -> None:
+    """Test a print is deducted when the AMS comes back already off."""
+    red, _ = await async_setup_printer(hass, PRINTER_OPTIONS)
+
+    await async_set_ams(hass, "on")
+    await async_set_active(hass, 0)
+    set_usage(hass, 6.0, 2.0)
+    await async_set_ams(hass, "unavailable")
+    await async_set_ams(hass, "off")
+
+    assert remaining(hass, red) == pytest.approx((994.0, 328.0))
+
+
+async def test_print_journaled_under_start_time(hass: HomeAssistant) -> None:
+    """Test a print is journaled under when the AMS turned on, and only once."""
+    red, _ = await async_setup_printer(hass, PRINTER_OPTIONS)
+
+    await async_set_ams(hass, "on")
+    on_state = hass.states.get(AMS_ACTIVE)
+    job_id = f"{AMS_ACTIVE}@{on_state.last_changed.isoformat()}"
+    await async_set_active(hass, 0)
+    set_usage(hass, 12.5, 4.2)
+    await async_set_ams(hass, "off")
+    assert remaining(hass, red) == pytest.approx((987.5, 325.8))
+
+    # The same shutdown seen again is the same job
+    hass.bus.async_fire(
+        EVENT_STATE_CHANGED,
+        {
+            "entity_id": AMS_ACTIVE,
+            "old_state": on_state,
+            "new_state": hass.states.get(AMS_ACTIVE),
+        },
+    )
+    await hass.async_block_till_done()
+    assert remaining(hass, red) == pytest.approx((987.5, 325.8))
+
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=60))
+    await hass.async_block_till_done()
+    assert any(
+        job_id in notification["message"]
+        for notification in _async_get_or_create_notifications(hass).values()
+    )
+
+    await hass.services.async_call(
+        DOMAIN, "undo_usage", {"job_id": job_id}, blocking=True
+    )
+    assert remaining(hass, red) == (1000.0, 330.0)
+
+
+async def test_live_print_journaled_under_start_time(hass: HomeAssistant) -> None:
+    """Test a live print flapping keeps the job key of its start."""
+    red, _ = await async_setup_printer(hass, LIVE_OPTIONS)
+
+    await async_set_ams(hass, "on")
+    job_id = f"{AMS_ACTIVE}@{hass.states.get(AMS_ACTIVE).last_changed.isoformat()}"
+    await async_set_active(hass, 0)
+    set_usage(hass, 5.0, 1.5)
+    await async_set_ams(hass, "unavailable")
+    await async_set_ams(hass, "on")
+    set_usage(hass, 12.0, 4.0)
+    await async_set_ams(hass, "off")
+    assert remaining(hass, red) == (988.0, 326.0)
+
+    await hass.services.async_call(
+        DOMAIN, "undo_usage", {"job_id": job_id}, blocking=True
+    )
+    assert remaining(hass, red) == (1000.0, 330.0)
+
+
+async def async_set_options(
+    hass: HomeAssistant, spools: list[Any], options: dict[str, Any]
+) -> None:
+    """Change the options of every spool in place."""
+    for spool in spools:
+        hass.config_entries.async_update_entry(spool, options=options)
+    await hass.async_block_till_done()
+
+
+async def test_live_tracking_turned_on_mid_print(hass: HomeAssistant) -> None:
+    """Test a running print is carried over when live tracking is turned on."""
+    spools = await async_setup_printer(hass, PRINTER_OPTIONS)
+    red, white = spools
+
+    await async_set_ams(hass, "on")
+    await async_set_active(hass, 0)
+    set_usage(hass, 6.0, 2.0)
+    await async_set_active(hass, 1)
+    set_usage(hass, 10.0, 3.0)
+    await async_set_options(hass, spools, LIVE_OPTIONS)
+    # The usage so far is split across the trays and applied right away
+    assert remaining(hass, red) == pytest.approx((994.0, 328.0))
+    assert remaining(hass, white) == pytest.approx((996.0, 329.0))
+
+    set_usage(hass, 15.0, 5.0)
+    await async_set_ams(hass, "off")
+    assert remaining(hass, red) == pytest.approx((994.0, 328.0))
+    assert remaining(hass, white) == pytest.approx((991.0, 327.0))
+    assert await async_query_usage(hass) == {"Red": [6.0, 1], "White": [9.0, 1]}
+
+    # Turning it back off leaves no timeline behind for the next print
+    await async_set_options(hass, spools, PRINTER_OPTIONS)
+    set_usage(hass, 0, 0)
+    await async_set_ams(hass, "on")
+    await async_set_active(hass, 0)
+    set_usage(hass, 4.0, 1.0)
+    await async_set_ams(hass, "off")
+    assert remaining(hass, red) == pytest.approx((990.0, 327.0))
+    assert remaining(hass, white) == pytest.approx((991.0, 327.0))
+
+
+async def test_live_tracking_turned_off_mid_print(hass: HomeAssistant) -> None:
+    """Test a print tracked live is still finished live."""
+    spools = await async_setup_printer(hass, LIVE_OPTIONS)
+    red, white = spools
+
+    await async_set_ams(hass, "on")
+    await async_set_active(hass, 0)
+    set_usage(hass, 5.0, 1.5)
+    await hass.async_block_till_done()
+    await async_set_options(hass, spools, PRINTER_OPTIONS)
+    await async_set_active(hass, 1)
+    set_usage(hass, 12.0, 4.0)
+    await async_set_ams(hass, "off")
+
+    assert remaining(hass, red) == pytest.approx((995.0, 328.5))
+    assert remaining(hass, white) == pytest.approx((993.0, 327.5))
+    assert await async_query_usage(hass) == {"Red": [5.0, 1], "White": [7.0, 1]}
@@ -0,0 +1,91 @@
+"""Tests for the Filament Tracker run-out forecasts."""
+
+from __future__ import annotations
+
+from math import exp
+import random
+
+import pytest
+
+from custom_components.filament_tracker.forecast import (
+    DAY,
+    RATE_WINDOW,
+    MedianSketch,
+    UsageForecast,
+)
+
+
+@pytest.mark.parametrize(
+    ("values", "median"), [([], None), ([7.0], 7.0), ([5.0, 1.0, 3.0], 3.0)]
+)
+def test_median_sketch_few_values(values: list[float], median: float | None) -> None:
+    """Test the median of up to five values is exact."""
+    sketch = MedianSketch()
+    for value in values:
+        sketch.add(value)
+    assert sketch.median == median
+
+
+def test_median_sketch_stream() -> None:
+    """Test the P² estimate follows the median of a long stream."""
+    values = [float(value) for value in range(1, 2002)]
+    random.Random(42).shuffle(values)
+    sketch = MedianSketch()
+    for value in values:
+        sketch.add(value)
+
+    assert sketch.count == 2001
+    assert sketch.median == pytest.approx(1001.0, rel=0.05)
+    # The markers survive a round trip through storage
+    assert MedianSketch(sketch.as_dict()).median == sketch.median
+
+
+def test_median_sketch_skewed_stream() -> None:
+    """Test one huge job does not drag the median along."""
+    sketch = MedianSketch()
+    for value in [10.0] * 50 + [5000.0] + [12.0] * 50:
+        sketch.add(value)
+    assert 10.0 <= sketch.median < 15.0
+
+
+def test_rate_decay() -> None:
+    """Test the usage rate decays with the time since the last job."""
+    forecast = UsageForecast()
+    now = 1_000_000.0
+    # Long enough for the weighted sum to have filled up
+    for day in range(200):
+        forecast.add(now + day * DAY, 20.0)
+    last = now + 199 * DAY
+
+    rate = forecast.rate(last)
+    # A steady 20 g a day is reported as about 20 g a day
+    assert rate == pytest.approx(20.0, rel=0.1)
+    assert forecast.rate(last + RATE_WINDOW) == pytest.approx(rate * exp(-1), rel=1e-4)
+    assert forecast.values(100.0, last)["days"] == round(100.0 / rate, 1)
+    assert forecast.values(100.0, last)["prints"] == 5
+
+
+def test_rate_without_jobs() -> None:
+    """Test a forecast without jobs has no values."""
+    assert UsageForecast().values(100.0, 0.0) == {
+        "rate": None,
+        "days": None,
+        "prints": None,
+    }
+
+
+def test_undone_job() -> None:
+    """Test negative usage lowers the rate but leaves the job sizes alone."""
+    forecast = UsageForecast()
+    forecast.add(0.0, 30.0)
+    forecast.add(DAY, 10.0)
+    median = forecast.sketch.median
+
+    forecast.add(DAY, -10.0, job=False)
+    assert forecast.total == pytest.approx(30.0 * exp(-DAY / RATE_WINDOW))
+    assert forecast.sketch.count == 2
+    assert forecast.sketch.median == median
+
+    # Giving back more than was counted never makes the rate negative
+    forecast.add(DAY, -100.0, job=False)
+    assert forecast.rate(DAY) == 0
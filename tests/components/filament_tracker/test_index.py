@@ -0,0 +1,55 @@
+"""Tests for the Filament Tracker spool index."""
+
+from __future__ import annotations
+
+import pytest
+
+from custom_components.filament_tracker.const import DOMAIN, SPOOL_INDEX_KEY
+from custom_components.filament_tracker.index import normalize_color
+from homeassistant.core import HomeAssistant
+
+from . import add_spool, async_setup_integration, remaining
+
+
+@pytest.mark.parametrize(
+    ("color", "normalized"),
+    [
+        ("#FF0000", "ff0000"),
+        ("FF0000FF", "ff0000"),
+        (" #00ae42ff ", "00ae42"),
+        ("#FFF", "fff"),
+        (None, ""),
+    ],
+)
+def test_normalize_color(color: str | None, normalized: str) -> None:
+    """Test colors normalize without '#' and alpha."""
+    assert normalize_color(color) == normalized
+
+
+async def test_tray_color_matches_exactly(hass: HomeAssistant) -> None:
+    """Test an RRGGBBAA tray color matches an RRGGBB spool without tolerance."""
+    green = add_spool(hass, "Green", "#00AE42")
+    await async_setup_integration(hass)
+
+    await hass.services.async_call(
+        DOMAIN,
+        "use_filament",
+        {"weight": 4.0, "meters": 1.2, "color": "00AE42FF", "tolerance": 0},
+        blocking=True,
+    )
+
+    assert remaining(hass, green) == (996.0, 328.8)
+
+
+async def test_lookup_identifier(hass: HomeAssistant) -> None:
+    """Test spools bound to tray identifiers are found by them."""
+    first = add_spool(hass, "White 1", "#FFFFFF", {"tray_uuid": "ab12cd34"})
+    second = add_spool(hass, "White 2", "#FFFFFF", {"tag_uid": "0011AABB"})
+    add_spool(hass, "White 3", "#FFFFFF", {"tray_uuid": "0000000000000000"})
+    await async_setup_integration(hass)
+    index = hass.data[SPOOL_INDEX_KEY]
+
+    assert index.async_lookup_identifier("AB12CD34") == first.entry_id
+    assert index.async_lookup_identifier("0011aabb") == second.entry_id
+    assert index.async_lookup_identifier("0000000000000000") is None
+    assert len(index.async_lookup("FFFFFFFF")) == 3
@@ -0,0 +1,114 @@
+"""Tests for the Filament Tracker inventory import and export."""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from custom_components.filament_tracker.const import DOMAIN
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ServiceValidationError
+
+from . import add_spool, async_setup_integration
+
+
+@pytest.fixture
+def inventory_dir(hass: HomeAssistant, tmp_path: Path) -> Path:
+    """Allow the services to read and write a temporary directory."""
+    hass.config.allowlist_external_dirs = {str(tmp_path)}
+    return tmp_path
+
+
+async def test_import_inventory(hass: HomeAssistant, inventory_dir: Path) -> None:
+    """Test valid records become spools and the others are reported."""
+    add_spool(hass, "Red", "#FF0000")
+    await async_setup_integration(hass)
+    path = inventory_dir / "inventory.jsonl"
+    path.write_text(
+        '{"name": "Blue", "color": "#0000FF"}\n'
+        '{"name": "Red", "color": "#FF0000"}\n'
+        "\n"
+        '{"color": "#00FF00"}\n'
+        "not json\n",
+        encoding="utf-8",
+    )
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        "import_inventory",
+        {"path": str(path)},
+        blocking=True,
+        return_response=True,
+    )
+    await hass.async_block_till_done()
+
+    assert response["created"] == 1
+    assert response["skipped"] == ["Red"]
+    assert [error["record"] for error in response["errors"]] == [3, 4]
+    assert sorted(
+        entry.title for entry in hass.config_entries.async_entries(DOMAIN)
+    ) == ["Blue", "Red"]
+
+
+async def test_export_then_import(hass: HomeAssistant, inventory_dir: Path) -> None:
+    """Test an exported CSV imports as the same spools."""
+    add_spool(hass, "Red", "#FF0000")
+    await async_setup_integration(hass)
+    path = inventory_dir / "inventory.csv"
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        "export_inventory",
+        {"path": str(path)},
+        blocking=True,
+        return_response=True,
+    )
+    assert response["count"] == 1
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        "import_inventory",
+        {"path": str(path)},
+        blocking=True,
+        return_response=True,
+    )
+    assert response == {"created": 0, "skipped": ["Red"], "errors": []}
+
+
+@pytest.mark.parametrize("name", ["inventory.jsonl", "inventory.csv"])
+async def test_import_not_utf8(
+    hass: HomeAssistant, inventory_dir: Path, name: str
+) -> None:
+    """Test a file that is not UTF-8 is rejected."""
+    await async_setup_integration(hass)
+    path = inventory_dir / name
+    path.write_bytes("name,color\nAzul Céu,#0000FF\n".encode("latin-1"))
+
+    with pytest.raises(ServiceValidationError) as err:
+        await hass.services.async_call(
+            DOMAIN,
+            "import_inventory",
+            {"path": str(path)},
+            blocking=True,
+            return_response=True,
+        )
+
+    assert err.value.translation_key == "invalid_encoding"
+    assert err.value.translation_placeholders["path"] == str(path)
+
+
+async def test_import_path_not_allowed(hass: HomeAssistant, tmp_path: Path) -> None:
+    """Test files outside allowlist_external_dirs are rejected."""
+    await async_setup_integration(hass)
+
+    with pytest.raises(ServiceValidationError) as err:
+        await hass.services.async_call(
+            DOMAIN,
+            "import_inventory",
+            {"path": str(tmp_path / "inventory.jsonl")},
+            blocking=True,
+            return_response=True,
+        )
+
+    assert err.value.translation_key == "path_not_allowed"
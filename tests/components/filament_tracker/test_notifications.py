@@ -0,0 +1,46 @@
+"""Tests for the Filament Tracker usage notifications."""
+
+from __future__ import annotations
+
+from datetime import timedelta
+
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.filament_tracker.const import DOMAIN
+from homeassistant.components.persistent_notification import (
+    _async_get_or_create_notifications,
+)
+from homeassistant.core import HomeAssistant
+import homeassistant.util.dt as dt_util
+
+from . import add_spool, async_setup_integration
+
+
+async def async_use_filament(hass: HomeAssistant, job_id: str) -> None:
+    """Deduct from the red spool and wait for the notification window."""
+    await hass.services.async_call(
+        DOMAIN,
+        "use_filament",
+        {"weight": 10.0, "meters": 3.0, "color": "#FF0000", "job_id": job_id},
+        blocking=True,
+    )
+    await hass.async_block_till_done()
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(seconds=61))
+    await hass.async_block_till_done()
+
+
+async def test_each_window_keeps_its_notification(hass: HomeAssistant) -> None:
+    """Test a new window does not replace the unread notification of the last."""
+    add_spool(hass, "Red", "#FF0000")
+    await async_setup_integration(hass)
+
+    await async_use_filament(hass, "benchy")
+    await async_use_filament(hass, "calibration-cube")
+
+    messages = [
+        notification["message"]
+        for notification in _async_get_or_create_notifications(hass).values()
+    ]
+    assert len(messages) == 2
+    assert any("benchy" in message for message in messages)
+    assert any("calibration-cube" in message for message in messages)
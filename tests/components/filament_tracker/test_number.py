@@ -0,0 +1,36 @@
+"""Tests for the Filament Tracker number entities."""
+
+from __future__ import annotations
+
+from custom_components.filament_tracker.const import NUMBER_ENTITIES_KEY, SNAPSHOT_KEY
+from homeassistant.core import HomeAssistant
+
+from . import add_spool, async_setup_integration, remaining
+
+
+async def test_remaining_kept_across_reload(hass: HomeAssistant) -> None:
+    """Test the remaining filament survives reloading the spool."""
+    red = add_spool(hass, "Red", "#FF0000")
+    await async_setup_integration(hass)
+
+    hass.data[NUMBER_ENTITIES_KEY][red.entry_id]["weight"].async_set_remaining(900.0)
+    await hass.async_block_till_done()
+    assert hass.states.get("number.red_weight").state == "900.0"
+
+    assert await hass.config_entries.async_reload(red.entry_id)
+    await hass.async_block_till_done()
+
+    assert remaining(hass, red) == (900.0, 330.0)
+
+
+async def test_remove_writes_pending_value(hass: HomeAssistant) -> None:
+    """Test a value set just before the entity goes is not lost."""
+    red = add_spool(hass, "Red", "#FF0000")
+    await async_setup_integration(hass)
+    entity = hass.data[NUMBER_ENTITIES_KEY][red.entry_id]["weight"]
+
+    entity.async_set_remaining(850.0)
+    await entity.async_remove()
+
+    assert hass.data[SNAPSHOT_KEY].async_get(red.entry_id, "weight") == 850.0
+    assert "weight" not in hass.data[NUMBER_ENTITIES_KEY][red.entry_id]
@@ -0,0 +1,117 @@
+"""Tests for the Filament Tracker sensors."""
+
+from __future__ import annotations
+
+import pytest
+
+from custom_components.filament_tracker.const import DOMAIN
+from homeassistant.core import HomeAssistant
+import homeassistant.helpers.device_registry as dr
+import homeassistant.helpers.entity_registry as er
+
+from . import add_spool, async_setup_integration
+
+INVENTORY_WEIGHT = "sensor.filament_inventory_weight"
+PETG_WEIGHT = "sensor.filament_inventory_petg_weight"
+PETG_RATE = "sensor.filament_inventory_petg_usage_rate"
+
+
+async def test_inventory_sensors_outlive_first_spool(hass: HomeAssistant) -> None:
+    """Test the inventory sensors have their own device, kept on spool removal."""
+    red = add_spool(hass, "Red", "#FF0000")
+    add_spool(hass, "White", "#FFFFFF")
+    await async_setup_integration(hass)
+    registry = er.async_get(hass)
+    registry.async_update_entity(INVENTORY_WEIGHT, name="Stock")
+
+    device = dr.async_get(hass).async_get_device(identifiers={(DOMAIN, "inventory")})
+    assert device is not None
+    assert device.name == "Filament Inventory"
+    assert registry.async_get(INVENTORY_WEIGHT).device_id == device.id
+
+    assert await hass.config_entries.async_remove(red.entry_id)
+    await hass.async_block_till_done()
+
+    entity = registry.async_get(INVENTORY_WEIGHT)
+    assert entity.device_id == device.id
+    assert entity.name == "Stock"
+    assert hass.states.get(INVENTORY_WEIGHT).state == "1000.0"
+
+
+async def test_empty_group_sensors_removed(hass: HomeAssistant) -> None:
+    """Test the sensors of a type are removed with its last spool."""
+    add_spool(hass, "Red", "#FF0000")
+    petg = add_spool(hass, "Black", "#000000", type="PETG")
+    await async_setup_integration(hass)
+    registry = er.async_get(hass)
+    assert hass.states.get(PETG_WEIGHT).state == "1000.0"
+    assert hass.states.get(PETG_RATE) is not None
+
+    assert await hass.config_entries.async_remove(petg.entry_id)
+    await hass.async_block_till_done()
+
+    for entity_id in (PETG_WEIGHT, PETG_RATE):
+        assert hass.states.get(entity_id) is None
+        assert registry.async_get(entity_id) is None
+    assert hass.states.get(INVENTORY_WEIGHT).state == "1000.0"
+
+    # A new spool of the type brings its sensors back
+    add_spool(hass, "Green", "#00FF00", type="PETG")
+    await hass.config_entries.async_setup(
+        hass.config_entries.async_entries(DOMAIN)[-1].entry_id
+    )
+    await hass.async_block_till_done()
+    assert hass.states.get(PETG_WEIGHT).state == "1000.0"
+
+
+async def test_forecast_follows_spool_weight(hass: HomeAssistant) -> None:
+    """Test the days and prints left follow a manual change of the spool."""
+    add_spool(hass, "Red", "#FF0000")
+    await async_setup_integration(hass)
+    await hass.services.async_call(
+        DOMAIN,
+        "use_filament",
+        {"weight": 10.0, "meters": 3.0, "color": "#FF0000"},
+        blocking=True,
+    )
+    await hass.async_block_till_done()
+    assert hass.states.get("sensor.red_prints_left").state == "99"
+    days = float(hass.states.get("sensor.red_days_left").state)
+
+    await hass.services.async_call(
+        "number",
+        "set_value",
+        {"entity_id": "number.red_weight", "value": 495.0},
+        blocking=True,
+    )
+    await hass.async_block_till_done()
+
+    assert hass.states.get("sensor.red_prints_left").state == "49"
+    assert float(hass.states.get("sensor.red_days_left").state) == pytest.approx(
+        days / 2, rel=0.01
+    )
+
+
+async def test_stats_sensor_pushes_counters(hass: HomeAssistant) -> None:
+    """Test the stats sensor updates when a counter changes, without polling."""
+    er.async_get(hass).async_get_or_create(
+        "sensor",
+        DOMAIN,
+        f"{DOMAIN}_stats",
+        suggested_object_id="filament_tracker_stats",
+    )
+    add_spool(hass, "Red", "#FF0000")
+    await async_setup_integration(hass)
+    assert hass.states.get("sensor.filament_tracker_stats").state == "0"
+
+    await hass.services.async_call(
+        DOMAIN,
+        "use_filament",
+        {"weight": 10.0, "meters": 3.0, "color": "#FF0000"},
+        blocking=True,
+    )
+    await hass.async_block_till_done()
+
+    state = hass.states.get("sensor.filament_tracker_stats")
+    assert state.state == "1"
+    assert state.attributes["counters"]["service.use_filament"] == 1
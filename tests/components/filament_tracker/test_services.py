@@ -0,0 +1,245 @@
+"""Tests for the Filament Tracker services."""
+
+from __future__ import annotations
+
+import pytest
+
+from custom_components.filament_tracker.const import DOMAIN
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ServiceValidationError
+
+from . import add_spool, async_setup_integration, remaining
+
+
+async def test_use_filament(hass: HomeAssistant) -> None:
+    """Test a deduction is taken from the spool of its color."""
+    red = add_spool(hass, "Red", "#FF0000")
+    white = add_spool(hass, "White", "#FFFFFF")
+    await async_setup_integration(hass)
+
+    await hass.services.async_call(
+        DOMAIN,
+        "use_filament",
+        {"weight": 12.5, "meters": 4.2, "color": "#FF0000"},
+        blocking=True,
+    )
+
+    assert remaining(hass, red) == pytest.approx((987.5, 325.8))
+    assert remaining(hass, white) == (1000.0, 330.0)
+
+
+async def test_use_filament_nearest_color(hass: HomeAssistant) -> None:
+    """Test a color within the tolerance matches the nearest spool."""
+    red = add_spool(hass, "Red", "#FF0000")
+    await async_setup_integration(hass)
+
+    await hass.services.async_call(
+        DOMAIN,
+        "use_filament",
+        {"weight": 10.0, "meters": 3.0, "color": "#FE0101"},
+        blocking=True,
+    )
+
+    assert remaining(hass, red) == (990.0, 327.0)
+
+
+async def test_use_filament_no_match(hass: HomeAssistant) -> None:
+    """Test a deduction without a matching spool is rejected."""
+    red = add_spool(hass, "Red", "#FF0000")
+    await async_setup_integration(hass)
+
+    with pytest.raises(ServiceValidationError, match="No matching filament"):
+        await hass.services.async_call(
+            DOMAIN,
+            "use_filament",
+            {"weight": 10.0, "meters": 3.0, "color": "#0000FF"},
+            blocking=True,
+        )
+
+    assert remaining(hass, red) == (1000.0, 330.0)
+
+
+async def test_use_filament_batch(hass: HomeAssistant) -> None:
+    """Test a batch deducts from every spool and sums the deductions."""
+    red = add_spool(hass, "Red", "#FF0000")
+    white = add_spool(hass, "White", "#FFFFFF")
+    await async_setup_integration(hass)
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        "use_filament_batch",
+        {
+            "deductions": [
+                {"weight": 10.0, "meters": 3.0, "color": "#FF0000"},
+                {"weight": 5.0, "meters": 1.5, "color": "#FFFFFF"},
+                {"weight": 2.0, "meters": 0.5, "color": "#FF0000"},
+            ]
+        },
+        blocking=True,
+        return_response=True,
+    )
+
+    assert remaining(hass, red) == (988.0, 326.5)
+    assert remaining(hass, white) == (995.0, 328.5)
+    assert response["total_weight"] == 17.0
+    assert response["total_cost"] == 1.7
+    assert [spool["name"] for spool in response["spools"]] == ["Red", "White"]
+
+
+async def test_use_filament_batch_is_atomic(hass: HomeAssistant) -> None:
+    """Test no spool changes when one deduction of a batch is rejected."""
+    red = add_spool(hass, "Red", "#FF0000")
+    await async_setup_integration(hass)
+
+    with pytest.raises(ServiceValidationError):
+        await hass.services.async_call(
+            DOMAIN,
+            "use_filament_batch",
+            {
+                "deductions": [
+                    {"weight": 10.0, "meters": 3.0, "color": "#FF0000"},
+                    {"weight": 5.0, "meters": 1.5, "color": "#0000FF"},
+                ]
+            },
+            blocking=True,
+            return_response=True,
+        )
+
+    assert remaining(hass, red) == (1000.0, 330.0)
+
+
+async def test_query_usage(hass: HomeAssistant) -> None:
+    """Test the ledger sums the deductions of every spool."""
+    red = add_spool(hass, "Red", "#FF0000")
+    await async_setup_integration(hass)
+
+    for _ in range(3):
+        await hass.services.async_call(
+            DOMAIN,
+            "use_filament",
+            {"weight": 10.0, "meters": 3.0, "color": "#FF0000"},
+            blocking=True,
+        )
+    response = await hass.services.async_call(
+        DOMAIN, "query_usage", {}, blocking=True, return_response=True
+    )
+
+    assert response["spools"] == [
+        {
+            "entry_id": red.entry_id,
+            "name": "Red",
+            "weight": 30.0,
+            "meters": 9.0,
+            "cost": 3.0,
+            "count": 3,
+        }
+    ]
+
+
+async def test_undo_redo_usage(hass: HomeAssistant) -> None:
+    """Test a journaled job is given back to its spool and taken again."""
+    red = add_spool(hass, "Red", "#FF0000")
+    await async_setup_integration(hass)
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        "use_filament",
+        {"weight": 10.0, "meters": 3.0, "color": "#FF0000", "job_id": "benchy"},
+        blocking=True,
+        return_response=True,
+    )
+    await hass.async_block_till_done()
+    assert response["job_id"] == "benchy"
+    assert float(hass.states.get("sensor.red_usage_rate").state) > 0
+
+    response = await hass.services.async_call(
+        DOMAIN, "undo_usage", {"job_id": "benchy"}, blocking=True, return_response=True
+    )
+    await hass.async_block_till_done()
+    assert response["job_id"] == "benchy"
+    assert remaining(hass, red) == (1000.0, 330.0)
+    # The usage rate no longer counts the undone job
+    assert float(hass.states.get("sensor.red_usage_rate").state) == 0
+    with pytest.raises(ServiceValidationError, match="already undone"):
+        await hass.services.async_call(
+            DOMAIN, "undo_usage", {"job_id": "benchy"}, blocking=True
+        )
+
+    await hass.services.async_call(
+        DOMAIN, "redo_usage", {"job_id": "benchy"}, blocking=True
+    )
+    await hass.async_block_till_done()
+    assert remaining(hass, red) == (990.0, 327.0)
+    assert float(hass.states.get("sensor.red_usage_rate").state) > 0
+    response = await hass.services.async_call(
+        DOMAIN, "query_usage", {}, blocking=True, return_response=True
+    )
+    assert response["total_weight"] == 10.0
+    # Undoing and redoing the job does not count as more jobs
+    assert response["spools"][0]["count"] == 1
+
+
+async def test_use_filament_duplicate_job(hass: HomeAssistant) -> None:
+    """Test a job that was already deducted is ignored."""
+    red = add_spool(hass, "Red", "#FF0000")
+    await async_setup_integration(hass)
+    data = {"weight": 10.0, "meters": 3.0, "color": "#FF0000", "job_id": "benchy"}
+
+    await hass.services.async_call(DOMAIN, "use_filament", data, blocking=True)
+    response = await hass.services.async_call(
+        DOMAIN, "use_filament", data, blocking=True, return_response=True
+    )
+
+    assert response["duplicate"] is True
+    assert response["spools"] == []
+    assert remaining(hass, red) == (990.0, 327.0)
+
+
+async def test_use_filament_generates_job_id(hass: HomeAssistant) -> None:
+    """Test a deduction without a job key gets one that can be undone."""
+    red = add_spool(hass, "Red", "#FF0000")
+    await async_setup_integration(hass)
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        "use_filament",
+        {"weight": 10.0, "meters": 3.0, "color": "#FF0000"},
+        blocking=True,
+        return_response=True,
+    )
+    assert response["job_id"]
+    assert response["duplicate"] is False
+
+    await hass.services.async_call(
+        DOMAIN, "undo_usage", {"job_id": response["job_id"]}, blocking=True
+    )
+    assert remaining(hass, red) == (1000.0, 330.0)
+
+
+async def test_undo_over_deduction(hass: HomeAssistant) -> None:
+    """Test only what a spool held is recorded, and undone, for a large job."""
+    red = add_spool(hass, "Red", "#FF0000", initial_weight=10.0)
+    await async_setup_integration(hass)
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        "use_filament",
+        {"weight": 25.0, "meters": 3.0, "color": "#FF0000", "job_id": "j1"},
+        blocking=True,
+        return_response=True,
+    )
+    assert response["spools"][0]["weight"] == 10.0
+    assert response["spools"][0]["new_weight"] == 0
+    assert response["total_cost"] == 1.0
+
+    await hass.services.async_call(
+        DOMAIN, "undo_usage", {"job_id": "j1"}, blocking=True
+    )
+    assert remaining(hass, red) == (10.0, 330.0)
+
+    response = await hass.services.async_call(
+        DOMAIN, "query_usage", {}, blocking=True, return_response=True
+    )
+    assert response["spools"][0]["weight"] == 0
+    assert response["spools"][0]["cost"] == 0
+    assert response["spools"][0]["count"] == 1
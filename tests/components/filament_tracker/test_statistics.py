@@ -0,0 +1,123 @@
+"""Tests for the Filament Tracker consumption statistics."""
+
+from __future__ import annotations
+
+from collections.abc import Generator
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+from freezegun.api import FrozenDateTimeFactory
+import pytest
+from pytest_homeassistant_custom_component.common import async_fire_time_changed
+
+from custom_components.filament_tracker.const import DOMAIN
+from custom_components.filament_tracker.statistics import FLUSH_DELAY
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import HomeAssistant
+import homeassistant.util.dt as dt_util
+
+from . import add_spool, async_setup_integration
+
+START = datetime(2026, 3, 2, 10, 30, tzinfo=dt_util.UTC)
+
+
+@pytest.fixture
+def add_statistics(hass: HomeAssistant) -> Generator[MagicMock]:
+    """Capture the rows pushed to the recorder."""
+    hass.config.components.add("recorder")
+    with patch(
+        "custom_components.filament_tracker.statistics.async_add_external_statistics"
+    ) as add_statistics:
+        yield add_statistics
+
+
+def pushed(
+    add_statistics: MagicMock, statistic_id: str
+) -> list[tuple[datetime, float]]:
+    """Return the (hour, sum) rows pushed for a statistic, in order."""
+    return [
+        (row["start"], row["sum"])
+        for _, metadata, rows in (call.args for call in add_statistics.call_args_list)
+        if metadata["statistic_id"] == statistic_id
+        for row in rows
+    ]
+
+
+async def use(hass: HomeAssistant, weight: float) -> None:
+    """Deduct from the red spool."""
+    await hass.services.async_call(
+        DOMAIN,
+        "use_filament",
+        {"weight": weight, "meters": weight / 3, "color": "#FF0000"},
+        blocking=True,
+    )
+
+
+async def test_push_after_delay(
+    hass: HomeAssistant,
+    freezer: FrozenDateTimeFactory,
+    add_statistics: MagicMock,
+) -> None:
+    """Test deductions of the running hour are pushed as one row."""
+    freezer.move_to(START)
+    add_spool(hass, "Red", "#FF0000")
+    await async_setup_integration(hass)
+
+    await use(hass, 10.0)
+    await use(hass, 5.0)
+    assert not add_statistics.called
+
+    freezer.tick(timedelta(seconds=FLUSH_DELAY))
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+
+    hour = START.replace(minute=0)
+    assert pushed(add_statistics, f"{DOMAIN}:type_pla_grams") == [(hour, 15.0)]
+    assert pushed(add_statistics, f"{DOMAIN}:type_pla_cost") == [(hour, 1.5)]
+
+
+async def test_rollover_pushes_closed_hour(
+    hass: HomeAssistant,
+    freezer: FrozenDateTimeFactory,
+    add_statistics: MagicMock,
+) -> None:
+    """Test an hour that closes before its flush is pushed right away."""
+    freezer.move_to(START.replace(minute=59, second=50))
+    add_spool(hass, "Red", "#FF0000")
+    await async_setup_integration(hass)
+
+    await use(hass, 10.0)
+    freezer.tick(timedelta(seconds=20))
+    await use(hass, 4.0)
+
+    hour = START.replace(minute=0)
+    statistic_id = f"{DOMAIN}:type_pla_grams"
+    assert pushed(add_statistics, statistic_id) == [(hour, 10.0)]
+
+    freezer.tick(timedelta(seconds=FLUSH_DELAY))
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done()
+
+    assert pushed(add_statistics, statistic_id) == [
+        (hour, 10.0),
+        (hour + timedelta(hours=1), 14.0),
+    ]
+
+
+async def test_stop_flushes(
+    hass: HomeAssistant,
+    freezer: FrozenDateTimeFactory,
+    add_statistics: MagicMock,
+) -> None:
+    """Test pending rows are pushed when Home Assistant stops."""
+    freezer.move_to(START)
+    add_spool(hass, "Red", "#FF0000")
+    await async_setup_integration(hass)
+
+    await use(hass, 10.0)
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_STOP)
+    await hass.async_block_till_done()
+
+    assert pushed(add_statistics, f"{DOMAIN}:type_pla_grams") == [
+        (START.replace(minute=0), 10.0)
+    ]
@@ -0,0 +1,91 @@
+"""Tests for the Filament Tracker websocket API."""
+
+from __future__ import annotations
+
+from pytest_homeassistant_custom_component.typing import WebSocketGenerator
+
+from custom_components.filament_tracker.const import DOMAIN
+from homeassistant.core import HomeAssistant
+
+from . import add_spool, async_setup_integration
+
+
+async def async_use_red(hass: HomeAssistant) -> None:
+    """Deduct from the red spool and wait for the inventory to update."""
+    await hass.services.async_call(
+        DOMAIN,
+        "use_filament",
+        {"weight": 10.0, "meters": 3.0, "color": "#FF0000"},
+        blocking=True,
+    )
+    await hass.async_block_till_done()
+
+
+async def test_inventory(
+    hass: HomeAssistant, hass_ws_client: WebSocketGenerator
+) -> None:
+    """Test the inventory command returns every spool."""
+    red = add_spool(hass, "Red", "#FF0000")
+    white = add_spool(hass, "White", "#FFFFFF", type="PETG")
+    await async_setup_integration(hass)
+    client = await hass_ws_client(hass)
+
+    await client.send_json_auto_id({"type": f"{DOMAIN}/inventory"})
+    msg = await client.receive_json()
+
+    assert msg["success"]
+    spools = {spool["entry_id"]: spool for spool in msg["result"]["spools"]}
+    assert spools.keys() == {red.entry_id, white.entry_id}
+    assert spools[white.entry_id] == {
+        "entry_id": white.entry_id,
+        "name": "White",
+        "color": "#FFFFFF",
+        "type": "PETG",
+        "brand": "Test",
+        "price": 100.0,
+        "weight": 1000.0,
+        "lenght": 330.0,
+    }
+
+
+async def test_subscribe_inventory(
+    hass: HomeAssistant, hass_ws_client: WebSocketGenerator
+) -> None:
+    """Test a subscription gets a snapshot, then changes and removed spools."""
+    red = add_spool(hass, "Red", "#FF0000")
+    white = add_spool(hass, "White", "#FFFFFF")
+    await async_setup_integration(hass)
+    client = await hass_ws_client(hass)
+
+    await client.send_json_auto_id({"type": f"{DOMAIN}/inventory/subscribe"})
+    msg = await client.receive_json()
+    assert msg["success"]
+    subscription = msg["id"]
+    msg = await client.receive_json()
+    assert {spool["name"] for spool in msg["event"]["spools"]} == {"Red", "White"}
+
+    # Only the changed fields of the changed spool are sent
+    await async_use_red(hass)
+    msg = await client.receive_json()
+    assert msg["event"] == {
+        "changed": {red.entry_id: {"weight": 990.0, "lenght": 327.0}},
+        "removed": [],
+    }
+
+    assert await hass.config_entries.async_remove(white.entry_id)
+    await hass.async_block_till_done()
+    msg = await client.receive_json()
+    assert msg["event"] == {"changed": {}, "removed": [white.entry_id]}
+
+    await client.send_json_auto_id(
+        {"type": "unsubscribe_events", "subscription": subscription}
+    )
+    msg = await client.receive_json()
+    assert msg["success"]
+
+    # Nothing is sent once unsubscribed: the next message answers a command
+    await async_use_red(hass)
+    await client.send_json_auto_id({"type": f"{DOMAIN}/inventory"})
+    msg = await client.receive_json()
+    assert msg["type"] == "result"
+    assert msg["result"]["spools"][0]["weight"] == 980.0